@@ -0,0 +1,203 @@
+"""Run many simulation jobs across a pool of processes.
+
+Used in the Logic Simulator project to simulate many definition files and
+switch settings in one command, using every processor core, and to collect
+the results in one file.
+
+Classes
+-------
+BatchRunner - runs simulation jobs and collects their results.
+"""
+import contextlib
+import json
+import multiprocessing
+import os
+
+from logsim import load_network
+from simulator import Simulator
+from error import Error
+
+
+class BatchRunner:
+    """Run simulation jobs and collect their results.
+
+    A job is a (path, cycles, switch_entries) tuple: the definition file to
+    simulate, the number of cycles to run, and a list of switch changes of
+    the form switch=signal@cycle, as read by Simulator.read_schedule. Each
+    job is run from a cold start.
+
+    Jobs are shared out between worker processes. Each worker keeps the
+    networks it has loaded, so later jobs on the same file neither parse it
+    nor load it from the cache again. The switches are set back to their
+    defined states before every job.
+
+    The result of a job is a dictionary holding the job, its status, the
+    number of cycles completed and the monitored signals, as strings of 0,
+    1 and x for each signal name.
+
+    Parameters
+    ----------
+    processes: optional number of worker processes. By default there is one
+               for each processor core. With 1, jobs are run in this process.
+
+    Public methods
+    --------------
+    read_jobs(self, file): Returns the jobs listed in a text file.
+
+    get_network(self, path): Returns the loaded network for a definition
+                             file, ready for a new job.
+
+    run_job(self, job): Runs a job and returns its result.
+
+    run_jobs(self, jobs): Runs the jobs across the worker processes and
+                          returns their results.
+
+    write_results(self, results, file): Writes the results as JSON.
+    """
+
+    statuses = [PASSED, FILE_ERROR, DEFINITION_ERRORS, SCHEDULE_ERROR,
+                OSCILLATING] = ["passed", "file error", "definition errors",
+                                "schedule error", "oscillating"]
+
+    def __init__(self, processes=None):
+        """Initialise the runner with no loaded networks."""
+        if processes is None:
+            processes = os.cpu_count() or 1
+        self.processes = processes
+
+        # networks stores {path: (file_state, network_objects, switches)},
+        # where file_state is the size and modification time of the file,
+        # and switches holds the defined switch states
+        self.networks = {}
+
+    def read_jobs(self, file):
+        """Return the list of jobs listed in the text file.
+
+        Each line holds a definition file path, a number of cycles and any
+        number of switch changes, separated by spaces, such as
+        "counter.txt 1000 sw1=1@10". Blank lines and lines starting with #
+        are skipped. Return None if a line is not valid.
+        """
+        jobs = []
+        for line in file:
+            words = line.split()
+            if not words or words[0].startswith("#"):
+                continue
+            if len(words) < 2 or not words[1].isdigit():
+                return None
+            jobs.append((words[0], int(words[1]), words[2:]))
+        return jobs
+
+    def get_network(self, path):
+        """Return the names, devices, network and monitors for the file.
+
+        A network already loaded by this runner is reused if the file has
+        not changed since, with its switches set back to their defined
+        states. Return None if the file cannot be opened or has errors.
+        """
+        try:
+            status = os.stat(path)
+        except OSError:
+            return None
+        file_state = (status.st_size, status.st_mtime_ns)
+        loaded = self.networks.get(path)
+        if loaded is not None and loaded[0] == file_state:
+            [_, network_objects, switches] = loaded
+            devices = network_objects[1]
+            for device_id, switch_state in switches:
+                devices.set_switch(device_id, switch_state)
+            return network_objects
+
+        try:
+            file = open(path, "rb")
+        except IOError:
+            return None
+        # The parser prints its progress, which is not wanted here
+        with file, open(os.devnull, "w") as null_file, \
+                contextlib.redirect_stdout(null_file):
+            network_objects = load_network(path, file)
+        Error.reset()
+        if network_objects is None:
+            return None
+        devices = network_objects[1]
+        switches = [(device_id, devices.get_device(device_id).switch_state)
+                    for device_id in devices.find_devices(devices.SWITCH)]
+        self.networks[path] = (file_state, network_objects, switches)
+        return network_objects
+
+    def run_job(self, job):
+        """Run the job and return its result."""
+        [path, cycles, switch_entries] = job
+        result = {"path": path, "cycles": cycles,
+                  "switches": list(switch_entries), "status": None,
+                  "cycles_completed": 0, "signals": {}}
+        if not os.path.isfile(path):
+            result["status"] = self.FILE_ERROR
+            return result
+        network_objects = self.get_network(path)
+        if network_objects is None:
+            result["status"] = self.DEFINITION_ERRORS
+            return result
+
+        simulator = Simulator(*network_objects)
+        schedule = simulator.read_schedule(switch_entries)
+        if schedule is None:
+            result["status"] = self.SCHEDULE_ERROR
+            return result
+        if simulator.run(cycles, schedule):
+            result["status"] = self.PASSED
+        else:
+            result["status"] = self.OSCILLATING
+        result["cycles_completed"] = simulator.cycles_completed
+
+        devices = simulator.devices
+        csv_signals = simulator.csv_signals
+        for (device_id, output_id), trace in \
+                simulator.monitors.monitors_dictionary.items():
+            signal_name = devices.get_signal_name(device_id, output_id)
+            result["signals"][signal_name] = "".join(
+                [csv_signals[signal] for signal in trace])
+        return result
+
+    def run_jobs(self, jobs):
+        """Run the jobs across the worker processes.
+
+        Return the list of results, in the same order as the jobs.
+        """
+        jobs = list(jobs)
+        processes = min(self.processes, len(jobs))
+        if processes <= 1:
+            return [self.run_job(job) for job in jobs]
+        # Hand out a few jobs at a time, so the workers stay busy without
+        # one of them being left with a long queue at the end
+        chunk_size = max(1, len(jobs) // (processes * 4))
+        with multiprocessing.Pool(processes, start_worker) as pool:
+            return pool.map(run_worker_job, jobs, chunk_size)
+
+    def write_results(self, results, file):
+        """Write the results to the text file as JSON.
+
+        The number of jobs with each status is written first, followed by
+        the result of every job.
+        """
+        counts = {status: 0 for status in self.statuses}
+        for result in results:
+            counts[result["status"]] += 1
+        json.dump({"counts": counts, "results": results}, file, indent=1)
+        file.write("\n")
+
+
+# The runner of a worker process, which keeps the networks it loads between
+# jobs
+worker_runner = None
+
+
+def start_worker():
+    """Make the runner of a new worker process."""
+    global worker_runner
+    worker_runner = BatchRunner(1)
+
+
+def run_worker_job(job):
+    """Run a job in a worker process and return its result."""
+    return worker_runner.run_job(job)
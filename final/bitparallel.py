@@ -0,0 +1,343 @@
+"""Simulate many switch settings of the same network at once.
+
+Used in the Logic Simulator project for exhaustive testing. Each signal is
+held as a pair of bit vectors, with one bit lane per scenario, so that a gate
+is executed for every scenario with a few bitwise operations.
+
+Classes
+-------
+BitParallelNetwork - executes the network for many switch settings at once.
+"""
+from compiled import CompiledNetwork
+
+
+class BitParallelNetwork(CompiledNetwork):
+    """Execute the network for many switch settings at once.
+
+    Each scenario is given a bit lane. Python integers have no fixed width, so
+    any number of scenarios can be run together. Every signal is stored as two
+    bit vectors: the level, which is set for HIGH and RISING, and the
+    transition, which is set for RISING and FALLING. In this form,
+    update_signal(signal, target) sets the level to the target and the
+    transition to the old level XOR the target.
+
+    Devices are executed in the same order as in Network.execute_network, and
+    the passes of a cycle continue until every lane has settled. A lane is
+    not executed again in a cycle once a pass leaves it unchanged, so each
+    lane gives the same traces as running its scenario on its own. All lanes
+    start from the current state of the devices, and the devices are not
+    changed.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    load_scenarios(self, switch_assignments): Loads one bit lane for each
+                                              switch assignment.
+
+    load_lanes(self, signals, dtype_memories, clock_signals,
+               siggen_signals): Loads one bit lane for each D-type memory,
+                                clock and siggen signal setting.
+
+    sync_devices(self): Leaves the devices unchanged.
+
+    get_lane_signal(self, slot, lane): Returns the signal level in the given
+                                       slot and lane.
+
+    update_clocks(self): If it is time to do so, sets clock signals to RISING
+                         or FALLING.
+
+    execute_pass(self, active=None): Executes every device once, for the
+                                     given lanes.
+
+    execute_network(self): Executes all the devices in the network for one
+                           simulation cycle, for every lane.
+
+    record_lanes(self, cycles, outputs): Runs the loaded lanes and returns
+                                         the signal traces of each lane.
+
+    run_scenarios(self, switch_assignments, cycles, outputs): Returns the
+                                    signal traces of each switch assignment.
+    """
+
+    def __init__(self, names, devices, network):
+        """Initialise the bit vectors."""
+        super().__init__(names, devices, network)
+        self.lane_count = 0
+        self.mask = 0  # one bit set for every lane
+        self.level = []
+        self.transition = []
+        self.switch_targets = []
+        self.dtype_lanes = []
+
+    def load_scenarios(self, switch_assignments):
+        """Load one bit lane for each switch assignment.
+
+        switch_assignments is a list of dictionaries of {switch_id: state}.
+        Switches missing from an assignment keep their current state. Return
+        False if the network is not valid or an assignment is not a switch.
+        """
+        # Start from the signals held by the network's own engine
+        self.network.sync_devices()
+        self.refresh()
+        if not self.valid:
+            return False
+        self.load_state()
+        devices = self.devices
+        self.lane_count = len(switch_assignments)
+        mask = self.mask = (1 << self.lane_count) - 1
+
+        HIGH = devices.HIGH
+        RISING = devices.RISING
+        FALLING = devices.FALLING
+        signals = [device.outputs[output_id]
+                   for device, output_id in self.slot_outputs]
+        self.level = [mask if signal in (HIGH, RISING) else 0
+                      for signal in signals]
+        self.transition = [mask if signal in (RISING, FALLING) else 0
+                           for signal in signals]
+
+        switch_ids = {device.device_id for device, slot in self.switches}
+        for assignment in switch_assignments:
+            if not switch_ids.issuperset(assignment):
+                return False
+        self.switch_targets = []
+        for device, slot in self.switches:
+            target = 0
+            for lane, assignment in enumerate(switch_assignments):
+                if assignment.get(device.device_id,
+                                  device.switch_state) == HIGH:
+                    target |= 1 << lane
+            self.switch_targets.append(target)
+
+        self.dtype_lanes = [mask if memory == HIGH else 0
+                            for memory in self.dtype_memory]
+        return True
+
+    def load_lanes(self, signals, dtype_memories, clock_signals,
+                   siggen_signals):
+        """Load one bit lane for each D-type memory, clock and siggen signal
+        setting.
+
+        This runs the same network from many cold starts at once. signals
+        lists the starting signal in each slot, shared by every lane.
+        dtype_memories, clock_signals and siggen_signals hold one list for
+        each lane, of the memory of each D-type and the output of each clock
+        and siggen, in the order the engine holds them. Clock and siggen
+        counters, and the switches, are taken from the devices and are the
+        same in every lane. Return False if the network is not valid.
+        """
+        self.refresh()
+        if not self.valid:
+            return False
+        self.load_state()
+        devices = self.devices
+        HIGH = devices.HIGH
+        RISING = devices.RISING
+        FALLING = devices.FALLING
+        self.lane_count = len(dtype_memories)
+        mask = self.mask = (1 << self.lane_count) - 1
+
+        self.level = [mask if signal in (HIGH, RISING) else 0
+                      for signal in signals]
+        self.transition = [mask if signal in (RISING, FALLING) else 0
+                           for signal in signals]
+        for source_slots, source_signals in [
+                (self.clock_slots, clock_signals),
+                (self.siggen_slots, siggen_signals)]:
+            for i, slot in enumerate(source_slots):
+                level = 0
+                for lane, lane_signals in enumerate(source_signals):
+                    if lane_signals[i] == HIGH:
+                        level |= 1 << lane
+                self.level[slot] = level
+                self.transition[slot] = 0
+        self.dtype_lanes = []
+        for i in range(len(self.dtype_inputs)):
+            lanes = 0
+            for lane, memories in enumerate(dtype_memories):
+                if memories[i] == HIGH:
+                    lanes |= 1 << lane
+            self.dtype_lanes.append(lanes)
+        self.switch_targets = [mask if device.switch_state == HIGH else 0
+                               for device, slot in self.switches]
+        return True
+
+    def sync_devices(self):
+        """Leave the devices unchanged, as the lanes hold many states."""
+
+    def get_lane_signal(self, slot, lane):
+        """Return the signal level in the given slot and lane."""
+        devices = self.devices
+        level = self.level[slot] >> lane & 1
+        transition = self.transition[slot] >> lane & 1
+        return [[devices.LOW, devices.FALLING],
+                [devices.HIGH, devices.RISING]][level][transition]
+
+    def update_clocks(self):
+        """If it is time to do so, set clock signals to RISING or FALLING.
+
+        Clocks do not depend on the switches, so they are the same in every
+        lane.
+        """
+        for i in self.get_clock_toggles():
+            slot = self.clock_slots[i]
+            if not self.transition[slot]:
+                self.level[slot] ^= self.mask
+                self.transition[slot] = self.mask
+
+    def execute_pass(self, active=None):
+        """Execute every device once, for the given lanes.
+
+        active is a bit vector of the lanes to execute, and the other lanes
+        are left unchanged. If it is None, every lane is executed. Return a
+        bit vector of the lanes in which a signal changed.
+        """
+        level = self.level
+        transition = self.transition
+        mask = self.mask
+        if active is None:
+            active = mask
+        inactive = ~active
+        changed = 0
+
+        for (device, slot), target in zip(self.switches, self.switch_targets):
+            old_transition = transition[slot]
+            toggled = (level[slot] ^ target) & active
+            new_transition = (old_transition & inactive) | toggled
+            changed |= toggled | (old_transition ^ new_transition)
+            level[slot] ^= toggled
+            transition[slot] = new_transition
+
+        # Execute D-types before clocks to catch the rising edge of the clock
+        memories = self.dtype_lanes
+        for i, (clock, set_, clear, data) in enumerate(self.dtype_inputs):
+            rising = level[clock] & transition[clock]
+            # The data is HIGH if it is HIGH or FALLING
+            memory = (memories[i] & ~rising) | (
+                rising & (level[data] ^ transition[data]))
+            memory |= level[set_] & ~transition[set_]
+            memory &= ~(level[clear] & ~transition[clear])
+            memory = (memories[i] & inactive) | (memory & active)
+            memories[i] = memory
+            for slot, target in zip(self.dtype_outputs[i],
+                                    (memory, memory ^ mask)):
+                old_transition = transition[slot]
+                toggled = (level[slot] ^ target) & active
+                new_transition = (old_transition & inactive) | toggled
+                changed |= toggled | (old_transition ^ new_transition)
+                level[slot] ^= toggled
+                transition[slot] = new_transition
+
+        for slot in self.clock_slots:
+            changed |= transition[slot] & active
+            transition[slot] &= inactive
+
+        # Siggens set their output directly, so they never unsettle a pass
+        for i in self.siggen_changes:
+            slot = self.siggen_slots[i]
+            target = mask if self.siggen_outputs[i] else 0
+            level[slot] = (level[slot] & inactive) | (target & active)
+            transition[slot] &= inactive
+
+        HIGH = self.devices.HIGH
+        for device_kind, out, fanin, x, y, not_y in self.gates:
+            # matching has a bit set in the lanes where every input equals x
+            matching = mask
+            if x == HIGH:
+                for slot in fanin:
+                    matching &= level[slot] & ~transition[slot]
+            else:
+                for slot in fanin:
+                    matching &= ~(level[slot] | transition[slot])
+            target = matching if y == HIGH else matching ^ mask
+            old_transition = transition[out]
+            toggled = (level[out] ^ target) & active
+            new_transition = (old_transition & inactive) | toggled
+            changed |= toggled | (old_transition ^ new_transition)
+            level[out] ^= toggled
+            transition[out] = new_transition
+
+        for out, first, second in self.xor_gates:
+            target = ((level[first] ^ level[second]) |
+                      (transition[first] ^ transition[second]))
+            old_transition = transition[out]
+            toggled = (level[out] ^ target) & active
+            new_transition = (old_transition & inactive) | toggled
+            changed |= toggled | (old_transition ^ new_transition)
+            level[out] ^= toggled
+            transition[out] = new_transition
+
+        return changed
+
+    def execute_network(self):
+        """Execute all the devices in the network for one simulation cycle.
+
+        A lane is only executed until it settles, as it would be on its own.
+        Return a bit vector of the lanes that oscillate.
+        """
+        self.update_clocks()
+        self.update_siggen()
+
+        active = self.mask
+        for _ in range(self.iteration_limit):
+            active = self.execute_pass(active)
+            if not active:
+                break
+        return active
+
+    def run_scenarios(self, switch_assignments, cycles, outputs):
+        """Return the signal traces of each switch assignment.
+
+        switch_assignments is a list of dictionaries of {switch_id: state},
+        and outputs is a list of (device_id, output_id) to record. Return a
+        list with one dictionary of {(device_id, output_id): [signal_list]}
+        for each assignment, or None if the scenarios could not be loaded or
+        an output does not exist. As in UserInterface.run_network, the traces
+        of a scenario stop at the first cycle in which it oscillates.
+        """
+        if not self.load_scenarios(switch_assignments):
+            return None
+        return self.record_lanes(cycles, outputs)
+
+    def record_lanes(self, cycles, outputs):
+        """Run the loaded lanes and return the signal traces of each lane.
+
+        outputs is a list of (device_id, output_id) to record. Return a list
+        with one dictionary of {(device_id, output_id): [signal_list]} for
+        each lane, or None if an output does not exist. The traces of a lane
+        stop at the first cycle in which it oscillates.
+        """
+        if any(output not in self.slots for output in outputs):
+            return None
+        slots = [self.slots[output] for output in outputs]
+
+        # Record the bit vectors of each cycle, and split them into lanes at
+        # the end
+        recorded = []
+        running = self.mask
+        for _ in range(cycles):
+            running &= ~self.execute_network()
+            recorded.append((running, [(self.level[slot],
+                                        self.transition[slot])
+                                       for slot in slots]))
+
+        devices = self.devices
+        signal_table = [[devices.LOW, devices.FALLING],
+                        [devices.HIGH, devices.RISING]]
+        scenario_traces = []
+        for lane in range(self.lane_count):
+            traces = {output: [] for output in outputs}
+            for running, vectors in recorded:
+                if not running >> lane & 1:
+                    break
+                for output, (level, transition) in zip(outputs, vectors):
+                    traces[output].append(
+                        signal_table[level >> lane & 1][
+                            transition >> lane & 1])
+            scenario_traces.append(traces)
+        return scenario_traces
@@ -0,0 +1,228 @@
+"""Cache parsed networks on disk, keyed by the contents of the definition file.
+
+Used in the Logic Simulator project to skip scanning and parsing when the
+same definition file is loaded again.
+
+Classes
+-------
+NetworkCache - stores snapshots of parsed networks on disk.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+
+
+class NetworkCache:
+    """Store snapshots of parsed networks on disk.
+
+    Each snapshot holds the data needed to rebuild the Names, Devices,
+    Network and Monitors built by the parser: the name strings, the kind,
+    settings, inputs and outputs of every device, and the monitored outputs.
+    It is stored as compressed JSON, so loading a snapshot cannot run any
+    code. A definition file that has not changed can then be loaded without
+    the scanner and parser.
+
+    Snapshots are keyed by a SHA-256 hash of the file contents and of the
+    source of the modules that build the network, so editing either the
+    file or the program automatically misses the cache. If the source cannot
+    be read, as in a frozen build, nothing is cached. At most max_entries
+    snapshots are kept, and the least recently used are removed first.
+
+    The execution engine is not stored, and loading a snapshot repeats the
+    cold start-up of the D-types and clocks, so a loaded network starts from
+    a new random state just like a parsed one.
+
+    Parameters
+    ----------
+    directory: optional directory to keep the snapshots in. By default this
+               is logsim in the user cache directory.
+
+    Public methods
+    --------------
+    get_code_version(self): Returns a hash of the source of the modules that
+                            build the network.
+
+    get_key(self, file): Returns the cache key for the contents of a file.
+
+    get_path(self, key): Returns the path of the snapshot for a key.
+
+    load(self, key): Returns the names, devices, network and monitors stored
+                     for a key.
+
+    save(self, key, names, devices, network, monitors): Stores a snapshot of
+                                                        the parsed network.
+
+    remove_old_entries(self): Removes the least recently used snapshots.
+    """
+
+    # The modules whose source decides the network built from a file
+    code_modules = ["names", "devices", "network", "monitors", "error",
+                    "scanner", "parse", "cache"]
+    block_size = 1 << 20
+    max_entries = 64
+    suffix = ".snapshot"
+
+    def __init__(self, directory=None):
+        """Set the directory to keep the snapshots in."""
+        if directory is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME",
+                                        os.path.join(os.path.expanduser("~"),
+                                                     ".cache"))
+            directory = os.path.join(cache_home, "logsim")
+        self.directory = directory
+        self.code_version = self.get_code_version()
+
+    def get_code_version(self):
+        """Return a hash of the source of the modules that build the network.
+
+        Return None if the source of a module cannot be read.
+        """
+        source_directory = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for module in self.code_modules:
+            try:
+                with open(os.path.join(source_directory, module + ".py"),
+                          "rb") as file:
+                    digest.update(file.read())
+            except OSError:
+                return None
+        return digest.hexdigest()
+
+    def get_key(self, file):
+        """Return the cache key for the contents of a binary file object.
+
+        The file is read in blocks from its current position to the end, and
+        then returned to that position. Return None if there is no code
+        version, so nothing is cached.
+        """
+        if self.code_version is None:
+            return None
+        position = file.tell()
+        digest = hashlib.sha256(self.code_version.encode("ascii"))
+        while True:
+            block = file.read(self.block_size)
+            if not block:
+                break
+            digest.update(block)
+        file.seek(position)
+        return digest.hexdigest()
+
+    def get_path(self, key):
+        """Return the path of the snapshot for the given key."""
+        return os.path.join(self.directory, key + self.suffix)
+
+    def load(self, key):
+        """Return (names, devices, network, monitors) stored for the key.
+
+        Return None if there is no valid snapshot for the key.
+        """
+        if key is None:
+            return None
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as file:
+                snapshot = json.loads(zlib.decompress(file.read()))
+            names = Names()
+            names.lookup_many(snapshot["names"])
+            if (names.names != snapshot["names"] or
+                    any(not isinstance(name, str) for name in names.names)):
+                return None
+            # The name IDs are those of the parse, so the devices, network
+            # and monitors find their keywords under the same IDs
+            devices = Devices(names)
+            network = Network(names, devices)
+            monitors = Monitors(names, devices, network)
+            names.error_code_count = snapshot["error_code_count"]
+
+            for (device_id, device_kind, inputs, outputs, clock_half_period,
+                 siggen_pulse, siggen_signals,
+                 switch_state) in snapshot["devices"]:
+                devices.add_device(device_id, device_kind)
+                device = devices.devices_list[-1]
+                device.inputs = {
+                    input_id: None if output is None else tuple(output)
+                    for input_id, output in inputs}
+                device.outputs = {output_id: signal
+                                  for output_id, signal in outputs}
+                device.clock_half_period = clock_half_period
+                device.siggen_pulse = siggen_pulse
+                device.siggen_signals = siggen_signals
+                device.switch_state = switch_state
+            devices.gate_input_ids = snapshot["gate_input_ids"]
+            network.engine_type = snapshot["engine_type"]
+            for device_id, output_id in snapshot["monitors"]:
+                if (monitors.make_monitor(device_id, output_id) !=
+                        monitors.NO_ERROR):
+                    return None
+        except (OSError, zlib.error, KeyError, TypeError, ValueError):
+            return None
+
+        try:
+            os.utime(path)  # mark the snapshot as recently used
+        except OSError:
+            pass
+        devices.cold_startup()
+        network.compile_network()
+        return names, devices, network, monitors
+
+    def save(self, key, names, devices, network, monitors):
+        """Store a snapshot of the parsed network for the key.
+
+        The snapshot is written to a temporary file and then renamed, so a
+        partly written snapshot is never loaded. Return True if successful.
+        """
+        if key is None:
+            return False
+        snapshot = {
+            "names": names.names,
+            "error_code_count": names.error_code_count,
+            "devices": [[device.device_id, device.device_kind,
+                         list(device.inputs.items()),
+                         list(device.outputs.items()),
+                         device.clock_half_period, device.siggen_pulse,
+                         device.siggen_signals, device.switch_state]
+                        for device in devices.devices_list],
+            "gate_input_ids": devices.gate_input_ids,
+            "engine_type": network.engine_type,
+            "monitors": list(monitors.monitors_dictionary)}
+        try:
+            data = zlib.compress(json.dumps(snapshot).encode())
+        except (TypeError, ValueError):
+            return False
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temporary_path = tempfile.mkstemp(
+                dir=self.directory, suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(data)
+            os.replace(temporary_path, self.get_path(key))
+        except OSError:
+            return False
+        self.remove_old_entries()
+        return True
+
+    def remove_old_entries(self):
+        """Remove the least recently used snapshots, keeping max_entries.
+
+        Snapshots in the old pickled format are always removed.
+        """
+        entries = []
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pickle"):
+                    os.remove(entry.path)
+                elif entry.name.endswith(self.suffix):
+                    entries.append((entry.stat().st_mtime, entry.path))
+            entries.sort(reverse=True)
+            for _, path in entries[self.max_entries:]:
+                os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,1326 @@
+"""Compile the network into flat arrays and execute it quickly.
+
+Used in the Logic Simulator project to simulate large networks. The
+devices.Devices() and network.Network() objects stay the authoring and query
+view of the network; this module flattens them into dense integer arrays that
+are much cheaper to execute.
+
+Classes
+-------
+CompiledNetwork - executes a flattened copy of the network.
+EventDrivenNetwork - only re-executes devices whose inputs have changed.
+LevelizedNetwork - executes the gates in topological order.
+
+Functions
+---------
+find_components - finds the strongly connected components of a graph.
+"""
+import bisect
+import heapq
+import math
+
+
+class CompiledNetwork:
+    """Execute a flattened copy of the network.
+
+    Every output in the network is given a signal slot, an index into a single
+    list of signal levels. Each gate stores the slots of the outputs connected
+    to its inputs (its fan-in), and devices are grouped by kind code in the
+    same order that Network.execute_network uses, so that both engines give
+    identical results.
+
+    While the compiled network is in use, its arrays hold the current signals.
+    Changes made through the Devices and Network methods are picked up
+    automatically: making devices or connections recompiles the network,
+    cold_startup reloads the device state, and switch states are read from the
+    switch devices every cycle. Device outputs are only written back when
+    sync_devices is called.
+
+    D-types are executed as sequential devices: only when a clock edge
+    reaches them, their SET or CLEAR changes, or their outputs are still
+    moving towards their memory. The other D-types would be left unchanged,
+    so the traces are the same as executing every D-type in every pass.
+
+    If Network.pruning is set, only the devices in the cone of influence of
+    the monitored outputs are executed, and the monitored traces are
+    unchanged. Oscillations are then only found inside the cone.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    compile(self): Flattens the network into arrays.
+
+    find_devices(self, device_kind): Returns the devices of the given kind to
+                                     execute.
+
+    load_state(self): Reloads the D-type, clock and siggen state from the
+                      devices after a cold startup.
+
+    refresh(self): Recompiles or reloads the state if the devices have changed.
+
+    get_output_signal(self, device_id, output_id): Returns the signal level at
+                                                   the given output.
+
+    sync_devices(self): Writes the compiled signals back to the devices.
+
+    sync_outputs(self): Writes the compiled signals back to the devices,
+                        except the clock and siggen outputs.
+
+    get_clock_counters(self): Returns the list of clock counters.
+
+    get_siggen_counters(self): Returns the list of siggen counters.
+
+    get_bucket(self, cycle): Returns the clocks and siggens queued for the
+                             cycle.
+
+    queue_clock(self, i, cycle): Queues a clock to toggle in the cycle.
+
+    queue_siggen(self, i): Queues a siggen for its next output change.
+
+    get_clock_toggles(self): Moves on to the next cycle and returns the
+                             clocks that toggle in it.
+
+    update_clocks(self): If it is time to do so, sets clock signals to RISING
+                         or FALLING.
+
+    update_siggen(self): Finds the siggens whose output changes in this
+                         cycle.
+
+    get_quiet_cycles(self, cycles): Returns how many of the next cycles have
+                                    no clock, siggen or switch changes.
+
+    skip_quiet_cycles(self, cycles): Runs the next quiet cycles at once.
+
+    get_state_key(self): Returns a key that is equal for equal states of the
+                         network.
+
+    execute_sources(self): Executes the switches, D-types, clocks and siggens
+                           once.
+
+    execute_dtypes(self): Executes the D-types that may change in this pass.
+
+    execute_pass(self): Executes every device once.
+
+    execute_network(self): Executes all the devices in the network for one
+                           simulation cycle.
+    """
+
+    def __init__(self, names, devices, network):
+        """Initialise the signal arrays and the update table."""
+        self.names = names
+        self.devices = devices
+        self.network = network
+
+        # Number of passes to wait for the signals to settle before declaring
+        # the network unstable, as in Network.execute_network
+        self.iteration_limit = 20
+
+        # If pruning is True, only the devices in the cone of influence of
+        # the network's active outputs are executed
+        self.pruning = network.pruning
+        self.cone = None
+
+        self.structure_version = None
+        self.state_version = None
+        self.valid = False  # True if every input is connected
+
+        # slots stores {(device_id, output_id): slot}
+        self.slots = {}
+        # slot_outputs stores (device, output_id) for every slot
+        self.slot_outputs = []
+        self.signals = []
+
+        # update_table[signal][target] is update_signal(signal, target)
+        steady_state = network.steady_state
+        self.update_table = [
+            [network.update_signal(signal, target) for target in
+             [devices.LOW, devices.HIGH]] for signal in
+            [devices.LOW, devices.HIGH, devices.RISING, devices.FALLING]]
+        network.steady_state = steady_state
+
+    def compile(self):
+        """Flatten the network into arrays.
+
+        Return True if every input in the network is connected.
+        """
+        devices = self.devices
+        if self.structure_version is not None:
+            # Keep the signals computed so far. If a cold startup has set the
+            # D-type, clock and siggen state since, only the other outputs
+            # are kept.
+            if self.state_version == devices.state_version:
+                self.sync_devices()
+            else:
+                self.sync_outputs()
+        self.structure_version = devices.structure_version
+        self.state_version = devices.state_version
+
+        self.slots = {}
+        self.slot_outputs = []
+        self.signals = []
+        for device_id in devices.find_devices():
+            device = devices.get_device(device_id)
+            for output_id, signal in device.outputs.items():
+                self.slots[(device_id, output_id)] = len(self.signals)
+                self.slot_outputs.append((device, output_id))
+                self.signals.append(signal)
+
+        self.valid = True
+        signal_levels = [devices.LOW, devices.HIGH, devices.RISING,
+                         devices.FALLING]
+        if any(signal not in signal_levels for signal in self.signals):
+            self.valid = False
+
+        # Clocks and siggens are executed even outside the cone, so that
+        # their counters are right for the devices that join it later. Every
+        # input must still be connected, as for the sweep.
+        self.cone = None
+        if self.pruning:
+            self.cone = self.network.find_cone(self.network.active_outputs)
+            if not self.network.check_network():
+                self.valid = False
+            # A D-type only sees a siggen on its SET or CLEAR change in the
+            # next pass, and whether there is one depends on every device,
+            # so the whole network is executed
+            level_drivers = [
+                devices.get_device(device_id).inputs.get(input_id)
+                for device_id in self.find_devices(devices.D_TYPE)
+                for input_id in [devices.SET_ID, devices.CLEAR_ID]]
+            if any(driver is not None and
+                   devices.get_device(driver[0]).device_kind == devices.SIGGEN
+                   for driver in level_drivers):
+                self.cone = None
+
+        # Switches store (device, output slot)
+        self.switches = [(devices.get_device(device_id),
+                          self.get_slot(device_id, None))
+                         for device_id in self.find_devices(devices.SWITCH)]
+
+        # D-types store their (CLK, SET, CLEAR, DATA) fan-in and (Q, QBAR)
+        self.dtype_devices = [devices.get_device(device_id) for device_id in
+                              self.find_devices(devices.D_TYPE)]
+        self.dtype_inputs = [
+            tuple(self.get_fanin_slot(device, input_id)
+                  for input_id in devices.dtype_input_ids)
+            for device in self.dtype_devices]
+        self.dtype_outputs = [
+            tuple(self.get_slot(device.device_id, output_id)
+                  for output_id in devices.dtype_output_ids)
+            for device in self.dtype_devices]
+
+        self.clock_devices = [devices.get_device(device_id) for device_id in
+                              devices.find_devices(devices.CLOCK)]
+        self.clock_slots = [self.get_slot(device.device_id, None)
+                            for device in self.clock_devices]
+        self.clock_half_period = [device.clock_half_period
+                                  for device in self.clock_devices]
+
+        # siggen_values[i][counter] is the output of siggen i for a counter
+        self.siggen_devices = [devices.get_device(device_id) for device_id in
+                               devices.find_devices(devices.SIGGEN)]
+        self.siggen_slots = [self.get_slot(device.device_id, None)
+                             for device in self.siggen_devices]
+        self.siggen_values = []
+        for device in self.siggen_devices:
+            pulse_signals = device.siggen_signals
+            self.siggen_values.append(
+                [pulse_signals[counter - 1]
+                 for counter in range(len(pulse_signals) + 1)])
+        # siggen_runs[i][counter] is the number of cycles, from the one with
+        # the given counter, that siggen i keeps the same output, or None if
+        # its output never changes
+        self.siggen_runs = []
+        for values in self.siggen_values:
+            period = len(values)
+            if len(set(values)) == 1:
+                self.siggen_runs.append(None)
+                continue
+            runs = [1] * period
+            # Two laps backwards reach every run from its changing end
+            for index in range(2 * period - 1, -1, -1):
+                counter = index % period
+                next_counter = (counter + 1) % period
+                if values[next_counter] == values[counter]:
+                    runs[counter] = runs[next_counter] + 1
+                else:
+                    runs[counter] = 1
+            self.siggen_runs.append(runs)
+
+        # Every clock and siggen is back where it started after
+        # source_period cycles
+        self.source_period = 1
+        for period in self.clock_half_period + [
+                len(values) for values in self.siggen_values]:
+            self.source_period *= period // math.gcd(self.source_period,
+                                                     period)
+
+        # Gates store (kind, output slot, fan-in slots, x, y, inverse of y),
+        # following the rule in Network.execute_gate
+        self.gates = []
+        self.gate_ids = []
+        for device_kind, x, y in [
+                (devices.AND, devices.HIGH, devices.HIGH),
+                (devices.OR, devices.LOW, devices.LOW),
+                (devices.NAND, devices.HIGH, devices.LOW),
+                (devices.NOR, devices.LOW, devices.HIGH)]:
+            for device_id in self.find_devices(device_kind):
+                device = devices.get_device(device_id)
+                fanin = tuple(self.get_fanin_slot(device, input_id)
+                              for input_id in device.inputs)
+                self.gates.append((device_kind, self.get_slot(device_id, None),
+                                   fanin, x, y,
+                                   self.network.invert_signal(y)))
+                self.gate_ids.append(device_id)
+        # XOR gates store (output slot, first input slot, second input slot)
+        self.xor_gates = []
+        self.xor_ids = []
+        for device_id in self.find_devices(devices.XOR):
+            device = devices.get_device(device_id)
+            fanin = [self.get_fanin_slot(device, input_id)
+                     for input_id in device.inputs]
+            if len(fanin) != 2:
+                self.valid = False
+                continue
+            self.xor_gates.append((self.get_slot(device_id, None), fanin[0],
+                                   fanin[1]))
+            self.xor_ids.append(device_id)
+
+        # D-types are only executed in the passes in which they may change.
+        # dtype_clock_readers[slot] lists the D-types clocked by the signal
+        # in slot, which sample their DATA when it turns RISING, and
+        # dtype_level_readers[slot] those whose SET or CLEAR it drives, which
+        # may act when it changes in any other way, such as a CLEAR falling
+        # while SET is HIGH. D-types with a CLK, SET or CLEAR input driven by
+        # a gate are executed in every pass, as settle_dtypes.
+        gate_slots = {gate[1] for gate in self.gates}
+        gate_slots.update([gate[0] for gate in self.xor_gates])
+        self.dtype_clock_readers = [[] for _ in self.signals]
+        self.dtype_level_readers = [[] for _ in self.signals]
+        self.settle_dtypes = []
+        for i, (clock, set_, clear, data) in enumerate(self.dtype_inputs):
+            if None in (clock, set_, clear):  # the network is not valid
+                continue
+            if gate_slots.intersection([clock, set_, clear]):
+                self.settle_dtypes.append(i)
+                continue
+            self.dtype_clock_readers[clock].append(i)
+            for slot in {set_, clear}:
+                self.dtype_level_readers[slot].append(i)
+        # dtype_controls[i] is True if an output of D-type i drives the CLK,
+        # SET or CLEAR input of a D-type
+        self.dtype_controls = [
+            any(slot is not None and (self.dtype_clock_readers[slot] or
+                                      self.dtype_level_readers[slot])
+                for slot in outputs)
+            for outputs in self.dtype_outputs]
+
+        self.load_state()
+        return self.valid
+
+    def find_devices(self, device_kind):
+        """Return the list of device IDs of the given kind to execute.
+
+        With pruning, these are only the devices in the cone.
+        """
+        device_ids = self.devices.find_devices(device_kind)
+        if self.cone is None:
+            return device_ids
+        return [device_id for device_id in device_ids
+                if device_id in self.cone]
+
+    def get_slot(self, device_id, output_id):
+        """Return the signal slot of the given output.
+
+        Mark the compiled network as invalid if the output does not exist.
+        """
+        slot = self.slots.get((device_id, output_id))
+        if slot is None:
+            self.valid = False
+            return 0
+        return slot
+
+    def get_fanin_slot(self, device, input_id):
+        """Return the signal slot of the output connected to the given input.
+
+        Mark the compiled network as invalid if the input is unconnected.
+        """
+        connected_output = device.inputs.get(input_id)
+        if connected_output is None:
+            self.valid = False
+            return 0
+        return self.get_slot(*connected_output)
+
+    def load_state(self):
+        """Reload the D-type, clock and siggen state from the devices.
+
+        This picks up the random state set by Devices.cold_startup.
+        """
+        devices = self.devices
+        self.state_version = devices.state_version
+        signals = self.signals
+
+        self.dtype_memory = [device.dtype_memory
+                             for device in self.dtype_devices]
+        if any(memory not in [devices.LOW, devices.HIGH]
+               for memory in self.dtype_memory):
+            self.valid = False
+
+        # Clocks and siggens are not stepped every cycle. Instead, cycle
+        # counts the cycles since the state was loaded, and a timing wheel
+        # stores {cycle: (clocks, siggens)}, listing the clocks that toggle
+        # and the siggens whose output changes in each cycle, so a cycle
+        # only costs the devices that change in it. wheel_cycles is a heap
+        # of the cycles in the wheel.
+        self.cycle = 0
+        self.wheel = {}
+        self.wheel_cycles = []
+        # clock_toggles[i] is the next cycle in which clock i toggles
+        self.clock_toggles = [None] * len(self.clock_devices)
+        for i, device in enumerate(self.clock_devices):
+            signals[self.clock_slots[i]] = device.outputs[None]
+            # A clock toggles in the cycle that its counter reaches its half
+            # period
+            self.queue_clock(i, self.clock_half_period[i] + 1 -
+                             device.clock_counter)
+
+        # siggen_starts[i] is the counter of siggen i when the state was
+        # loaded, and siggen_outputs[i] its output in the current cycle.
+        # Every siggen output is set in the first cycle, which queues the
+        # siggens.
+        self.siggen_starts = [device.siggen_counter
+                              for device in self.siggen_devices]
+        self.siggen_outputs = []
+        for device, slot in zip(self.siggen_devices, self.siggen_slots):
+            signals[slot] = device.outputs[None]
+            self.siggen_outputs.append(device.outputs[None])
+        self.siggens_queued = False
+        # due_siggens lists the siggens queued for the current cycle, and
+        # siggen_changes those whose output changes in it
+        self.due_siggens = []
+        self.siggen_changes = []
+        # dtype_queue is the set of D-types to execute in the next pass. The
+        # first pass executes every D-type, as their memories may have been
+        # changed.
+        self.dtype_queue = set(range(len(self.dtype_devices)))
+        # clock_changes lists the clocks whose output may change in the
+        # current cycle
+        self.clock_changes = []
+
+    def refresh(self):
+        """Recompile or reload the state if the devices have changed."""
+        if self.structure_version != self.devices.structure_version:
+            self.compile()
+        elif self.state_version != self.devices.state_version:
+            self.load_state()
+
+    def get_output_signal(self, device_id, output_id):
+        """Return the signal level at the given output.
+
+        Return None if either of the specified IDs is invalid.
+        """
+        self.refresh()
+        slot = self.slots.get((device_id, output_id))
+        if slot is None:
+            return None
+        return self.signals[slot]
+
+    def sync_devices(self):
+        """Write the compiled signals and device state back to the devices."""
+        for (device, output_id), signal in zip(self.slot_outputs,
+                                               self.signals):
+            device.outputs[output_id] = signal
+        for device, memory in zip(self.dtype_devices, self.dtype_memory):
+            device.dtype_memory = memory
+        for device, counter in zip(self.clock_devices,
+                                   self.get_clock_counters()):
+            device.clock_counter = counter
+        for device, counter in zip(self.siggen_devices,
+                                   self.get_siggen_counters()):
+            device.siggen_counter = counter
+
+    def sync_outputs(self):
+        """Write the compiled signals back to the devices, except the clock
+        and siggen outputs."""
+        sources = [self.devices.CLOCK, self.devices.SIGGEN]
+        for (device, output_id), signal in zip(self.slot_outputs,
+                                               self.signals):
+            if device.device_kind not in sources:
+                device.outputs[output_id] = signal
+
+    def get_clock_counters(self):
+        """Return the list of clock counters, as Network.update_clocks
+        would hold them."""
+        return [half_period + 1 - (toggle_cycle - self.cycle)
+                for half_period, toggle_cycle in
+                zip(self.clock_half_period, self.clock_toggles)]
+
+    def get_siggen_counters(self):
+        """Return the list of siggen counters, as Network.update_siggen
+        would hold them."""
+        return [(start + self.cycle) % len(values) for start, values in
+                zip(self.siggen_starts, self.siggen_values)]
+
+    def get_bucket(self, cycle):
+        """Return the (clocks, siggens) lists queued for the cycle.
+
+        The lists are added to the timing wheel if they are not there yet.
+        """
+        bucket = self.wheel.get(cycle)
+        if bucket is None:
+            bucket = self.wheel[cycle] = ([], [])
+            heapq.heappush(self.wheel_cycles, cycle)
+        return bucket
+
+    def queue_clock(self, i, cycle):
+        """Queue clock i to toggle in the given cycle."""
+        self.clock_toggles[i] = cycle
+        self.get_bucket(cycle)[0].append(i)
+
+    def queue_siggen(self, i):
+        """Queue siggen i for the next cycle in which its output changes."""
+        runs = self.siggen_runs[i]
+        if runs is None:  # the output never changes
+            return
+        values = self.siggen_values[i]
+        counter = (self.siggen_starts[i] + self.cycle) % len(values)
+        self.get_bucket(self.cycle + runs[counter])[1].append(i)
+
+    def get_clock_toggles(self):
+        """Move on to the next cycle and return the clocks that toggle in it.
+
+        Return a list of the indices of the clocks. Each clock is queued
+        again for its next toggle, and the siggens queued for the cycle are
+        kept in due_siggens.
+        """
+        self.cycle += 1
+        cycle = self.cycle
+        wheel_cycles = self.wheel_cycles
+        if not wheel_cycles or wheel_cycles[0] > cycle:
+            return []
+        toggled = []
+        due_siggens = self.due_siggens
+        while wheel_cycles and wheel_cycles[0] <= cycle:
+            clocks, siggens = self.wheel.pop(heapq.heappop(wheel_cycles))
+            toggled += clocks
+            due_siggens += siggens
+        # This is queue_clock, written out for speed
+        half_periods = self.clock_half_period
+        clock_toggles = self.clock_toggles
+        wheel = self.wheel
+        for i in toggled:
+            toggle_cycle = clock_toggles[i] = cycle + half_periods[i]
+            bucket = wheel.get(toggle_cycle)
+            if bucket is None:
+                bucket = wheel[toggle_cycle] = ([], [])
+                heapq.heappush(wheel_cycles, toggle_cycle)
+            bucket[0].append(i)
+        return toggled
+
+    def update_clocks(self):
+        """If it is time to do so, set clock signals to RISING or FALLING.
+
+        This moves on to the next cycle, so it must be called before
+        update_siggen. Return a list of the indices of the clocks that
+        toggled.
+        """
+        toggled = self.get_clock_toggles()
+        if self.cycle == 1:
+            # The first cycle settles every clock output
+            self.clock_changes = range(len(self.clock_slots))
+        else:
+            self.clock_changes = toggled
+        signals = self.signals
+        HIGH = self.devices.HIGH
+        LOW = self.devices.LOW
+        # The D-types reading a clock may change when it toggles
+        dtype_queue = self.dtype_queue
+        for i in toggled:
+            slot = self.clock_slots[i]
+            if signals[slot] == HIGH:
+                signals[slot] = self.devices.FALLING
+                dtype_queue.update(self.dtype_level_readers[slot])
+            elif signals[slot] == LOW:
+                signals[slot] = self.devices.RISING
+                dtype_queue.update(self.dtype_clock_readers[slot])
+        return toggled
+
+    def update_siggen(self):
+        """Find the siggens whose output changes in this cycle.
+
+        Their new outputs are set by execute_sources. Each siggen is queued
+        again for its next change.
+        """
+        if self.siggens_queued:
+            changes = self.due_siggens
+        else:
+            # The first cycle sets every siggen output
+            changes = list(range(len(self.siggen_devices)))
+            self.siggens_queued = True
+        self.due_siggens = []
+        self.siggen_changes = changes
+        if not changes:
+            return
+
+        # This is queue_siggen, written out for speed
+        cycle = self.cycle
+        outputs = self.siggen_outputs
+        starts = self.siggen_starts
+        siggen_values = self.siggen_values
+        siggen_runs = self.siggen_runs
+        wheel = self.wheel
+        for i in changes:
+            values = siggen_values[i]
+            counter = (starts[i] + cycle) % len(values)
+            outputs[i] = values[counter]
+            runs = siggen_runs[i]
+            if runs is None:  # the output never changes
+                continue
+            change_cycle = cycle + runs[counter]
+            bucket = wheel.get(change_cycle)
+            if bucket is None:
+                bucket = wheel[change_cycle] = ([], [])
+                heapq.heappush(self.wheel_cycles, change_cycle)
+            bucket[1].append(i)
+
+    def get_quiet_cycles(self, cycles):
+        """Return how many of the next cycles are quiet, at most cycles.
+
+        A quiet cycle is one in which no clock toggles, no siggen output
+        changes and every switch output already matches its switch state.
+        """
+        self.refresh()
+        # The first cycle after loading the state sets every siggen output
+        if not self.valid or not self.siggens_queued:
+            return 0
+        signals = self.signals
+        for device, slot in self.switches:
+            if device.switch_state != signals[slot]:
+                return 0
+        next_cycle = self.cycle + cycles + 1
+        if self.wheel_cycles:
+            next_cycle = min(next_cycle, self.wheel_cycles[0])
+        return max(next_cycle - self.cycle - 1, 0)
+
+    def skip_quiet_cycles(self, cycles):
+        """Run up to cycles of the next quiet cycles at once.
+
+        The first quiet cycle is executed as usual. Its sources do not
+        change, so the signals it settles to are left unchanged by the
+        cycles after it, which only need their clock and siggen counters
+        moved on. Return the number of cycles run, which may be 0, or None if
+        the network oscillates.
+        """
+        quiet_cycles = self.get_quiet_cycles(cycles)
+        if quiet_cycles < 2:
+            return 0
+        if not self.execute_network():
+            return None
+        # Nothing is queued before the end of the quiet cycles
+        self.cycle += quiet_cycles - 1
+        return quiet_cycles
+
+    def get_state_key(self):
+        """Return a key that is equal for equal states of the network.
+
+        The state is made of the signals, the D-type memories and the clock
+        and siggen counters. With the same switch states, two cycles that
+        end in the same state are followed by the same signals. The
+        counters repeat every source_period cycles, so they are given by
+        the cycle within that period. Keys are only comparable until the
+        state is loaded again.
+
+        The state just loaded is never matched: a cold startup may leave a
+        clock a cycle further from its first toggle than it is from any
+        later one, so the counters are only given by the cycle from the
+        first cycle on.
+        """
+        self.refresh()
+        phase = self.cycle % self.source_period if self.cycle else None
+        return (bytes(self.signals), bytes(self.dtype_memory), phase)
+
+    def execute_sources(self):
+        """Execute the switches, D-types, clocks and siggens once.
+
+        Return True if no signal changed.
+        """
+        signals = self.signals
+        update_table = self.update_table
+        LOW = self.devices.LOW
+        HIGH = self.devices.HIGH
+        RISING = self.devices.RISING
+        FALLING = self.devices.FALLING
+        clock_readers = self.dtype_clock_readers
+        level_readers = self.dtype_level_readers
+        dtype_queue = self.dtype_queue
+        steady_state = True
+
+        for device, slot in self.switches:
+            signal = signals[slot]
+            if device.switch_state == LOW:
+                new_signal = update_table[signal][LOW]
+            else:
+                new_signal = update_table[signal][HIGH]
+            if new_signal != signal:
+                signals[slot] = new_signal
+                steady_state = False
+                if new_signal == RISING:
+                    dtype_queue.update(clock_readers[slot])
+                else:
+                    dtype_queue.update(level_readers[slot])
+
+        # Execute D-types before clocks to catch the rising edge of the clock
+        if dtype_queue or self.settle_dtypes:
+            if not self.execute_dtypes():
+                steady_state = False
+        dtype_queue = self.dtype_queue
+
+        clock_slots = self.clock_slots
+        for i in self.clock_changes:
+            slot = clock_slots[i]
+            signal = signals[slot]
+            if signal == RISING:
+                signals[slot] = HIGH
+                steady_state = False
+                dtype_queue.update(level_readers[slot])
+            elif signal == FALLING:
+                signals[slot] = LOW
+                steady_state = False
+
+        # Siggens set their output directly, so they never unsettle a pass
+        siggen_slots = self.siggen_slots
+        siggen_outputs = self.siggen_outputs
+        for i in self.siggen_changes:
+            slot = siggen_slots[i]
+            if signals[slot] != siggen_outputs[i]:
+                signals[slot] = siggen_outputs[i]
+                dtype_queue.update(level_readers[slot])
+
+        return steady_state
+
+    def execute_dtypes(self):
+        """Execute the queued D-types and settle_dtypes once, in order.
+
+        A D-type whose CLK, SET and CLEAR inputs do not change, and whose
+        outputs match its memory, is left unchanged by executing it. So a
+        D-type is only executed when its CLK turns RISING or its SET or
+        CLEAR changes, and then while its outputs move towards its memory.
+        The D-types are executed together, before the gates. A D-type that
+        changes an output queues the D-types it drives later in the same pass
+        if they come after it, and in the next pass otherwise, as in a full
+        sweep. Return True if no signal changed.
+        """
+        signals = self.signals
+        update_table = self.update_table
+        LOW = self.devices.LOW
+        HIGH = self.devices.HIGH
+        RISING = self.devices.RISING
+        FALLING = self.devices.FALLING
+        clock_readers = self.dtype_clock_readers
+        level_readers = self.dtype_level_readers
+        dtype_inputs = self.dtype_inputs
+        dtype_outputs = self.dtype_outputs
+        memories = self.dtype_memory
+        dtype_controls = self.dtype_controls
+        steady_state = True
+
+        queued = self.dtype_queue
+        queued.update(self.settle_dtypes)
+        queue = sorted(queued)
+        next_queue = set()
+        position = 0
+        queue_length = len(queue)
+        while position < queue_length:
+            i = queue[position]
+            position += 1
+            clock, set_, clear, data = dtype_inputs[i]
+            memory = memories[i]
+            if signals[clock] == RISING:
+                if signals[data] in (HIGH, FALLING):
+                    memory = HIGH
+                else:
+                    memory = LOW
+            if signals[set_] == HIGH:
+                memory = HIGH
+            if signals[clear] == HIGH:
+                memory = LOW
+            memories[i] = memory
+            q, qbar = dtype_outputs[i]
+            q_signal = signals[q]
+            qbar_signal = signals[qbar]
+            new_q = update_table[q_signal][memory]
+            new_qbar = update_table[qbar_signal][HIGH - memory]
+            if new_q == q_signal and new_qbar == qbar_signal:
+                continue
+            signals[q] = new_q
+            signals[qbar] = new_qbar
+            steady_state = False
+            if new_q != memory or new_qbar != HIGH - memory:
+                # The outputs have not reached the memory yet
+                next_queue.add(i)
+            if not dtype_controls[i]:  # no D-type is driven by its outputs
+                continue
+
+            for slot, signal, new_signal in ((q, q_signal, new_q),
+                                             (qbar, qbar_signal, new_qbar)):
+                if new_signal == signal:
+                    continue
+                if new_signal == RISING:
+                    readers = clock_readers[slot]
+                else:
+                    readers = level_readers[slot]
+                for reader in readers:
+                    if reader <= i:
+                        next_queue.add(reader)
+                    elif reader not in queued:
+                        queued.add(reader)
+                        bisect.insort(queue, reader, position)
+                        queue_length += 1
+        self.dtype_queue = next_queue
+        return steady_state
+
+    def execute_pass(self):
+        """Execute every device once, in the order of execute_network.
+
+        Return True if no signal changed.
+        """
+        signals = self.signals
+        update_table = self.update_table
+        LOW = self.devices.LOW
+        HIGH = self.devices.HIGH
+        steady_state = self.execute_sources()
+
+        for device_kind, out, fanin, x, y, not_y in self.gates:
+            target = y
+            for slot in fanin:
+                if signals[slot] != x:
+                    target = not_y
+                    break
+            signal = signals[out]
+            new_signal = update_table[signal][target]
+            if new_signal != signal:
+                signals[out] = new_signal
+                steady_state = False
+
+        for out, first, second in self.xor_gates:
+            if signals[first] == signals[second]:
+                target = LOW
+            else:
+                target = HIGH
+            signal = signals[out]
+            new_signal = update_table[signal][target]
+            if new_signal != signal:
+                signals[out] = new_signal
+                steady_state = False
+
+        return steady_state
+
+    def execute_network(self):
+        """Execute all the devices in the network for one simulation cycle.
+
+        Return True if successful and the network does not oscillate.
+        """
+        self.refresh()
+        if not self.valid:
+            return False
+
+        self.update_clocks()
+        self.update_siggen()
+
+        for _ in range(self.iteration_limit):
+            if self.execute_pass():
+                return True
+        return False
+
+
+class EventDrivenNetwork(CompiledNetwork):
+    """Only re-execute devices whose inputs have changed.
+
+    Devices are numbered in the order that CompiledNetwork executes them, and
+    a fanout map records which devices read each signal slot. A device is
+    executed again only if one of its inputs, its own output or its internal
+    state has changed since it was last executed; executing any other device
+    would leave the signals unchanged. When a device changes an output, the
+    devices reading it are executed later in the same pass if they come after
+    it in the order, and in the next pass otherwise, just as in a full sweep.
+    This gives traces identical to the sweep engine.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    compile(self): Flattens the network into arrays and builds the fanout
+                   map.
+
+    load_state(self): Reloads the device state and schedules every device.
+
+    get_state_key(self): Returns a key that is equal for equal states of the
+                         network.
+
+    execute_pass(self): Executes the scheduled devices once.
+
+    execute_network(self): Executes the devices that need it for one
+                           simulation cycle.
+    """
+
+    def compile(self):
+        """Flatten the network into arrays and build the fanout map.
+
+        Return True if every input in the network is connected.
+        """
+        valid = super().compile()
+
+        # Devices are numbered switches, D-types, clocks, siggens, gates,
+        # XOR gates
+        self.first_dtype = len(self.switches)
+        self.first_clock = self.first_dtype + len(self.dtype_inputs)
+        self.first_siggen = self.first_clock + len(self.clock_slots)
+        self.first_gate = self.first_siggen + len(self.siggen_slots)
+        self.first_xor = self.first_gate + len(self.gates)
+
+        # fanout[slot] lists the devices that read the signal in slot
+        fanout = [[] for _ in self.signals]
+        for i, inputs in enumerate(self.dtype_inputs):
+            for slot in set(inputs):
+                fanout[slot].append(self.first_dtype + i)
+        for i, gate in enumerate(self.gates):
+            for slot in set(gate[2]):
+                fanout[slot].append(self.first_gate + i)
+        for i, (out, first, second) in enumerate(self.xor_gates):
+            for slot in {first, second}:
+                fanout[slot].append(self.first_xor + i)
+        self.fanout = fanout
+        return valid
+
+    def load_state(self):
+        """Reload the device state and schedule every device."""
+        super().load_state()
+        device_count = (len(self.switches) + len(self.dtype_inputs) +
+                        len(self.clock_slots) + len(self.siggen_slots) +
+                        len(self.gates) + len(self.xor_gates))
+        # scheduled lists the devices to execute in the next pass
+        self.scheduled = list(range(device_count))
+
+    def get_state_key(self):
+        """Return a key that is equal for equal states of the network.
+
+        The devices scheduled for the next pass are part of the state.
+        """
+        return super().get_state_key() + (frozenset(self.scheduled),)
+
+    def execute_pass(self):
+        """Execute the scheduled devices once, in order.
+
+        Return True if no signal changed.
+        """
+        signals = self.signals
+        update_table = self.update_table
+        fanout = self.fanout
+        LOW = self.devices.LOW
+        HIGH = self.devices.HIGH
+        RISING = self.devices.RISING
+        FALLING = self.devices.FALLING
+        first_dtype = self.first_dtype
+        first_clock = self.first_clock
+        first_siggen = self.first_siggen
+        first_gate = self.first_gate
+        first_xor = self.first_xor
+        steady_state = True
+
+        queue = self.scheduled
+        heapq.heapify(queue)
+        queued = set(queue)
+        scheduled = []
+        next_queued = set()
+
+        while queue:
+            node = heapq.heappop(queue)
+            changed = []  # slots whose signal changed
+
+            if node >= first_xor:
+                out, first, second = self.xor_gates[node - first_xor]
+                if signals[first] == signals[second]:
+                    target = LOW
+                else:
+                    target = HIGH
+                signal = signals[out]
+                new_signal = update_table[signal][target]
+                if new_signal != signal:
+                    signals[out] = new_signal
+                    changed.append(out)
+
+            elif node >= first_gate:
+                (device_kind, out, fanin, x, y,
+                 not_y) = self.gates[node - first_gate]
+                target = y
+                for slot in fanin:
+                    if signals[slot] != x:
+                        target = not_y
+                        break
+                signal = signals[out]
+                new_signal = update_table[signal][target]
+                if new_signal != signal:
+                    signals[out] = new_signal
+                    changed.append(out)
+
+            elif node >= first_siggen:
+                i = node - first_siggen
+                slot = self.siggen_slots[i]
+                new_signal = self.siggen_outputs[i]
+                if new_signal != signals[slot]:
+                    signals[slot] = new_signal
+                    # Siggens never unsettle a pass, so only their readers
+                    # are scheduled
+                    for reader in fanout[slot]:
+                        if reader > node:
+                            if reader not in queued:
+                                queued.add(reader)
+                                heapq.heappush(queue, reader)
+                        elif reader not in next_queued:
+                            next_queued.add(reader)
+                            scheduled.append(reader)
+
+            elif node >= first_clock:
+                slot = self.clock_slots[node - first_clock]
+                signal = signals[slot]
+                if signal == RISING:
+                    signals[slot] = HIGH
+                    changed.append(slot)
+                elif signal == FALLING:
+                    signals[slot] = LOW
+                    changed.append(slot)
+
+            elif node >= first_dtype:
+                i = node - first_dtype
+                clock, set_, clear, data = self.dtype_inputs[i]
+                memory = self.dtype_memory[i]
+                if signals[clock] == RISING:
+                    if signals[data] in (HIGH, FALLING):
+                        memory = HIGH
+                    else:
+                        memory = LOW
+                if signals[set_] == HIGH:
+                    memory = HIGH
+                if signals[clear] == HIGH:
+                    memory = LOW
+                self.dtype_memory[i] = memory
+                q, qbar = self.dtype_outputs[i]
+                signal = signals[q]
+                new_signal = update_table[signal][memory]
+                if new_signal != signal:
+                    signals[q] = new_signal
+                    changed.append(q)
+                signal = signals[qbar]
+                new_signal = update_table[signal][HIGH - memory]
+                if new_signal != signal:
+                    signals[qbar] = new_signal
+                    changed.append(qbar)
+
+            else:
+                device, slot = self.switches[node]
+                signal = signals[slot]
+                if device.switch_state == LOW:
+                    new_signal = update_table[signal][LOW]
+                else:
+                    new_signal = update_table[signal][HIGH]
+                if new_signal != signal:
+                    signals[slot] = new_signal
+                    changed.append(slot)
+
+            if changed:
+                steady_state = False
+                # The device itself may not have reached its target yet
+                if node not in next_queued:
+                    next_queued.add(node)
+                    scheduled.append(node)
+                for slot in changed:
+                    for reader in fanout[slot]:
+                        if reader > node:
+                            if reader not in queued:
+                                queued.add(reader)
+                                heapq.heappush(queue, reader)
+                        elif reader not in next_queued:
+                            next_queued.add(reader)
+                            scheduled.append(reader)
+
+        self.scheduled = scheduled
+        return steady_state
+
+    def execute_network(self):
+        """Execute the devices that need it for one simulation cycle.
+
+        Return True if successful and the network does not oscillate.
+        Devices left scheduled at the end of a cycle are executed in the first
+        pass of the next one.
+        """
+        self.refresh()
+        if not self.valid:
+            return False
+
+        scheduled = set(self.scheduled)
+        # Switch states may have been changed by Devices.set_switch
+        scheduled.update(range(len(self.switches)))
+        for i in self.update_clocks():
+            scheduled.add(self.first_clock + i)
+            scheduled.update(self.fanout[self.clock_slots[i]])
+        self.update_siggen()
+        for i in self.siggen_changes:
+            scheduled.add(self.first_siggen + i)
+        self.scheduled = list(scheduled)
+
+        for _ in range(self.iteration_limit):
+            if self.execute_pass():
+                return True
+        return False
+
+
+def find_components(successors):
+    """Return the strongly connected components of a directed graph.
+
+    successors[node] lists the nodes that node has an edge to. The components
+    are lists of nodes, returned in topological order, so that every edge
+    between two components points to a later component. This is Tarjan's
+    algorithm, written with an explicit stack to avoid the recursion limit.
+    """
+    node_count = len(successors)
+    index = [None] * node_count
+    lowlink = [0] * node_count
+    on_stack = [False] * node_count
+    stack = []
+    components = []
+    counter = 0
+    for root in range(node_count):
+        if index[root] is not None:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]
+        while work:
+            node, i = work[-1]
+            if i < len(successors[node]):
+                work[-1] = (node, i + 1)
+                successor = successors[node][i]
+                if index[successor] is None:
+                    index[successor] = lowlink[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append((successor, 0))
+                elif on_stack[successor]:
+                    lowlink[node] = min(lowlink[node], index[successor])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    # Tarjan's algorithm finds the components in reverse topological order
+    components.reverse()
+    return components
+
+
+class LevelizedNetwork(CompiledNetwork):
+    """Execute the gates in topological order.
+
+    The switches, D-types, clocks and siggens are sources, and are executed
+    first, as in CompiledNetwork. The gates are then sorted so that every gate
+    comes after the gates driving its inputs. Gates read RISING as HIGH and
+    FALLING as LOW, so a chain of gates of any depth reaches its new levels
+    in a single pass, and the next pass only completes the transitions.
+
+    Gates in a feedback loop, such as a latch made of two NAND gates, form a
+    strongly connected component of the gate graph. Only these gates are
+    executed repeatedly, until they settle, each time the pass reaches them.
+
+    The other engines, like the sweep, read a RISING or FALLING input as
+    neither HIGH nor LOW. Without feedback loops this only changes how many
+    passes are needed, but inside a loop the two can settle to different
+    states. In particular, if two paths of a loop change together, each gate
+    already sees the other's new level, and the levelized engine can report
+    an oscillation where the sweep settles.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    compile(self): Flattens the network into arrays and sorts the gates.
+
+    make_schedule(self): Builds the list of gates to execute in each pass.
+
+    execute_gates(self, gates, repeats=1): Executes the gates in order until
+                                           they settle.
+
+    execute_pass(self): Executes the sources, then the gates in topological
+                        order.
+
+    execute_network(self): Executes all the devices in the network for one
+                           simulation cycle.
+    """
+
+    def compile(self):
+        """Flatten the network into arrays and sort the gates.
+
+        Return True if every input in the network is connected. Afterwards,
+        gate_levels stores {device_id: level}, where sources are at level 0
+        and every gate is one level above its deepest input, and
+        feedback_loops lists the device IDs of each strongly connected
+        component of gates.
+        """
+        valid = super().compile()
+        devices = self.devices
+
+        # Gates store (output slot, fan-in slots, x, y, inverse of y), with
+        # x set to None for XOR gates
+        gates = [(out, fanin, x, y, not_y)
+                 for device_kind, out, fanin, x, y, not_y in self.gates]
+        gates += [(out, (first, second), None, devices.HIGH, devices.LOW)
+                  for out, first, second in self.xor_gates]
+        gate_ids = self.gate_ids + self.xor_ids
+
+        # driver[slot] is the gate driving the signal in slot, if any
+        driver = [None] * len(self.signals)
+        for i, gate in enumerate(gates):
+            driver[gate[0]] = i
+        successors = [[] for _ in gates]
+        for i, gate in enumerate(gates):
+            for slot in set(gate[1]):
+                if driver[slot] is not None:
+                    successors[driver[slot]].append(i)
+
+        # components stores (gate indices, is_loop, level) for each strongly
+        # connected component, in topological order
+        self.levelized_gates = gates
+        self.components = []
+        self.feedback_loops = []
+        self.gate_levels = {}
+        levels = [0] * len(gates)
+        for component in find_components(successors):
+            component.sort()
+            members = set(component)
+            level = 1 + max([levels[driver[slot]] for i in component
+                             for slot in gates[i][1]
+                             if driver[slot] is not None and
+                             driver[slot] not in members] + [0])
+            for i in component:
+                levels[i] = level
+                self.gate_levels[gate_ids[i]] = level
+            is_loop = len(component) > 1 or component[0] in successors[
+                component[0]]
+            if is_loop:
+                self.feedback_loops.append([gate_ids[i] for i in component])
+            self.components.append((component, is_loop, level))
+        self.make_schedule()
+        return valid
+
+    def make_schedule(self):
+        """Build the list of gates to execute in each pass.
+
+        schedule stores (gates, is_loop). Consecutive gates outside loops are
+        merged into a single entry.
+        """
+        gates = self.levelized_gates
+        self.schedule = []
+        for component, is_loop, level in self.components:
+            if is_loop:
+                self.schedule.append(([gates[i] for i in component], True))
+            elif self.schedule and not self.schedule[-1][1]:
+                self.schedule[-1][0].append(gates[component[0]])
+            else:
+                self.schedule.append(([gates[component[0]]], False))
+
+    def execute_gates(self, gates, repeats=1):
+        """Execute the gates in order until they settle, at most repeats times.
+
+        Return True if no signal changed, False if the gates settled after
+        changing, and None if they were still changing after the last repeat.
+        """
+        signals = self.signals
+        update_table = self.update_table
+        LOW = self.devices.LOW
+        HIGH = self.devices.HIGH
+        # level[signal] is HIGH for HIGH and RISING, and LOW otherwise
+        level = [LOW, HIGH, HIGH, LOW]
+        steady_state = True
+        for _ in range(repeats):
+            settled = True
+            for out, fanin, x, y, not_y in gates:
+                if x is None:  # XOR gate
+                    if level[signals[fanin[0]]] == level[signals[fanin[1]]]:
+                        target = LOW
+                    else:
+                        target = HIGH
+                else:
+                    target = y
+                    for slot in fanin:
+                        if level[signals[slot]] != x:
+                            target = not_y
+                            break
+                signal = signals[out]
+                new_signal = update_table[signal][target]
+                if new_signal != signal:
+                    signals[out] = new_signal
+                    settled = False
+            if settled:
+                return steady_state
+            steady_state = False
+        return None
+
+    def execute_pass(self):
+        """Execute the sources, then the gates in topological order.
+
+        Return True if no signal changed, and None if a feedback loop does not
+        settle within the iteration limit.
+        """
+        steady_state = self.execute_sources()
+        for gates, is_loop in self.schedule:
+            if is_loop:
+                settled = self.execute_gates(gates, self.iteration_limit)
+                if settled is None:
+                    return None
+            else:
+                settled = self.execute_gates(gates)
+            if not settled:
+                steady_state = False
+        return steady_state
+
+    def execute_network(self):
+        """Execute all the devices in the network for one simulation cycle.
+
+        Return True if successful and the network does not oscillate.
+        """
+        self.refresh()
+        if not self.valid:
+            return False
+
+        self.update_clocks()
+        self.update_siggen()
+
+        for _ in range(self.iteration_limit):
+            steady_state = self.execute_pass()
+            if steady_state is None:
+                return False
+            if steady_state:
+                return True
+        return False
@@ -39,6 +39,7 @@ class Device:
         self.device_kind = None
         self.clock_half_period = None
         self.siggen_pulse = None
+        self.siggen_signals = None
         self.clock_counter = None
         self.switch_state = None
         self.dtype_memory = None
@@ -58,10 +59,10 @@ class Devices:
     Public methods
     --------------
     get_device(self, device_id): Returns the Device object corresponding
-                                 to the device ID.
+                                 to the device ID, using the device index.
 
-    find_devices(self, device_kind=None): Returns a list of device_ids of
-                                          the specified device_kind.
+    find_devices(self, device_kind=None): Returns a cached list of device_ids
+                                          of the specified device_kind.
 
     add_device(self, device_id, device_kind): Adds the specified device to the
                                               network.
@@ -92,10 +93,23 @@ class Devices:
 
     make_d_type(self, device_id): Makes a D-type device.
 
-    cold_startup(self): Simulates cold start-up of D-types and clocks.
+    cold_startup(self, rng=random): Simulates cold start-up of D-types and
+                                    clocks.
 
     make_device(self, device_id, device_kind, device_property=None): Creates
                        the specified device and returns errors if unsuccessful.
+
+    request_startup(self): Does a cold start-up now, or at the end of the
+                           open batch.
+
+    start_batch(self): Defers the cold start-up of new devices until
+                       end_batch is called.
+
+    end_batch(self): Does one cold start-up for the devices made since
+                     start_batch.
+
+    make_devices(self, device_specs): Creates many devices in one batch and
+                                      returns the list of their errors.
     """
 
     def __init__(self, names):
@@ -104,6 +118,26 @@ class Devices:
         self.names = names
 
         self.devices_list = []
+        # device_index stores {device_id: Device}
+        self.device_index = {}
+        # kind_index stores {device_kind: [device_id, ...]} in the order the
+        # devices were added, so find_devices does not rebuild its lists
+        self.kind_index = {}
+
+        # Incremented whenever devices, ports or connections are added, and
+        # whenever cold_startup reinitialises the device state, so that a
+        # compiled copy of the network knows when to refresh itself
+        self.structure_version = 0
+        self.state_version = 0
+
+        # While a batch is open, making a clock, siggen or D-type only marks
+        # the cold start-up as pending, so that building n devices does one
+        # cold start-up rather than n
+        self.batch_open = False
+        self.startup_pending = False
+        # gate_input_ids stores the IDs of I1, I2, ... as they are first
+        # needed, so each gate does not look up its input names again
+        self.gate_input_ids = []
 
         gate_strings = ["AND", "OR", "NAND", "NOR", "XOR"]
         device_strings = ["CLOCK", "SWITCH", "DTYPE", "SIGGEN"]
@@ -129,31 +163,28 @@ class Devices:
 
     def get_device(self, device_id):
         """Return the Device object corresponding to device_id."""
-        for device in self.devices_list:
-            if device.device_id == device_id:
-                return device
-        return None
+        return self.device_index.get(device_id)
 
     def find_devices(self, device_kind=None):
         """Return a list of device IDs of the specified device_kind.
 
         Return a list of all device IDs in the network if no device_kind is
-        specified.
+        specified. The returned list is cached, so callers must not modify it.
         """
-        device_id_list = []
-        for device in self.devices_list:
-            if device_kind is None:
-                device_id_list.append(device.device_id)
-            elif device.device_kind == device_kind:
-                device_id_list.append(device.device_id)
-        return device_id_list
+        if device_kind is None:
+            return self.kind_index.setdefault(None, [])
+        return self.kind_index.get(device_kind, [])
 
     def add_device(self, device_id, device_kind):
         """Add the specified device to the network."""
         new_device = Device(device_id)
         new_device.device_kind = device_kind
         self.devices_list.append(new_device)
-
+        # keep the first device if an ID is reused, as the list scan did
+        self.device_index.setdefault(device_id, new_device)
+        self.kind_index.setdefault(None, []).append(device_id)
+        self.kind_index.setdefault(device_kind, []).append(device_id)
+        self.structure_version += 1
 
     def add_input(self, device_id, input_id):
         """Add the specified input to the specified device.
@@ -162,7 +193,9 @@ class Devices:
         """
         device = self.get_device(device_id)
         if device is not None:
-            device.inputs.setdefault(input_id)
+            if input_id not in device.inputs:
+                device.inputs[input_id] = None
+                self.structure_version += 1
             return True
         else:
             return False
@@ -174,6 +207,8 @@ class Devices:
         """
         device = self.get_device(device_id)
         if device is not None:
+            if output_id not in device.outputs:
+                self.structure_version += 1
             device.outputs[output_id] = signal
             return True
         else:
@@ -241,23 +276,27 @@ class Devices:
         self.add_device(device_id, self.CLOCK)
         device = self.get_device(device_id)
         device.clock_half_period = clock_half_period
-        self.cold_startup()  # clock initialised to a random point in its cycle
+        self.request_startup()  # clock starts at a random point in its cycle
 
     def make_siggen(self, device_id, siggen_pulse):
         """Make a siggen device with the specified pulse"""
         self.add_device(device_id, self.SIGGEN)
         device = self.get_device(device_id)
         device.siggen_pulse = siggen_pulse
-        self.cold_startup()  # clock initialised to a random point in its cycle
+        # The pulse is decoded once, not every time the siggen is executed
+        device.siggen_signals = [int(bit) for bit in str(siggen_pulse)]
+        self.request_startup()  # siggen starts at a random point in its cycle
 
     def make_gate(self, device_id, device_kind, no_of_inputs):
         """Make logic gates with the specified number of inputs."""
         self.add_device(device_id, device_kind)
         self.add_output(device_id, output_id=None)
 
-        for input_number in range(1, no_of_inputs + 1):
+        input_ids = self.gate_input_ids
+        for input_number in range(len(input_ids) + 1, no_of_inputs + 1):
             input_name = "".join(["I", str(input_number)])
-            [input_id] = self.names.lookup([input_name])
+            input_ids.extend(self.names.lookup([input_name]))
+        for input_id in input_ids[:no_of_inputs]:
             self.add_input(device_id, input_id)
 
     def make_d_type(self, device_id):
@@ -267,7 +306,7 @@ class Devices:
             self.add_input(device_id, input_id)
         for output_id in self.dtype_output_ids:
             self.add_output(device_id, output_id)
-        self.cold_startup()  # D-type initialised to a random state
+        self.request_startup()  # D-type initialised to a random state
         print("DTYPE made")
 
     def is_bin_num(self, num):
@@ -276,32 +315,52 @@ class Devices:
                 return False
         return True
 
-    def cold_startup(self):
+    def request_startup(self):
+        """Do a cold start-up now, or at the end of the open batch."""
+        if self.batch_open:
+            self.startup_pending = True
+        else:
+            self.cold_startup()
+
+    def start_batch(self):
+        """Defer the cold start-up of new devices until end_batch is called.
+        """
+        self.batch_open = True
+
+    def end_batch(self):
+        """Close the batch, doing one cold start-up if any was deferred."""
+        self.batch_open = False
+        if self.startup_pending:
+            self.startup_pending = False
+            self.cold_startup()
+
+    def cold_startup(self, rng=random):
         """Simulate cold start-up of D-types and clocks.
 
         Set the memory of the D-types to a random state and make the clocks
-        begin from a random point in their cycles.
+        begin from a random point in their cycles. rng is the random number
+        generator to use, such as a seeded random.Random() instance, so that
+        a cold start can be repeated.
         """
+        self.state_version += 1
         for device in self.devices_list:
             if device.device_kind == self.D_TYPE:
-                device.dtype_memory = random.choice([self.LOW, self.HIGH])
+                device.dtype_memory = rng.choice([self.LOW, self.HIGH])
 
             elif device.device_kind == self.CLOCK:
-                clock_signal = random.choice([self.LOW, self.HIGH])
+                clock_signal = rng.choice([self.LOW, self.HIGH])
                 self.add_output(device.device_id, output_id=None,
                                 signal=clock_signal)
                 # Initialise it to a random point in its cycle.
                 device.clock_counter = \
-                    random.randrange(device.clock_half_period)
+                    rng.randrange(device.clock_half_period)
 
             elif device.device_kind == self.SIGGEN:
-                clock_signal = random.choice([self.LOW, self.HIGH])
+                clock_signal = rng.choice([self.LOW, self.HIGH])
                 # Initialise it to a random point in its cycle.
-                device.siggen_period = len(str(device.siggen_pulse))
+                device.siggen_period = len(device.siggen_signals)
                 device.siggen_counter = \
-                    random.randrange(device.siggen_period)
-
-                siggen_signal = int(str(device.siggen_pulse)[device.siggen_counter])
+                    rng.randrange(device.siggen_period)
 
                 self.add_output(device.device_id, output_id=None,
                                 signal=clock_signal)
@@ -373,3 +432,19 @@ class Devices:
             error_type = self.BAD_DEVICE
 
         return error_type
+
+    def make_devices(self, device_specs):
+        """Create many devices in one batch.
+
+        device_specs is an iterable of (device_id, device_kind,
+        device_property) tuples, as taken by make_device. The cold start-up
+        is done once, after all the devices are made. Return the list of
+        make_device results, in the same order.
+        """
+        self.start_batch()
+        try:
+            return [self.make_device(device_id, device_kind, device_property)
+                    for device_id, device_kind, device_property
+                    in device_specs]
+        finally:
+            self.end_batch()
@@ -0,0 +1,260 @@
+"""Run the same network from many seeded cold starts.
+
+Used in the Logic Simulator project to find how the random cold start-up of
+D-types, clocks and siggens changes the behaviour of a network, such as a
+flip-flop that may settle either way.
+
+Classes
+-------
+Ensemble - runs the network from many cold starts and summarises the traces.
+"""
+import multiprocessing
+import random
+
+from compiled import CompiledNetwork
+from bitparallel import BitParallelNetwork
+
+
+class Ensemble:
+    """Run the network from many cold starts and summarise the traces.
+
+    Each run is given a seed, and its cold start is made by
+    Devices.cold_startup with a random.Random(seed) generator, so any run
+    can be repeated. Every run starts from the signals the network holds
+    when run is called, and records the monitored outputs for the given
+    number of cycles. As in UserInterface.run_network, the traces of a run
+    stop at the first cycle in which it oscillates.
+
+    The runs give the same traces whichever way they are made: one after
+    another, shared between processes, or bit-parallel. Bit-parallel runs
+    give each cold start a bit lane, and run together the cold starts whose
+    clocks and siggens begin at the same points in their cycles, with the
+    same siggen outputs.
+
+    The network is left in the cold start of the last seed.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+
+    Public methods
+    --------------
+    run(self, seeds, cycles, processes=1, bit_parallel=False): Returns the
+                                         monitored traces of each cold start.
+
+    start_runs(self): Records the signals that every run starts from.
+
+    run_seeds(self, seeds, cycles): Runs the cold starts one after another.
+
+    run_bit_parallel(self, seeds, cycles): Runs the cold starts in bit
+                                           lanes.
+
+    get_high_probabilities(self, results): Returns the fraction of runs in
+                                  which each monitored output is HIGH, for
+                                  each cycle.
+
+    get_outcome_classes(self, seeds, results): Returns the seeds grouped by
+                                               the traces they give.
+    """
+
+    def __init__(self, names, devices, network, monitors):
+        """Initialise the engines and the starting signals."""
+        self.names = names
+        self.devices = devices
+        self.network = network
+        self.monitors = monitors
+
+        self.engine = CompiledNetwork(names, devices, network)
+        self.start_signals = None
+
+    def run(self, seeds, cycles, processes=1, bit_parallel=False):
+        """Return the monitored traces of the cold start made by each seed.
+
+        The runs are shared out between the given number of processes, or
+        run bit-parallel in this process. Return a list with one dictionary
+        of {(device_id, output_id): [signal_list]} for each seed, or None if
+        the network is not valid.
+        """
+        seeds = list(seeds)
+        self.start_runs()
+        if bit_parallel:
+            return self.run_bit_parallel(seeds, cycles)
+        processes = min(processes, len(seeds))
+        if processes <= 1:
+            return self.run_seeds(seeds, cycles)
+
+        # Give each process one share of the seeds, in order
+        shares = [seeds[i::processes] for i in range(processes)]
+        with multiprocessing.Pool(processes, start_worker, (self,)) as pool:
+            share_results = pool.starmap(
+                run_worker_seeds, [(share, cycles) for share in shares])
+        if None in share_results:
+            return None
+        results = [None] * len(seeds)
+        for i, share in enumerate(share_results):
+            results[i::processes] = share
+        return results
+
+    def start_runs(self):
+        """Record the signals that every run starts from.
+
+        These are the signals held by the network now.
+        """
+        if self.network.engine is not None:
+            self.network.engine.refresh()
+        self.network.sync_devices()
+        self.start_signals = {
+            (device_id, output_id): signal
+            for device_id in self.devices.find_devices()
+            for output_id, signal in
+            self.devices.get_device(device_id).outputs.items()}
+
+    def run_seeds(self, seeds, cycles):
+        """Run the cold start made by each seed, one after another.
+
+        start_runs must be called first. Return the list of traces, as for
+        run, or None if the network is not valid.
+        """
+        engine = self.engine
+        engine.refresh()
+        if not engine.valid:
+            return None
+        start_signals = [self.start_signals[(device.device_id, output_id)]
+                         for device, output_id in engine.slot_outputs]
+        outputs = list(self.monitors.monitors_dictionary)
+        slots = [engine.slots[output] for output in outputs]
+
+        results = []
+        for seed in seeds:
+            engine.signals = list(start_signals)
+            self.devices.cold_startup(random.Random(seed))
+            engine.load_state()
+            signals = engine.signals
+            traces = [[] for _ in outputs]
+            for _ in range(cycles):
+                if not engine.execute_network():
+                    break
+                for trace, slot in zip(traces, slots):
+                    trace.append(signals[slot])
+            results.append(dict(zip(outputs, traces)))
+        return results
+
+    def run_bit_parallel(self, seeds, cycles):
+        """Run the cold starts made by the seeds in bit lanes.
+
+        Cold starts whose clock and siggen counters and siggen outputs are the
+        same are run together, one bit lane each. start_runs must be called
+        first. Return the list of traces, as for run, or None if the network
+        is not valid.
+        """
+        engine = BitParallelNetwork(self.names, self.devices, self.network)
+        engine.refresh()
+        if not engine.valid:
+            return None
+        devices = self.devices
+
+        # groups stores {(clock counters, siggen counters, siggen signals):
+        # [(index, D-type memories, clock signals, siggen signals), ...]}.
+        # A siggen keeps its cold start output until the end of the first
+        # pass, which a D-type on its SET or CLEAR may see.
+        groups = {}
+        for index, seed in enumerate(seeds):
+            devices.cold_startup(random.Random(seed))
+            siggen_signals = [device.outputs[None]
+                              for device in engine.siggen_devices]
+            counters = (
+                tuple([device.clock_counter
+                       for device in engine.clock_devices]),
+                tuple([device.siggen_counter
+                       for device in engine.siggen_devices]),
+                tuple(siggen_signals))
+            groups.setdefault(counters, []).append((
+                index, [device.dtype_memory
+                        for device in engine.dtype_devices],
+                [device.outputs[None] for device in engine.clock_devices],
+                siggen_signals))
+
+        start_signals = [self.start_signals[(device.device_id, output_id)]
+                         for device, output_id in engine.slot_outputs]
+        outputs = list(self.monitors.monitors_dictionary)
+        results = [None] * len(seeds)
+        for (clock_counters, siggen_counters, _), lanes in groups.items():
+            # The devices give the shared counters of this group
+            for device, counter in zip(engine.clock_devices, clock_counters):
+                device.clock_counter = counter
+            for device, counter in zip(engine.siggen_devices,
+                                       siggen_counters):
+                device.siggen_counter = counter
+            if not engine.load_lanes(start_signals,
+                                     [lane[1] for lane in lanes],
+                                     [lane[2] for lane in lanes],
+                                     [lane[3] for lane in lanes]):
+                return None
+            lane_results = engine.record_lanes(cycles, outputs)
+            for (index, _, _, _), traces in zip(lanes, lane_results):
+                results[index] = traces
+
+        # Leave the network in the cold start of the last seed
+        if seeds:
+            devices.cold_startup(random.Random(seeds[-1]))
+        return results
+
+    def get_high_probabilities(self, results):
+        """Return the fraction of runs in which each output is HIGH.
+
+        Return a dictionary of {(device_id, output_id): [probability]}, with
+        one probability for each cycle. RISING counts as HIGH. Runs that
+        stopped early because they oscillate are left out of the later
+        cycles.
+        """
+        devices = self.devices
+        high_signals = (devices.HIGH, devices.RISING)
+        probabilities = {}
+        for output in self.monitors.monitors_dictionary:
+            high_counts = []
+            run_counts = []
+            for traces in results:
+                trace = traces[output]
+                for _ in range(len(high_counts), len(trace)):
+                    high_counts.append(0)
+                    run_counts.append(0)
+                for cycle, signal in enumerate(trace):
+                    run_counts[cycle] += 1
+                    if signal in high_signals:
+                        high_counts[cycle] += 1
+            probabilities[output] = [high / runs for high, runs in
+                                     zip(high_counts, run_counts)]
+        return probabilities
+
+    def get_outcome_classes(self, seeds, results):
+        """Return the seeds grouped by the monitored traces they give.
+
+        Return a list of (seeds, traces) pairs, one for each different
+        outcome, with the most common outcome first.
+        """
+        classes = {}
+        for seed, traces in zip(seeds, results):
+            key = tuple(tuple(trace) for trace in traces.values())
+            if key not in classes:
+                classes[key] = ([], traces)
+            classes[key][0].append(seed)
+        return sorted(classes.values(),
+                      key=lambda outcome: len(outcome[0]), reverse=True)
+
+
+# The ensemble of a worker process
+worker_ensemble = None
+
+
+def start_worker(ensemble):
+    """Keep the ensemble given to a new worker process."""
+    global worker_ensemble
+    worker_ensemble = ensemble
+
+
+def run_worker_seeds(seeds, cycles):
+    """Run a share of the seeds in a worker process and return the traces."""
+    return worker_ensemble.run_seeds(seeds, cycles)
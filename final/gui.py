@@ -43,12 +43,8 @@ from OpenGL import GL, GLUT, GLU
 from error import Error
 import builtins
 
-from names import Names
-from devices import Devices
-from network import Network
-from monitors import Monitors
-from scanner import Scanner
-from parse import Parser
+from cache import NetworkCache
+from incremental import IncrementalParser
 
 
 class PDFViewer(sc.SizedFrame):
@@ -1812,6 +1808,8 @@ class FrameManager:
             el = gettext.translation("el_GR", localedir="locale", languages=["el"])
             el.install()
             _ = el.gettext
+        # Keeps the last parsed network, so edits only re-parse what changed
+        self.incremental = IncrementalParser(cache=NetworkCache())
         self.menu = MenuFrame(self, title)
         self.menu.Show()
         self.app.MainLoop()
@@ -1823,11 +1821,6 @@ class FrameManager:
         """
         self.path = path
         if self.menu.text_editor.text is not None:
-            self.names = Names()
-            self.devices = Devices(self.names)
-            self.network = Network(self.names, self.devices)
-            self.monitors = Monitors(self.names, self.devices, self.network)
-
             self.process_content(dimension)
 
         else:
@@ -1840,12 +1833,17 @@ class FrameManager:
         """
         self.content = self.menu.text_editor.text.GetValue()
         self.file = io.StringIO(self.content)
-        self.scanner = Scanner(self.path, self.file, self.names)
-        self.parser = Parser(
-            self.names, self.devices, self.network, self.monitors, self.scanner
-        )
 
-        if self.parser.parse_network():
+        # Patch the last network with the edited statements if possible, or
+        # load it from the cache or parse it in full
+        self.incremental.path = self.path
+        parsed = self.incremental.parse(self.content)
+        self.names = self.incremental.names
+        self.devices = self.incremental.devices
+        self.network = self.incremental.network
+        self.monitors = self.incremental.monitors
+
+        if parsed:
             self.gui = Gui(
                 self,
                 self.title,
@@ -0,0 +1,402 @@
+"""Re-parse only the parts of a definition that changed since the last parse.
+
+Used in the Logic Simulator GUI so that editing a few lines of a large
+definition file patches the existing network instead of rebuilding it.
+
+Classes
+-------
+IncrementalParser - patches the last parsed network with edited statements.
+"""
+import bisect
+import io
+import re
+from collections import Counter
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import BufferedScanner
+from parse import Parser
+from error import Error
+
+
+class IncrementalParser:
+    """Patch the last parsed network with the statements that were edited.
+
+    After each successful parse, the text is indexed into items: the
+    statements of each section, ending in ';', and the headings and brackets
+    between them. When new text is given, only the stretch between the
+    first and last changed character is tokenized again, extended to whole
+    items on both sides. The old and new statements in that stretch are
+    compared section by section, and the network is patched in place.
+    Removed connections and monitors are undone, the SIGNALS section is
+    applied again, and added statements are parsed at their own positions in
+    the text, so error messages point to the right lines.
+
+    A full parse, with new Names, Devices, Network and Monitors, is done for
+    the first parse, after a failed parse, and when a change cannot be
+    patched: when devices are removed or redefined, when the headings or
+    brackets change, when the text is not ASCII, or when the patch gives
+    errors. Full parses use the cache, if one is given. The GUI can also
+    change the monitors and switches of a network directly, so a full parse
+    is done if they no longer match what the last text defined. After a
+    patch, the monitors are reset and the devices started up again, as they
+    are after a full parse.
+
+    Parameters
+    ----------
+    path: optional path of the definition file, passed to the scanner.
+    cache: optional instance of the cache.NetworkCache() class.
+
+    Public methods
+    --------------
+    parse(self, text): Parses the text, patching the last network if
+                       possible, and returns True if there are no errors.
+
+    parse_all(self, text): Parses the whole text into a new network.
+
+    make_index(self, text): Indexes the items of the text.
+
+    get_items(self, text, start, stop, state): Returns the items between two
+                                               positions of the text.
+
+    patch(self, text): Patches the network with the changes in the text.
+
+    get_definition(self): Returns the monitors and switch states of the
+                          network.
+
+    parse_statements(self, text, section, statements): Parses the given
+                                                       statements of a
+                                                       section.
+    """
+
+    sections = ("DEVICES", "CONNECTIONS", "SIGNALS", "MONITOR")
+    headings = ("NETWORK",) + sections
+    non_newline = re.compile(r"[^\n]+")
+
+    def __init__(self, path=None, cache=None):
+        """Initialise the parser with no previous parse."""
+        self.path = path
+        self.cache = cache
+        self.names = None
+        self.devices = None
+        self.network = None
+        self.monitors = None
+
+        # text is the text of the last successful parse, or None. Its items
+        # are held in parallel lists of start and end positions, the state
+        # after each item and the item itself: the tokens of a statement
+        # joined by spaces, or a single heading or bracket.
+        self.text = None
+        self.starts = []
+        self.ends = []
+        self.states = []
+        self.keys = []
+        # The monitors and switch states defined by the text
+        self.definition = None
+        # The number of patched and full parses, for testing
+        self.patch_count = 0
+        self.full_count = 0
+
+    def parse(self, text):
+        """Parse the text, patching the last network if possible.
+
+        Return True if there are no errors. The network is then available as
+        names, devices, network and monitors.
+        """
+        if (self.text is not None and text.isascii() and
+                self.get_definition() == self.definition):
+            if text == self.text:
+                return True
+            errors = Error.num_errors
+            if self.patch(text):
+                if Error.num_errors == errors:
+                    self.monitors.reset_monitors()
+                    self.devices.cold_startup()
+                    self.definition = self.get_definition()
+                    self.patch_count += 1
+                    return True
+                # The patch has partly changed the network, so start again
+                # to report the errors against a clean network
+                Error.reset()
+        return self.parse_all(text)
+
+    def parse_all(self, text):
+        """Parse the whole text into a new network.
+
+        Return True if there are no errors.
+        """
+        self.full_count += 1
+        self.text = None
+        key = None
+        snapshot = None
+        if self.cache is not None:
+            key = self.cache.get_key(io.BytesIO(text.encode("utf-8")))
+            snapshot = self.cache.load(key)
+        if snapshot is not None:
+            [self.names, self.devices, self.network,
+             self.monitors] = snapshot
+        else:
+            self.names = Names()
+            self.devices = Devices(self.names)
+            self.network = Network(self.names, self.devices)
+            self.monitors = Monitors(self.names, self.devices, self.network)
+            scanner = BufferedScanner(self.path, io.StringIO(text),
+                                      self.names)
+            parser = Parser(self.names, self.devices, self.network,
+                            self.monitors, scanner)
+            if not parser.parse_network():
+                return False
+            if self.cache is not None:
+                self.cache.save(key, self.names, self.devices, self.network,
+                                self.monitors)
+        if text.isascii():
+            self.make_index(text)
+        self.definition = self.get_definition()
+        return True
+
+    def make_index(self, text):
+        """Index the items of the text, for patching it later.
+
+        Return True if successful. If the text cannot be indexed, the next
+        parse is a full parse.
+        """
+        items = self.get_items(text, 0, len(text), (None, False))
+        if items is None:
+            self.text = None
+            return False
+        self.text = text
+        self.starts = [item[0] for item in items]
+        self.ends = [item[1] for item in items]
+        self.states = [item[2] for item in items]
+        self.keys = [item[3] for item in items]
+        return True
+
+    def get_items(self, text, start, stop, state):
+        """Return the items of the text from position start up to stop.
+
+        Items are returned as (start, end, state, key) tuples, and state is
+        the (heading, is_open) state before the first item. Tokenizing must
+        end exactly at stop, outside a statement. Return None if it does
+        not, or if the structure of the text is not recognised.
+        """
+        token = BufferedScanner.token
+        [heading, is_open] = state
+        items = []
+        tokens = []  # the tokens of the statement being read
+        statement_start = None
+        position = start
+        while True:
+            match = token.match(text, position)
+            group = match.lastindex
+            if group is None:  # end of file
+                token_start = len(text)
+            else:
+                token_start = match.start(group)
+            if token_start >= stop:
+                if tokens or token_start != stop:
+                    return None
+                return items
+            string = match.group(group)
+            position = match.end()
+
+            if is_open and heading in self.sections:
+                if string == "}":
+                    if tokens:  # statement without a ;
+                        return None
+                    heading = None
+                    is_open = False
+                    items.append((token_start, position, (heading, is_open),
+                                  string))
+                    continue
+                if not tokens:
+                    statement_start = token_start
+                tokens.append(string)
+                if string == ";":
+                    items.append((statement_start, position,
+                                  (heading, is_open), " ".join(tokens)))
+                    tokens = []
+                continue
+
+            # Headings and brackets
+            if string in self.headings and not is_open or (
+                    heading == "NETWORK" and string in self.sections):
+                heading = string
+                is_open = False
+            elif string == "{" and heading is not None and not is_open:
+                is_open = True
+            elif string == "}":
+                heading = None
+                is_open = False
+            else:
+                return None
+            items.append((token_start, position, (heading, is_open), string))
+
+    def patch(self, text):
+        """Patch the network with the changes between the last text and this.
+
+        Return True if the network was patched, or False if a full parse is
+        needed.
+        """
+        old_text = self.text
+        # Find the first and last changed characters
+        length = min(len(old_text), len(text))
+        low, high = 0, length
+        while low < high:  # common prefix, by bisection
+            middle = (low + high + 1) // 2
+            if old_text[:middle] == text[:middle]:
+                low = middle
+            else:
+                high = middle - 1
+        prefix = low
+        low, high = 0, length - prefix
+        while low < high:  # common suffix, not overlapping the prefix
+            middle = (low + high + 1) // 2
+            if old_text[len(old_text) - middle:] == text[len(text) - middle:]:
+                low = middle
+            else:
+                high = middle - 1
+        change_end = len(old_text) - low
+        shift = len(text) - len(old_text)
+
+        # Extend the change to whole items. The end of an item before the
+        # change and the start of one after it are clean places to tokenize
+        # from, since the text there is unchanged.
+        first = bisect.bisect_left(self.ends, prefix)
+        last = bisect.bisect_right(self.starts, change_end)
+        if first > 0:
+            start = self.ends[first - 1]
+            state = self.states[first - 1]
+        else:
+            start = 0
+            state = (None, False)
+        if last < len(self.starts):
+            stop = self.starts[last]
+        else:
+            stop = len(old_text)
+        new_items = self.get_items(text, start, stop + shift, state)
+        if new_items is None:
+            return False
+
+        old_keys = self.keys[first:last]
+        old_states = self.states[first:last]
+        new_keys = [item[3] for item in new_items]
+        new_states = [item[2] for item in new_items]
+        # The headings and brackets must be unchanged
+        if ([key for key in old_keys if key[-1] != ";"] !=
+                [key for key in new_keys if key[-1] != ";"]):
+            return False
+        old_statements = Counter((state[0], key) for state, key in
+                                 zip(old_states, old_keys) if key[-1] == ";")
+        new_statements = Counter((state[0], key) for state, key in
+                                 zip(new_states, new_keys) if key[-1] == ";")
+        removed = old_statements - new_statements
+        added = new_statements - old_statements
+        if any(section == "DEVICES" for section, _ in removed):
+            return False
+
+        # Undo the removed connections and monitors
+        names = self.names
+        for (section, key), count in removed.items():
+            tokens = key.split(" ")[:-1]
+            if section == "CONNECTIONS":
+                if tokens[-2:-1] != ["."] or "-" not in tokens:
+                    return False
+                device_id = names.query(tokens[tokens.index("-") + 1])
+                input_id = names.query(tokens[-1])
+                if not self.network.remove_connection(device_id, input_id):
+                    return False
+            elif section == "MONITOR":
+                if len(tokens) not in (1, 3):
+                    return False
+                device_id = names.query(tokens[0])
+                output_id = names.query(tokens[2]) if len(tokens) == 3 \
+                    else None
+                if not self.monitors.remove_monitor(device_id, output_id):
+                    return False
+
+        # Update the index
+        self.text = text
+        self.starts[first:last] = [item[0] for item in new_items]
+        self.ends[first:last] = [item[1] for item in new_items]
+        self.states[first:last] = new_states
+        self.keys[first:last] = new_keys
+        after = first + len(new_items)
+        if shift:
+            self.starts[after:] = [position + shift for position in
+                                   self.starts[after:]]
+            self.ends[after:] = [position + shift for position in
+                                 self.ends[after:]]
+
+        # Parse the added statements, in the order of the sections
+        signals_changed = any(section == "SIGNALS" for section, _ in
+                              list(removed) + list(added))
+        for section in self.sections:
+            if section == "SIGNALS":
+                if not signals_changed:
+                    continue
+                # Apply the whole section again, from switches set to 0
+                for device_id in self.devices.find_devices(
+                        self.devices.SWITCH):
+                    self.devices.set_switch(device_id, self.devices.LOW)
+                statements = [(item_start, item_end) for item_start,
+                              item_end, item_state, key in
+                              zip(self.starts, self.ends, self.states,
+                                  self.keys)
+                              if item_state[0] == section and key[-1] == ";"]
+            else:
+                statements = []
+                for item_start, item_end, item_state, key in new_items:
+                    if added[(item_state[0], key)] > 0 and \
+                            item_state[0] == section:
+                        added[(item_state[0], key)] -= 1
+                        statements.append((item_start, item_end))
+            if statements:
+                self.parse_statements(text, section, statements)
+        return True
+
+    def get_definition(self):
+        """Return the monitors and switch states of the network."""
+        switches = [(device_id,
+                     self.devices.get_device(device_id).switch_state)
+                    for device_id in self.devices.find_devices(
+                        self.devices.SWITCH)]
+        return set(self.monitors.monitors_dictionary), switches
+
+    def parse_statements(self, text, section, statements):
+        """Parse the given statements of a section into the network.
+
+        statements is a list of (start, end) positions in the text. The
+        statements are scanned at their own line and character numbers, with
+        the rest of the text left blank.
+        """
+        [first_start, _] = statements[0]
+        line_count = text.count("\n", 0, first_start)
+        column = first_start - (text.rfind("\n", 0, first_start) + 1)
+        # Scanner counts characters differently on the second line when the
+        # file starts with a newline, so start with the same character
+        pieces = ["" if line_count == 0 or text[:1] == "\n" else " ",
+                  "\n" * line_count, " " * column]
+        position = first_start
+        for start, end in statements:
+            pieces.append(self.non_newline.sub(
+                lambda match: " " * len(match.group()),
+                text[position:start]))
+            pieces.append(text[start:end])
+            position = end
+        pieces.append(" }")  # ends the section
+
+        scanner = BufferedScanner(self.path, io.StringIO("".join(pieces)),
+                                  self.names)
+        parser = Parser(self.names, self.devices, self.network,
+                        self.monitors, scanner)
+        parser.device_names = set(self.devices.find_devices())
+        if section == "DEVICES":
+            parser.device_list()
+        elif section == "CONNECTIONS":
+            parser.connection_list()
+        elif section == "SIGNALS":
+            parser.setsignal_list()
+        else:
+            parser.monitor_list()
@@ -8,23 +8,150 @@ Usage
 -----
 Show help: logsim.py -h
 Command line user interface: logsim.py -c <file path>
+Batch mode: logsim.py -b <file path> [-n <cycles>]
+            [-s <switch>=<0|1>[@<cycle>]] [-o <output path>] [-f text|csv|vcd]
+Many jobs: logsim.py -j <jobs file path> [-p <processes>] [-o <output path>]
 Graphical user interface: logsim.py <file path>
+
+Batch mode runs the simulation without user interaction and writes the
+monitored signals to the output path, or to standard output. -s may be given
+more than once. It exits with one of the batch exit statuses below.
+
+-j runs every job listed in the jobs file across a pool of processes, and
+writes all the results to the output path as JSON. See batch.BatchRunner for
+the jobs file format.
 """
+import contextlib
 import getopt
-import gui
+import os
 import sys
-import builtins
-import wx
-import io
 
 from names import Names
 from devices import Devices
 from network import Network
 from monitors import Monitors
-from scanner import Scanner
+from scanner import MappedScanner
+from cache import NetworkCache
 from parse import Parser
 from userint import UserInterface
-from gui import Gui
+from simulator import Simulator
+from error import Error
+
+# Exit statuses of batch mode
+[SUCCESS, INVALID_ARGUMENTS, DEFINITION_ERRORS, OSCILLATION,
+ JOBS_FAILED] = range(5)
+
+
+def load_network(path, file):
+    """Return the names, devices, network and monitors defined in the file.
+
+    file is the definition file at path, opened for reading in binary mode.
+    The network is loaded from the cache if the file is unchanged. Return
+    None if the definition has errors.
+    """
+    # Initialise instances of the four inner simulator classes
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+
+    # Load the network from the cache if the file is unchanged
+    cache = NetworkCache()
+    key = cache.get_key(file)
+    snapshot = cache.load(key)
+    if snapshot is not None:
+        return snapshot
+
+    # The scanner reads the memory-mapped file without copying it
+    scanner = MappedScanner(path, file, names)
+    parser = Parser(names, devices, network, monitors, scanner)
+    parsed = parser.parse_network()
+    scanner.close()
+    if not parsed:
+        return None
+    cache.save(key, names, devices, network, monitors)
+    return names, devices, network, monitors
+
+
+def run_batch(path, cycles, switch_entries, output_path, output_format):
+    """Run the simulation in batch mode and return the exit status.
+
+    Only errors are printed, to standard error.
+    """
+    if output_format not in Simulator.output_formats:
+        print("Error: unknown output format", output_format, file=sys.stderr)
+        return INVALID_ARGUMENTS
+    try:
+        file = open(path, "rb")
+    except IOError:
+        print("Error: can't find or open file", path, file=sys.stderr)
+        return INVALID_ARGUMENTS
+    # The parser prints its progress, which is not wanted in batch mode
+    with file, open(os.devnull, "w") as null_file, \
+            contextlib.redirect_stdout(null_file):
+        network_objects = load_network(path, file)
+    if network_objects is None:
+        for symbol, error_type in zip(Error.symbols, Error.types):
+            print("Error on line " + str(symbol.line_number) + ": " +
+                  Error.error_message[error_type], file=sys.stderr)
+        Error.reset()
+        return DEFINITION_ERRORS
+
+    simulator = Simulator(*network_objects)
+    schedule = simulator.read_schedule(switch_entries)
+    if schedule is None:
+        print("Error: invalid switch schedule", file=sys.stderr)
+        return INVALID_ARGUMENTS
+    try:
+        output_file = sys.stdout if output_path is None else \
+            open(output_path, "w")
+    except IOError:
+        print("Error: can't open output file", output_path, file=sys.stderr)
+        return INVALID_ARGUMENTS
+
+    simulator.start_output(output_file, output_format)
+    completed = simulator.run(cycles, schedule)
+    simulator.finish_output()
+    if output_file is not sys.stdout:
+        output_file.close()
+    if not completed:
+        print("Error: network oscillating at cycle",
+              simulator.cycles_completed, file=sys.stderr)
+        return OSCILLATION
+    return SUCCESS
+
+
+def run_jobs(path, processes, output_path):
+    """Run the jobs listed in the file at path and return the exit status.
+
+    Return JOBS_FAILED if any job did not pass.
+    """
+    # batch imports multiprocessing, so it is only imported when needed
+    from batch import BatchRunner
+
+    runner = BatchRunner(processes or None)
+    try:
+        with open(path) as file:
+            jobs = runner.read_jobs(file)
+    except IOError:
+        print("Error: can't find or open file", path, file=sys.stderr)
+        return INVALID_ARGUMENTS
+    if jobs is None:
+        print("Error: invalid jobs file", path, file=sys.stderr)
+        return INVALID_ARGUMENTS
+    results = runner.run_jobs(jobs)
+    try:
+        output_file = sys.stdout if output_path is None else \
+            open(output_path, "w")
+    except IOError:
+        print("Error: can't open output file", output_path, file=sys.stderr)
+        return INVALID_ARGUMENTS
+    runner.write_results(results, output_file)
+    if output_file is not sys.stdout:
+        output_file.close()
+    if any(result["status"] != runner.PASSED for result in results):
+        return JOBS_FAILED
+    return SUCCESS
 
 
 def main(arg_list):
@@ -38,13 +165,39 @@ def main(arg_list):
     usage_message = ("Usage:\n"
                      "Show help: logsim.py -h\n"
                      "Command line user interface: logsim.py -c <file path>\n"
+                     "Batch mode: logsim.py -b <file path> [-n <cycles>] "
+                     "[-s <switch>=<0|1>[@<cycle>]]\n"
+                     "            [-o <output path>] [-f text|csv|vcd]\n"
+                     "Many jobs: logsim.py -j <jobs file path> "
+                     "[-p <processes>] [-o <output path>]\n"
                      "Graphical user interface: logsim.py <file path>")
     try:
-        options, arguments = getopt.getopt(arg_list, "hc:")
+        options, arguments = getopt.getopt(arg_list, "hc:b:n:s:o:f:j:p:")
     except getopt.GetoptError:
         print("Error: invalid command line arguments\n")
         print(usage_message)
-        sys.exit()
+        sys.exit(INVALID_ARGUMENTS)
+
+    batch_options = dict(options)
+    if "-b" in batch_options and "-h" not in batch_options:
+        cycles = batch_options.get("-n", "10")
+        if not cycles.isdigit():
+            print("Error: the number of cycles must be an integer",
+                  file=sys.stderr)
+            sys.exit(INVALID_ARGUMENTS)
+        switch_entries = [value for option, value in options
+                          if option == "-s"]
+        sys.exit(run_batch(batch_options["-b"], int(cycles), switch_entries,
+                           batch_options.get("-o"),
+                           batch_options.get("-f", "text")))
+    if "-j" in batch_options and "-h" not in batch_options:
+        processes = batch_options.get("-p")
+        if processes is not None and not processes.isdigit():
+            print("Error: the number of processes must be an integer",
+                  file=sys.stderr)
+            sys.exit(INVALID_ARGUMENTS)
+        sys.exit(run_jobs(batch_options["-j"], processes and int(processes),
+                          batch_options.get("-o")))
 
     for option, path in options:
         print("option is", option, "path is", path)
@@ -52,25 +205,17 @@ def main(arg_list):
             print(usage_message)
             sys.exit()
         elif option == "-c":  # use the command line user interface
-            # Initialise instances of the four inner simulator classes
-            names = Names()
-            devices = Devices(names)
-            network = Network(names, devices)
-            monitors = Monitors(names, devices, network)
             try:
-                """Open and return the file specified by path for reading"""
-                with open(path) as f:
-                    content = f.readlines()
-                file = "".join(content)
+                """Open the file specified by path for reading"""
+                file = open(path, "rb")
             except IOError:
                 print("error, can't find or open file")
                 sys.exit()
-            file = io.StringIO(file)
-            scanner = Scanner(path, file, names)
-            parser = Parser(names, devices, network, monitors, scanner)
-            if parser.parse_network():
+            with file:
+                network_objects = load_network(path, file)
+            if network_objects is not None:
                 # Initialise an instance of the userint.UserInterface() class
-                userint = UserInterface(names, devices, network, monitors)
+                userint = UserInterface(*network_objects)
                 userint.command_interface()
 
     if not options:  # no option given, use the graphical user interface
@@ -79,6 +224,11 @@ def main(arg_list):
 
         Call the gui FrameManager to handle all operation.
         """
+        # gui imports wx, OpenGL and NumPy, so it is only imported here. The
+        # command line interface then starts quickly, and runs on machines
+        # without display libraries.
+        import gui
+
         language = sys.argv[-1]
 
         gui.FrameManager("Logic Simulator", language)
@@ -10,6 +10,8 @@ Monitors - records and displays specified output signals.
 """
 import collections
 
+from traces import SignalTrace, RunLengthTrace, SpillFile
+
 
 class Monitors:
 
@@ -35,7 +37,11 @@ class Monitors:
     get_monitor_signal(self, device_id, output_id): Returns the signal level of
                                                     the specified monitor.
 
-    record_signals(self): Records the current signal level of all monitors.
+    record_signals(self, cycles=1): Records the current signal level of all
+                                    monitors.
+
+    record_period(self, period_signals, repeats): Records the signal levels
+                                                  of one period many times.
 
     get_signal_names(self): Returns two lists of signal names: monitored and
                             not monitored.
@@ -45,6 +51,17 @@ class Monitors:
     get_margin(self): Returns the length of the longest monitor's name.
 
     display_signals(self): Displays signal trace(s) in the text console.
+
+    make_trace(self, signals=()): Returns a new trace of trace_type.
+
+    get_signals(self, device_id, output_id, start, stop): Returns the signal
+                            levels of a monitor between two cycle numbers.
+
+    add_listener(self, listener): Passes the recorded signals to the listener
+                                  from now on.
+
+    remove_listener(self, listener): Stops passing the recorded signals to
+                                     the listener.
     """
 
     def __init__(self, names, devices, network):
@@ -54,16 +71,35 @@ class Monitors:
         self.devices = devices
 
         # monitors_dictionary stores
-        # {(device_id, output_id): [signal_list]}
+        # {(device_id, output_id): trace}, where each trace is a list-like
+        # traces.SignalTrace or traces.RunLengthTrace
         self.monitors_dictionary = collections.OrderedDict()
 
+        # ARRAY traces store one byte per cycle. RUN_LENGTH traces store one
+        # entry per run of equal signals, which suits clocks and switches.
+        self.trace_types = [self.ARRAY, self.RUN_LENGTH] = range(2)
+        self.trace_type = self.ARRAY
+
+        # If window is set, only the last window cycles of each trace are
+        # kept in memory. If spill is also True, older cycles are moved to a
+        # compressed temporary file in spill_directory instead of dropped.
+        # A window of 0 keeps no traces at all, for streaming to listeners.
+        self.window = None
+        self.spill = False
+        self.spill_directory = None
+
+        # listeners are given the signal levels every time they are recorded
+        self.listeners = []
+
         [self.NO_ERROR, self.NOT_OUTPUT,
          self.MONITOR_PRESENT] = self.names.unique_error_codes(3)
 
     def make_monitor(self, device_id, output_id, cycles_completed=0):
         """Add the specified signal to the monitors dictionary.
 
-        Return NO_ERROR if successful, or the corresponding error if not.
+        The monitored outputs are passed on to the network, which may prune
+        the devices outside their cone of influence. Return NO_ERROR if
+        successful, or the corresponding error if not.
         """
         monitor_device = self.devices.get_device(device_id)
         if monitor_device is None:
@@ -74,11 +110,11 @@ class Monitors:
             return self.MONITOR_PRESENT
         else:
             # If n simulation cycles have been completed before making this
-            # monitor, then initialise the signal trace with an n-length list
-            # of BLANK signals. Otherwise, initialise the trace with an empty
-            # list.
-            self.monitors_dictionary[(device_id, output_id)] = [
-                self.devices.BLANK] * cycles_completed
+            # monitor, then initialise the signal trace with n BLANK signals.
+            # Otherwise, initialise an empty trace.
+            self.monitors_dictionary[(device_id, output_id)] = \
+                self.make_trace([self.devices.BLANK] * cycles_completed)
+            self.network.set_active_outputs(self.monitors_dictionary)
             return self.NO_ERROR
 
     def remove_monitor(self, device_id, output_id):
@@ -89,7 +125,9 @@ class Monitors:
         if (device_id, output_id) not in self.monitors_dictionary:
             return False
         else:
+            self.monitors_dictionary[(device_id, output_id)].close()
             del self.monitors_dictionary[(device_id, output_id)]
+            self.network.set_active_outputs(self.monitors_dictionary)
             return True
 
     def get_monitor_signal(self, device_id, output_id):
@@ -102,15 +140,49 @@ class Monitors:
         else:
             return None
 
-    def record_signals(self):
+    def record_signals(self, cycles=1):
         """Record the current signal level for every monitor.
 
-        This function is called at every simulation cycle.
+        This function is called at every simulation cycle. If cycles is
+        given, the signal levels are recorded for that many cycles at once.
+        Return the dictionary of {(device_id, output_id): signal level}
+        recorded.
         """
+        signals = {}
         for device_id, output_id in self.monitors_dictionary:
             signal_level = self.get_monitor_signal(device_id, output_id)
-            self.monitors_dictionary[(device_id,
-                                      output_id)].append(signal_level)
+            if signal_level is None:  # traces only hold signal levels
+                signal_level = self.devices.BLANK
+            signals[(device_id, output_id)] = signal_level
+        if self.window != 0:
+            if cycles == 1:
+                for output, signal_level in signals.items():
+                    self.monitors_dictionary[output].append(signal_level)
+            else:
+                for output, signal_level in signals.items():
+                    self.monitors_dictionary[output].append_repeated(
+                        signal_level, cycles)
+        for listener in self.listeners:
+            listener.record_signals(signals, cycles)
+        return signals
+
+    def record_period(self, period_signals, repeats):
+        """Record the signal levels of one period, repeats times over.
+
+        period_signals is a list of (signals, cycles) pairs, as recorded by
+        record_signals during one period of a periodic simulation.
+        """
+        if self.window != 0:
+            for output, trace in self.monitors_dictionary.items():
+                period = []
+                for signals, cycles in period_signals:
+                    period += [signals.get(output, self.devices.BLANK)] * \
+                        cycles
+                trace.extend_repeated(period, repeats)
+        for listener in self.listeners:
+            for _ in range(repeats):
+                for signals, cycles in period_signals:
+                    listener.record_signals(signals, cycles)
 
 
     def get_signal_names(self):
@@ -137,7 +209,9 @@ class Monitors:
         The list of stored signal levels for each monitor is deleted.
         """
         for device_id, output_id in self.monitors_dictionary:
-            self.monitors_dictionary[(device_id, output_id)] = []
+            self.monitors_dictionary[(device_id, output_id)].close()
+            self.monitors_dictionary[(device_id, output_id)] = \
+                self.make_trace()
 
     def get_margin(self):
         """Return the length of the longest monitor's name.
@@ -176,3 +250,48 @@ class Monitors:
                 if signal == self.devices.BLANK:
                     print(" ", end="")
             print("\n", end="")
+
+    def make_trace(self, signals=()):
+        """Return a new trace of trace_type holding the given signals.
+
+        The trace keeps the last window cycles in memory, and spills the
+        older cycles to disk if spill is True.
+        """
+        spill_file = None
+        if self.window is not None and self.spill:
+            spill_file = SpillFile(self.spill_directory)
+        if self.trace_type == self.RUN_LENGTH:
+            return RunLengthTrace(signals, self.window, spill_file)
+        return SignalTrace(signals, self.window, spill_file)
+
+    def get_signals(self, device_id, output_id, start, stop):
+        """Return a list of the monitor's signal levels from start to stop.
+
+        start and stop are cycle numbers, counted from the last reset. Cycles
+        that have been spilled to disk are read back. Return None if the
+        monitor does not exist or the cycles have been dropped.
+        """
+        trace = self.monitors_dictionary.get((device_id, output_id))
+        if trace is None:
+            return None
+        return trace.get_signals(start, stop)
+
+    def add_listener(self, listener):
+        """Pass the recorded signals to the listener from now on.
+
+        Every time the signals are recorded, the listener's
+        record_signals(signals, cycles) method is called with a dictionary of
+        {(device_id, output_id): signal level} and the number of cycles they
+        are recorded for, as vcd.VcdWriter expects.
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stop passing the recorded signals to the listener.
+
+        Return True if successful.
+        """
+        if listener not in self.listeners:
+            return False
+        self.listeners.remove(listener)
+        return True
@@ -31,6 +31,9 @@ class Names:
     lookup(self, name_string_list): Returns a list of name IDs for each
                         name string. Adds a name if not already present.
 
+    lookup_many(self, name_string_list): Same as lookup, but interns a large
+                        batch of name strings in one call.
+
     get_name_string(self, name_id): Returns the corresponding name string for
                         the name ID. Returns None if the ID is not present.
     """
@@ -38,7 +41,8 @@ class Names:
     def __init__(self):
         """Initialise names list."""
         self.error_code_count = 0  # how many error codes have been declared
-        self.names = []
+        self.names = []  # name_id -> name_string
+        self.name_ids = {}  # name_string -> name_id
 
     def unique_error_codes(self, num_error_codes):
         """Return a list of unique integer error codes."""
@@ -56,13 +60,7 @@ class Names:
         # raise TypeError if name_string isn't a string
         if not isinstance(name_string, str):
             raise TypeError("Only strings are allowed as inputs to query")
-        # iterate through all indeces of names list
-        for i in range(len(self.names)):
-            # return index whose name == name_stirng
-            if self.names[i] == name_string:
-                return i
-        # return none if return hasn't been called in for loop
-        return None
+        return self.name_ids.get(name_string)
 
     def lookup(self, name_string_list):
         """Return a list of name IDs for each name string in name_string_list.
@@ -70,28 +68,33 @@ class Names:
         If the name string is not present in the names list, add it.
         """
         name_ids = []
-        # boolean to determine whether a name in name_string_list
-        # is in names of instance
-        for n in name_string_list:
-            present = False
-            for i in range(len(self.names)):
-                if self.names[i] == n:
-                    name_ids.append(i)
-                    present = True
-                    # if a name in name_string_list is found,
-                    # change present to true and break loop
-                    break
-            if(present is False):
-                # if a name in name_string_list isn't found,
-                # add to names list of instance
-                # and add its name_id to the name_ids list
-                # add length of names to name_ids before adding new name,
-                # since length of old names list will be the index of the
-                # new name
-                name_ids.append(len(self.names))
-                self.names.append(n)
+        for name_string in name_string_list:
+            name_id = self.name_ids.get(name_string)
+            if name_id is None:
+                # the length of the old names list is the index of the new
+                # name, so IDs stay dense integers starting at 0
+                name_id = len(self.names)
+                self.names.append(name_string)
+                self.name_ids[name_string] = name_id
+            name_ids.append(name_id)
         return name_ids
 
+    def lookup_many(self, name_string_list):
+        """Return a list of name IDs for a large batch of name strings.
+
+        Behaves exactly like lookup, but interns the whole batch at once. New
+        names are given IDs in the order in which they first appear.
+        """
+        name_ids = self.name_ids
+        names = self.names
+        new_names = [name_string for name_string in
+                     dict.fromkeys(name_string_list)
+                     if name_string not in name_ids]
+        name_ids.update(zip(new_names, range(len(names),
+                                             len(names) + len(new_names))))
+        names.extend(new_names)
+        return [name_ids[name_string] for name_string in name_string_list]
+
     def get_name_string(self, name_id):
         """Return the corresponding name string for name_id.
 
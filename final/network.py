@@ -6,6 +6,7 @@ Classes
 --------
 Network - builds and executes the network.
 """
+from compiled import CompiledNetwork, EventDrivenNetwork, LevelizedNetwork
 
 
 class Network:
@@ -34,6 +35,11 @@ class Network:
                     second_port_id): Connects the first device to the second
                                      device.
 
+    make_connections(self, connections): Makes many connections and returns
+                                         the list of their errors.
+
+    remove_connection(self, device_id, input_id): Disconnects the given input.
+
     check_network(self): Checks if all inputs in the network are connected.
 
     update_signal(self, signal, target): Updates the signal in the direction of
@@ -58,6 +64,27 @@ class Network:
 
     execute_network(self): Executes all the devices in the network for one
                            simulation cycle.
+
+    skip_quiet_cycles(self, cycles): Runs the next cycles that change no
+                                     signal at once.
+
+    get_state_key(self): Returns a key that is equal for equal states of the
+                         network.
+
+    compile_network(self): Builds the execution engine selected by
+                           engine_type.
+
+    set_active_outputs(self, outputs): Sets the outputs whose cone of
+                                       influence is executed when pruning.
+
+    find_cone(self, outputs): Returns the devices that can reach the
+                              outputs.
+
+    sync_devices(self): Writes the signals held by the execution engine back
+                        to the devices.
+
+    find_feedback_loops(self): Returns the lists of gates that form feedback
+                               loops.
     """
 
     def __init__(self, names, devices):
@@ -70,6 +97,26 @@ class Network:
          self.DEVICE_ABSENT] = self.names.unique_error_codes(6)
         self.steady_state = True  # for checking if signals have settled
 
+        # SWEEP executes the Device objects directly. The other engines are
+        # built by compile_network and are used by execute_network from then
+        # on. EVENT_DRIVEN only re-executes devices whose inputs changed.
+        # LEVELIZED executes the gates in topological order, iterating only
+        # inside feedback loops, and reads RISING as HIGH and FALLING as LOW,
+        # so it can settle loops differently from the other engines.
+        # VECTORIZED also executes each level with NumPy array operations.
+        self.engine_types = [self.SWEEP, self.COMPILED, self.EVENT_DRIVEN,
+                             self.LEVELIZED, self.VECTORIZED] = range(5)
+        self.engine_type = self.COMPILED
+        self.engine = None
+
+        # If pruning is True, the compiled engines only execute the devices
+        # in the cone of influence of active_outputs, the monitored outputs,
+        # which Monitors keeps up to date. The other signals are left as
+        # they are until their devices join the cone. Like engine_type, it
+        # takes effect when the engine is next built.
+        self.pruning = False
+        self.active_outputs = []
+
     def get_connected_output(self, device_id, input_id):
         """Return the output connected to the given input.
 
@@ -101,6 +148,8 @@ class Network:
 
         Return None if either of the specified IDs is invalid.
         """
+        if self.engine is not None:
+            return self.engine.get_output_signal(device_id, output_id)
         device = self.devices.get_device(device_id)
         if device is not None:
             if output_id in device.outputs:
@@ -130,6 +179,7 @@ class Network:
                 # Make connection
                 first_device.inputs[first_port_id] = (second_device_id,
                                                       second_port_id)
+                self.devices.structure_version += 1
                 error_type = self.NO_ERROR
             else:  # second_port_id is not a valid input or output port
                 error_type = self.PORT_ABSENT
@@ -145,6 +195,7 @@ class Network:
                 else:
                     second_device.inputs[second_port_id] = (first_device_id,
                                                             first_port_id)
+                    self.devices.structure_version += 1
                     error_type = self.NO_ERROR
             else:
                 error_type = self.PORT_ABSENT
@@ -154,6 +205,31 @@ class Network:
 
         return error_type
 
+    def make_connections(self, connections):
+        """Make many connections in one call.
+
+        connections is an iterable of (first_device_id, first_port_id,
+        second_device_id, second_port_id) tuples, as taken by
+        make_connection. Each connection is checked on its own, so one that
+        fails does not stop the rest. Return the list of make_connection
+        results, in the same order.
+        """
+        make_connection = self.make_connection
+        return [make_connection(*connection) for connection in connections]
+
+    def remove_connection(self, device_id, input_id):
+        """Disconnect the given input from the output it is connected to.
+
+        Return True if successful, or False if the input does not exist or is
+        not connected.
+        """
+        device = self.devices.get_device(device_id)
+        if device is None or device.inputs.get(input_id) is None:
+            return False
+        device.inputs[input_id] = None
+        self.devices.structure_version += 1
+        return True
+
     def check_network(self):
         """Return True if all inputs in the network are connected."""
         for device_id in self.devices.find_devices():
@@ -332,9 +408,8 @@ class Network:
     def execute_siggen(self, device_id):
         """If it is time to do so, set clock signals to RISING or FALLING."""
         device = self.devices.get_device(device_id)
-        output = str(device.siggen_pulse)[device.siggen_counter-1]
-        int_out = int(output)
-        device.outputs[None] = int_out
+        device.outputs[None] = \
+            device.siggen_signals[device.siggen_counter - 1]
         return True
 
     def update_clocks(self):
@@ -357,7 +432,7 @@ class Network:
         siggen_devices = self.devices.find_devices(self.devices.SIGGEN)
         for device_id in siggen_devices:
             device = self.devices.get_device(device_id)
-            if device.siggen_counter == len(str(device.siggen_pulse)):
+            if device.siggen_counter == len(device.siggen_signals):
                 device.siggen_counter = 0
             else:
                 device.siggen_counter += 1
@@ -367,6 +442,9 @@ class Network:
 
         Return True if successful and the network does not oscillate.
         """
+        if self.engine is not None:
+            return self.engine.execute_network()
+
         clock_devices = self.devices.find_devices(self.devices.CLOCK)
         siggen_devices = self.devices.find_devices(self.devices.SIGGEN)
         switch_devices = self.devices.find_devices(self.devices.SWITCH)
@@ -426,3 +504,113 @@ class Network:
             if self.steady_state:
                 break
         return self.steady_state
+
+    def skip_quiet_cycles(self, cycles):
+        """Run up to cycles of the next cycles that change no signal at once.
+
+        Return the number of cycles run, or None if the network oscillates.
+        These are cycles in which no clock toggles and no siggen or switch
+        changes, which only a compiled engine can skip, so 0 is returned for
+        the SWEEP engine.
+        """
+        if self.engine is None:
+            return 0
+        return self.engine.skip_quiet_cycles(cycles)
+
+    def get_state_key(self):
+        """Return a key that is equal for equal states of the network.
+
+        Return None for the SWEEP engine, whose state is not compared.
+        """
+        if self.engine is None:
+            return None
+        return self.engine.get_state_key()
+
+    def compile_network(self):
+        """Build the execution engine selected by engine_type.
+
+        Return True if successful. Once built, the engine is used by
+        execute_network and get_output_signal. The VECTORIZED engine needs
+        NumPy, and ImportError is raised if it is not installed, rather than
+        falling back to the sweep without notice.
+        """
+        if self.engine is not None:
+            self.engine.sync_devices()
+        if self.engine_type == self.SWEEP:
+            self.engine = None
+        elif self.engine_type == self.COMPILED:
+            self.engine = CompiledNetwork(self.names, self.devices, self)
+            self.engine.compile()
+        elif self.engine_type == self.EVENT_DRIVEN:
+            self.engine = EventDrivenNetwork(self.names, self.devices, self)
+            self.engine.compile()
+        elif self.engine_type == self.LEVELIZED:
+            self.engine = LevelizedNetwork(self.names, self.devices, self)
+            self.engine.compile()
+        elif self.engine_type == self.VECTORIZED:
+            try:
+                from vectorized import VectorizedNetwork
+            except ImportError as error:
+                raise ImportError("the VECTORIZED engine needs NumPy, "
+                                  "which is not installed") from error
+            self.engine = VectorizedNetwork(self.names, self.devices, self)
+            self.engine.compile()
+        else:
+            return False
+        return True
+
+    def set_active_outputs(self, outputs):
+        """Set the outputs whose cone of influence is executed when pruning.
+
+        The compiled engine is recompiled for the new cone when it is next
+        used.
+        """
+        self.active_outputs = list(outputs)
+        if self.pruning:
+            self.devices.structure_version += 1
+
+    def find_cone(self, outputs):
+        """Return the set of device IDs in the cone of influence of outputs.
+
+        These are the devices of the outputs, and every device that drives
+        one of their inputs, directly or through other devices. outputs is a
+        list of (device ID, output ID) pairs.
+        """
+        cone = set()
+        stack = [device_id for device_id, output_id in outputs]
+        while stack:
+            device_id = stack.pop()
+            device = self.devices.get_device(device_id)
+            if device_id in cone or device is None:
+                continue
+            cone.add(device_id)
+            for connected_output in device.inputs.values():
+                if connected_output is not None:
+                    stack.append(connected_output[0])
+        return cone
+
+    def sync_devices(self):
+        """Write the signals held by the execution engine back to the devices.
+
+        This brings the Device objects up to date after simulating with a
+        compiled engine.
+        """
+        if self.engine is not None:
+            self.engine.sync_devices()
+
+    def find_feedback_loops(self):
+        """Return the lists of gates that form feedback loops.
+
+        Each loop is a list of the device IDs of the gates in a strongly
+        connected component of the network, such as the two NAND gates of a
+        latch. Loops are listed in topological order.
+        """
+        if (isinstance(self.engine, LevelizedNetwork) and
+                not self.engine.pruning):
+            self.engine.refresh()
+            return self.engine.feedback_loops
+        self.sync_devices()
+        engine = LevelizedNetwork(self.names, self.devices, self)
+        engine.pruning = False
+        engine.compile()
+        return engine.feedback_loops
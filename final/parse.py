@@ -47,8 +47,9 @@ class Parser:
         self.type = None
         self.id = None
         self.parse_errors = 0
-        self.device_names = []
-        self.connected_inputs = []
+        # Sets, so that checking a name is quick for large networks
+        self.device_names = set()
+        self.connected_inputs = set()
         self.gate_var_inputs_IDs = [
             self.scanner.AND_ID,
             self.scanner.NAND_ID,
@@ -98,6 +99,8 @@ class Parser:
         self.heading_search()
 
         if Error.num_errors == 0:
+            # Flatten the parsed network for fast simulation
+            self.network.compile_network()
             return True
 
     def heading_search(self):
@@ -155,20 +158,28 @@ class Parser:
             # if '{' - go to next symbol
 
     def device_list(self):
-        """Parse the device list."""
-        while True:
-            error = self.device_parse()
-            if error == 1:
-                break
-            if error == 2:
-                self.symbol = self.scanner.get_symbol()
-                break
-            else:
-                self.symbol = self.scanner.get_symbol()
-                if self.symbol.type == self.scanner.RIGHT_BRACKET:
-                    self.sections_complete += 1
+        """Parse the device list.
+
+        The devices are made in one batch, so the clocks and D-types are
+        started up once at the end of the list.
+        """
+        self.devices.start_batch()
+        try:
+            while True:
+                error = self.device_parse()
+                if error == 1:
+                    break
+                if error == 2:
                     self.symbol = self.scanner.get_symbol()
                     break
+                else:
+                    self.symbol = self.scanner.get_symbol()
+                    if self.symbol.type == self.scanner.RIGHT_BRACKET:
+                        self.sections_complete += 1
+                        self.symbol = self.scanner.get_symbol()
+                        break
+        finally:
+            self.devices.end_batch()
 
     def device_parse(self):
         """Parse a single line of a device definition."""
@@ -244,14 +255,14 @@ class Parser:
                 self.new_device_type == self.scanner.SWITCH_ID):
             # Must be a switch so make switch initially 0
             self.devices.make_switch(self.new_device_id, 0)
-            self.device_names.append(self.new_device_id)
+            self.device_names.add(self.new_device_id)
             return 0
 
         elif self.symbol.type == self.scanner.SEMICOLON:
             # Must be an xor or dtype so make that device
             self.devices.make_device(
                 self.new_device_id, self.new_device_type, None)
-            self.device_names.append(self.new_device_id)
+            self.device_names.add(self.new_device_id)
             return 0
         elif self.symbol.type == self.scanner.EOF:
             return 1
@@ -291,7 +302,7 @@ class Parser:
                     self.devices.make_gate(
                         self.new_device_id, self.new_device_type,
                         self.symbol.number)
-                    self.device_names.append(self.new_device_id)
+                    self.device_names.add(self.new_device_id)
             elif clock:
                 if (self.symbol.type != self.scanner.NUMBER or
                         self.symbol.number < 1):
@@ -300,7 +311,7 @@ class Parser:
                     # Build clock object
                     self.devices.make_clock(
                         self.new_device_id, self.symbol.number)
-                    self.device_names.append(self.new_device_id)
+                    self.device_names.add(self.new_device_id)
             elif siggen:
                 if (self.symbol.type != self.scanner.NUMBER or
                         not self.is_bin_num(self.symbol.number)):
@@ -309,7 +320,7 @@ class Parser:
                     # Build siggen object
                     self.devices.make_siggen(
                         self.new_device_id, self.symbol.number)
-                    self.device_names.append(self.new_device_id)
+                    self.device_names.add(self.new_device_id)
 
         # symbol 6 should be a ';' if gate or clock device
         if gate or clock or siggen:
@@ -6,10 +6,15 @@ file and translate them into symbols that are usable by the parser.
 Classes
 -------
 Scanner - reads definition file and translates characters into symbols.
+BufferedScanner - reads the whole file in blocks and tokenizes it with
+                  regular expressions.
+MappedScanner - tokenizes a memory-mapped file without copying it.
 Symbol - encapsulates a symbol and stores its properties.
 """
 import sys
 import os
+import re
+import mmap
 
 
 class Symbol:
@@ -53,6 +58,8 @@ class Scanner:
     -------------
     get_symbol(self): Translates the next sequence of characters into a symbol
                       and returns the symbol.
+
+    read_character(self): Reads the next character from the definition file.
     """
     def __init__(self, path, file, names):
         """"Open specified file and initialise reserved words and IDs."""
@@ -91,6 +98,7 @@ class Scanner:
             "SETSIGNAL", "SETCLOCK", "MONITOR", "starttime", "period",
             "firstchange", "SIGGEN", "pulse"
         ]
+        self.keywords = frozenset(self.keywords_list)
 
         # SIMPLE EBNF
         # [self.DEVICES_ID, self.CONNECT_ID, self.MONITOR_ID,
@@ -107,7 +115,7 @@ class Scanner:
             ] = self.names.lookup(self.keywords_list)
 
         # initialise current character to be first character
-        char = self.file.read(1)
+        char = self.read_character()
         self.current_character = char
 
         # initialise line number and character number counters
@@ -135,7 +143,7 @@ class Scanner:
             name_string = self.get_name()
             symbol.end_char_number += len(name_string)
             symbol.string = name_string
-            if name_string in self.keywords_list:
+            if name_string in self.keywords:
                 symbol.type = self.KEYWORD
             else:
                 symbol.type = self.NAME
@@ -184,7 +192,7 @@ class Scanner:
 
         RETURN: None
         """
-        char = self.file.read(1)
+        char = self.read_character()
         self.current_character = char
         if (self.current_character == '\n'):
             self.current_line_number += 1
@@ -192,6 +200,13 @@ class Scanner:
         else:
             self.current_char_number += 1
 
+    def read_character(self):
+        """Read the next character from the definition file.
+
+        RETURN: String - the character, or "" at the end of the file
+        """
+        return self.file.read(1)
+
     def skip_spaces(self):
         """
         Skips whitespace until a non-whitespace character is reached.
@@ -277,3 +292,228 @@ class Scanner:
             else:
                 break
         return integernumber
+
+
+class BufferedScanner(Scanner):
+    """Read the whole file in blocks and tokenize it with regular expressions.
+
+    This gives exactly the same symbols, with the same line and character
+    numbers, as Scanner, but faster, most of all on files with long comments
+    and indentation. The file is read into memory in large blocks, and for
+    ASCII files get_symbol reads each symbol, along with the whitespace,
+    comments and unused characters before it, with one compiled regular
+    expression. Other files fall back to the character by character methods
+    of Scanner, reading from memory.
+
+    For ASCII files, get_symbol does not keep current_line_number and
+    current_char_number up to date, since each symbol holds its own position.
+    A comment left open at the end of the file runs to the end of the file,
+    where Scanner would never finish it.
+
+    Parameters
+    ----------
+    path: path to the circuit definition file.
+    file: file object of the circuit definition file.
+    names: instance of the names.Names() class.
+
+    Public methods
+    -------------
+    get_symbol(self): Translates the next sequence of characters into a symbol
+                      and returns the symbol.
+
+    read_text(self, file): Returns the text of the whole file.
+
+    read_character(self): Reads the next character from memory.
+
+    locate(self, index): Returns the line and character number of the
+                         character at index.
+    """
+
+    block_size = 1 << 16
+    # True when text holds the ASCII bytes of the file, instead of a string
+    is_mapped = False
+    newline = "\n"
+
+    # Matches everything up to the end of the next symbol, in the same order
+    # as Scanner.get_symbol: spaces (the ASCII characters that str.isspace
+    # accepts) and comments, then unused characters, then a name, number or
+    # punctuation mark. Like Scanner.skip_comments, a /* comment stops on its
+    # closing /, which then starts the search for another comment, and each *
+    # in it also skips the character after it.
+    [NAME_GROUP, NUMBER_GROUP, PUNCTUATION_GROUP] = range(1, 4)
+    token = re.compile(r"(?:[ \t\n\r\x0b\x0c\x1c-\x1f]*/"
+                       r"(?:/[^\n]*|\*(?:[^*]|\*[^/])*(?:\*(?=/)|\*?\Z))?)*"
+                       r"[^A-Za-z0-9{}=.;\-]*"
+                       r"(?:([A-Za-z][A-Za-z0-9]*)|([0-9]+)|([{}=.;\-]))?")
+
+    def __init__(self, path, file, names):
+        """Read the file into memory and initialise the scanner."""
+        self.text = self.read_text(file)
+        self.position = 0  # index of the next character to read
+        self.is_ascii = self.is_mapped or self.text.isascii()
+        super().__init__(path, file, names)
+
+        self.punctuation = {"{": self.LEFT_BRACKET, "}": self.RIGHT_BRACKET,
+                            "=": self.EQUALS, ".": self.PERIOD,
+                            "-": self.DASH, ";": self.SEMICOLON}
+        # located_index is the last index passed to locate, located_line is
+        # its line number, and line_start is the index of the last newline
+        # at or before it
+        self.located_index = 0
+        self.located_line = self.current_line_number
+        self.line_start = 0 if self.current_character == "\n" else -1
+        # Known names are looked up directly in the name ID dictionary
+        self.name_ids = names.name_ids
+
+    def read_text(self, file):
+        """Return the text of the whole file, read in large blocks."""
+        blocks = []
+        while True:
+            block = file.read(self.block_size)
+            if not block:
+                break
+            blocks.append(block)
+        return "".join(blocks)
+
+    def read_character(self):
+        """Read the next character from memory.
+
+        RETURN: String - the character, or "" at the end of the file
+        """
+        position = self.position
+        self.position = position + 1
+        return self.text[position:position + 1]
+
+    def locate(self, index):
+        """Return the line and character number of the character at index.
+
+        The index must not be less than the index last passed to locate.
+        """
+        start = self.located_index + 1
+        # Only the text since the last index is searched for newlines
+        gap = self.text[start:index + 1]
+        newlines = gap.count(self.newline)
+        if newlines:
+            self.located_line += newlines
+            self.line_start = start + gap.rfind(self.newline)
+        self.located_index = index
+        char_number = index - self.line_start
+        if self.line_start == 0:
+            # Scanner does not reset the character number for a newline at
+            # the very start of the file
+            char_number += 1
+        return self.located_line, char_number
+
+    def get_symbol(self):
+        """
+        Translate the next sequence of characters into a symbol.
+
+        RETURN: Symbol - the next symbol from input file of scanner instance
+        """
+        if not self.is_ascii:
+            return super().get_symbol()
+        text = self.text
+        match = self.token.match(text, min(self.position - 1, len(text)))
+        group = match.lastindex
+        symbol = Symbol()
+        if group is None:  # end of file
+            index = end = len(text)
+            symbol.type = self.EOF
+            symbol.string = "EOF"
+        else:
+            index = match.start(group)
+            end = match.end()
+            string = match.group(group)
+            if self.is_mapped:
+                string = string.decode("ascii")
+            symbol.string = string
+        symbol.line_number, char_number = self.locate(index)
+        symbol.start_char_number = symbol.end_char_number = char_number
+
+        if group == self.NAME_GROUP:
+            symbol.end_char_number += len(string)
+            if string in self.keywords:
+                symbol.type = self.KEYWORD
+            else:
+                symbol.type = self.NAME
+            symbol.id = self.name_ids.get(string)
+            if symbol.id is None:
+                [symbol.id] = self.names.lookup([string])
+        elif group == self.NUMBER_GROUP:
+            symbol.number = int(string)
+            symbol.type = self.NUMBER
+        elif group == self.PUNCTUATION_GROUP:
+            symbol.type = self.punctuation[string]
+
+        self.position = end + 1
+        self.current_character = text[end:end + 1]
+        if self.is_mapped:
+            self.current_character = self.current_character.decode("ascii")
+        return symbol
+
+
+class MappedScanner(BufferedScanner):
+    """Tokenize a memory-mapped definition file without copying it.
+
+    The file is memory-mapped, and for ASCII files the regular expressions of
+    BufferedScanner run directly over the mapped bytes. Only the strings of
+    the symbols are decoded, and line numbers are counted only over the text
+    between one symbol and the next, so even very large machine-generated
+    files are scanned with a small, constant memory overhead. Files that are
+    not ASCII are decoded into a string and scanned as in BufferedScanner.
+
+    The file must be opened in binary mode, and newlines are not translated,
+    so lines may end in "\n" or "\r\n" but not in "\r" alone.
+
+    Parameters
+    ----------
+    path: path to the circuit definition file.
+    file: file object of the circuit definition file, opened in binary mode.
+    names: instance of the names.Names() class.
+
+    Public methods
+    -------------
+    read_text(self, file): Returns the mapped bytes of the whole file.
+
+    read_character(self): Reads the next character from the mapped file.
+
+    close(self): Closes the memory map.
+    """
+
+    token = re.compile(BufferedScanner.token.pattern.encode("ascii"))
+    non_ascii = re.compile(b"[\x80-\xff]")
+
+    def read_text(self, file):
+        """Return the mapped bytes of the whole file.
+
+        If the file is not ASCII, return the decoded text instead.
+        """
+        try:
+            self.mapping = mmap.mmap(file.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+        except ValueError:  # empty files cannot be mapped
+            self.mapping = None
+            text = b""
+        else:
+            text = self.mapping
+        if self.non_ascii.search(text) is not None:
+            return bytes(text).decode("utf-8")
+        self.is_mapped = True
+        self.newline = b"\n"
+        return text
+
+    def read_character(self):
+        """Read the next character from the mapped file.
+
+        RETURN: String - the character, or "" at the end of the file
+        """
+        char = super().read_character()
+        if self.is_mapped:
+            return char.decode("ascii")
+        return char
+
+    def close(self):
+        """Close the memory map."""
+        if self.mapping is not None:
+            self.text = b""
+            self.mapping.close()
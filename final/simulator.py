@@ -0,0 +1,436 @@
+"""Run simulations without user interaction.
+
+Used in the Logic Simulator project to run a parsed network for a number of
+cycles, following a schedule of switch changes, and to write the monitored
+signals to a file. This is the simulation loop shared by the command line
+user interface and the batch mode of logsim.py. The state of a simulation can
+be saved as a checkpoint, restored later, written to a file, or forked into
+an independent copy of the simulation.
+
+Classes
+-------
+Simulator - runs the network and writes out the monitored signals.
+"""
+import collections
+import copy
+import json
+import zlib
+from array import array
+
+from vcd import VcdWriter
+
+
+class Simulator:
+    """Run the network and write out the monitored signals.
+
+    Nothing is printed while the simulation runs, so long simulations run at
+    full speed without a terminal.
+
+    A switch schedule is a list of (cycle, switch_id, signal) tuples, sorted
+    by cycle. The switch is set before the given cycle is executed, so a
+    change at cycle 0 applies from the start.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+
+    Public methods
+    --------------
+    run_cycles(self, cycles): Runs the network for the given number of
+                              cycles, recording the monitored signals.
+
+    run(self, cycles, schedule=()): Runs the simulation from a cold start,
+                                    following the switch schedule.
+
+    read_schedule(self, entries): Returns the switch schedule given by
+                                  entries of the form switch=signal@cycle.
+
+    start_output(self, file, output_format): Prepares to write the
+                                             monitored signals to the file.
+
+    finish_output(self): Writes out the monitored signals.
+
+    save_state(self): Returns a checkpoint of the simulation state.
+
+    restore_state(self, state): Returns the simulation to a checkpoint.
+
+    write_state(self, state, file): Writes a checkpoint to a binary file, as
+                                    compressed JSON.
+
+    read_state(self, file): Returns the checkpoint read from a binary file.
+
+    fork(self, state=None): Returns a new simulator on a copy of the network,
+                            starting from the checkpoint.
+    """
+
+    output_formats = ("text", "csv", "vcd")
+
+    # Increase whenever the contents of a checkpoint change
+    state_version = 1
+
+    def __init__(self, names, devices, network, monitors):
+        """Initialise the simulation state."""
+        self.names = names
+        self.devices = devices
+        self.network = network
+        self.monitors = monitors
+
+        self.cycles_completed = 0
+        self.file = None
+
+        # The states of the network are compared for at most period_limit
+        # steps of run_cycles, which bounds the signals kept to replay a
+        # period. A period_limit of 0 turns the comparison off.
+        self.period_limit = 1 << 16
+        self.period = None
+        self.period_start = None
+        self.output_format = None
+        self.vcd_writer = None
+
+        # Characters written for each signal level
+        self.text_signals = {devices.HIGH: "-", devices.LOW: "_",
+                             devices.RISING: "/", devices.FALLING: "\\",
+                             devices.BLANK: " "}
+        self.csv_signals = {devices.HIGH: "1", devices.LOW: "0",
+                            devices.RISING: "1", devices.FALLING: "0",
+                            devices.BLANK: "x"}
+
+    def run_cycles(self, cycles):
+        """Run the network for the given number of cycles.
+
+        The monitored signals are recorded after every cycle. Runs of
+        cycles in which no clock, siggen or switch changes are executed and
+        recorded at once, so a network with slow clocks takes time in
+        proportion to its clock edges rather than its cycles.
+
+        Once the network returns to a state it was in before, its signals
+        repeat from then on, so whole periods are recorded again without
+        being executed. The period found is kept in period, and the cycle
+        it was first seen from in period_start. Return True if successful,
+        or False if the network oscillates.
+        """
+        execute_network = self.network.execute_network
+        skip_quiet_cycles = self.network.skip_quiet_cycles
+        record_signals = self.monitors.record_signals
+        get_state_key = self.network.get_state_key
+
+        # Look for a repeated state with Brent's method: the state is saved
+        # after 1, 2, 4, 8... steps and compared with every later state, so
+        # a period is found within twice the steps it takes to appear
+        self.period = None
+        self.period_start = None
+        saved_key = None
+        if self.period_limit > 0:
+            saved_key = get_state_key()
+        saved_cycle = self.cycles_completed
+        steps = 0
+        step_limit = 1
+        # period_signals stores (signals, cycles) for each step since the
+        # state was saved
+        period_signals = []
+
+        while cycles > 0:
+            step_cycles = skip_quiet_cycles(cycles)
+            if step_cycles is None:
+                return False
+            if not step_cycles:
+                if not execute_network():
+                    return False
+                step_cycles = 1
+            signals = record_signals(step_cycles)
+            self.cycles_completed += step_cycles
+            cycles -= step_cycles
+            if saved_key is None:
+                continue
+
+            period_signals.append((signals, step_cycles))
+            state_key = get_state_key()
+            if state_key == saved_key:
+                # Every later period repeats the signals of this one
+                self.period = self.cycles_completed - saved_cycle
+                self.period_start = saved_cycle
+                repeats = cycles // self.period
+                if repeats:
+                    self.monitors.record_period(period_signals, repeats)
+                    self.cycles_completed += repeats * self.period
+                    cycles -= repeats * self.period
+                saved_key = None
+                period_signals = None
+                continue
+            steps += 1
+            if steps == step_limit:
+                if step_limit >= self.period_limit:
+                    saved_key = None  # give up looking for a period
+                    period_signals = None
+                    continue
+                saved_key = state_key
+                saved_cycle = self.cycles_completed
+                steps = 0
+                step_limit *= 2
+                period_signals = []
+        return True
+
+    def run(self, cycles, schedule=()):
+        """Run the simulation from a cold start, following the schedule.
+
+        Changes scheduled at or after the last cycle are not applied. Return
+        True if successful, or False if the network oscillates.
+        """
+        self.monitors.reset_monitors()
+        self.devices.cold_startup()
+        self.cycles_completed = 0
+        for cycle, switch_id, signal in schedule:
+            if cycle >= cycles:
+                break
+            if not self.run_cycles(cycle - self.cycles_completed):
+                return False
+            self.devices.set_switch(switch_id, signal)
+        return self.run_cycles(cycles - self.cycles_completed)
+
+    def read_schedule(self, entries):
+        """Return the switch schedule given by the entries.
+
+        Each entry is a string of the form switch=signal@cycle, such as
+        "sw1=1@100", where signal is 0 or 1. If @cycle is left out, the
+        change applies from cycle 0. Return None if an entry is not valid or
+        does not name a switch.
+        """
+        schedule = []
+        for entry in entries:
+            [change, _, cycle] = entry.partition("@")
+            [name, _, signal] = change.partition("=")
+            if not cycle:
+                cycle = "0"
+            if signal not in ("0", "1") or not cycle.isdigit():
+                return None
+            switch_id = self.names.query(name.strip())
+            if switch_id not in self.devices.find_devices(self.devices.SWITCH):
+                return None
+            schedule.append((int(cycle), switch_id, int(signal)))
+        # Sort by cycle, keeping the order of changes in the same cycle
+        schedule.sort(key=lambda change: change[0])
+        return schedule
+
+    def start_output(self, file, output_format):
+        """Prepare to write the monitored signals to the file.
+
+        output_format is one of output_formats. VCD output is written while
+        the simulation runs, and the monitors keep no traces in memory. The
+        other formats are written by finish_output. Return True if
+        successful, or False if the format is not known.
+        """
+        if output_format not in self.output_formats:
+            return False
+        self.file = file
+        self.output_format = output_format
+        if output_format == "vcd":
+            self.monitors.window = 0
+            self.vcd_writer = VcdWriter(self.devices, file)
+            self.monitors.add_listener(self.vcd_writer)
+        return True
+
+    def finish_output(self):
+        """Write out the monitored signals, in the format given to
+        start_output."""
+        if self.output_format == "vcd":
+            self.monitors.remove_listener(self.vcd_writer)
+            self.vcd_writer.close()
+            return
+        monitors = self.monitors.monitors_dictionary
+        signal_names = [self.devices.get_signal_name(device_id, output_id)
+                        for device_id, output_id in monitors]
+        if self.output_format == "text":
+            margin = max(map(len, signal_names), default=0)
+            for name, trace in zip(signal_names, monitors.values()):
+                self.file.write(name.ljust(margin) + ": " + "".join(
+                    [self.text_signals[signal] for signal in trace]) + "\n")
+        elif self.output_format == "csv":
+            self.file.write(",".join(["cycle"] + signal_names) + "\n")
+            columns = [[self.csv_signals[signal] for signal in trace]
+                       for trace in monitors.values()]
+            for cycle, row in enumerate(zip(*columns)):
+                self.file.write(",".join((str(cycle),) + row) + "\n")
+
+    def save_state(self):
+        """Return a checkpoint of the simulation state.
+
+        The checkpoint is a dictionary holding the number of cycles
+        completed, the outputs, D-type memory, clock and siggen counters and
+        switch state of every device, and the monitored signals held in
+        memory. It shares nothing with the running simulation, so it is not
+        changed as the simulation goes on, and one checkpoint can be
+        restored or forked any number of times. Signals spilled to disk are
+        not kept.
+        """
+        if self.network.engine is not None:
+            self.network.engine.refresh()
+        self.network.sync_devices()
+        device_ids = self.devices.find_devices()
+        device_states = []
+        for device_id in device_ids:
+            device = self.devices.get_device(device_id)
+            device_states.append((dict(device.outputs), device.dtype_memory,
+                                  device.clock_counter,
+                                  getattr(device, "siggen_counter", None),
+                                  device.switch_state))
+        # Traces are stored as bytes, one per signal level
+        traces = [(output, trace.first_cycle,
+                   array("b", trace).tobytes())
+                  for output, trace in
+                  self.monitors.monitors_dictionary.items()]
+        return {"version": self.state_version,
+                "cycles_completed": self.cycles_completed,
+                "device_ids": list(device_ids),
+                "device_states": device_states, "traces": traces}
+
+    def restore_state(self, state):
+        """Return the simulation to the checkpoint given by save_state.
+
+        The monitors are replaced by those in the checkpoint. Return True if
+        successful, or False if the checkpoint is of a different network.
+        """
+        devices = self.devices
+        device_ids = devices.find_devices()
+        if (state.get("version") != self.state_version or
+                state["device_ids"] != list(device_ids)):
+            return False
+        for device_id, (outputs, _, _, _, _) in zip(device_ids,
+                                                    state["device_states"]):
+            if devices.get_device(device_id).outputs.keys() != outputs.keys():
+                return False
+
+        for device_id, device_state in zip(device_ids,
+                                           state["device_states"]):
+            device = devices.get_device(device_id)
+            [outputs, device.dtype_memory, device.clock_counter,
+             siggen_counter, device.switch_state] = device_state
+            device.outputs.update(outputs)
+            if siggen_counter is not None:
+                device.siggen_counter = siggen_counter
+        devices.state_version += 1
+
+        monitors = self.monitors
+        for trace in monitors.monitors_dictionary.values():
+            trace.close()
+        monitors.monitors_dictionary = collections.OrderedDict()
+        for output, first_cycle, signals in state["traces"]:
+            trace = monitors.make_trace(array("b", signals))
+            trace.first_cycle = first_cycle
+            monitors.monitors_dictionary[output] = trace
+        self.cycles_completed = state["cycles_completed"]
+
+        # The pruned engine is rebuilt for the cone of the restored monitors.
+        # The old engine holds the signals being replaced, so it must not
+        # write them back to the devices while the new one is built.
+        self.network.set_active_outputs(monitors.monitors_dictionary)
+        self.network.engine = None
+        return self.network.compile_network()
+
+    def write_state(self, state, file):
+        """Write the checkpoint to the binary file, as compressed JSON.
+
+        The file holds only numbers and strings, so reading it cannot run
+        any code.
+        """
+        data = {"version": state["version"],
+                "cycles_completed": state["cycles_completed"],
+                "device_ids": state["device_ids"],
+                "device_states": [
+                    [list(outputs.items()), dtype_memory, clock_counter,
+                     siggen_counter, switch_state]
+                    for (outputs, dtype_memory, clock_counter,
+                         siggen_counter, switch_state)
+                    in state["device_states"]],
+                "traces": [[device_id, output_id, first_cycle,
+                            signals.hex()]
+                           for (device_id, output_id), first_cycle, signals
+                           in state["traces"]]}
+        file.write(zlib.compress(json.dumps(data).encode()))
+
+    def read_state(self, file):
+        """Return the checkpoint read from the binary file.
+
+        Return None if the file does not hold a valid checkpoint.
+        """
+        try:
+            data = json.loads(zlib.decompress(file.read()))
+            if data["version"] != self.state_version:
+                return None
+            device_states = []
+            for (outputs, dtype_memory, clock_counter, siggen_counter,
+                 switch_state) in data["device_states"]:
+                device_states.append((
+                    {output_id: signal for output_id, signal in outputs},
+                    dtype_memory, clock_counter, siggen_counter,
+                    switch_state))
+            traces = [((device_id, output_id), first_cycle,
+                       bytes.fromhex(signals))
+                      for device_id, output_id, first_cycle, signals
+                      in data["traces"]]
+            state = {"version": data["version"],
+                     "cycles_completed": data["cycles_completed"],
+                     "device_ids": list(data["device_ids"]),
+                     "device_states": device_states, "traces": traces}
+            # Every ID, signal and counter is an integer or None
+            values = [state["cycles_completed"], *state["device_ids"]]
+            for outputs, *device_values in device_states:
+                values += [*outputs.keys(), *outputs.values(),
+                           *device_values]
+            for (device_id, output_id), first_cycle, _ in traces:
+                values += [device_id, output_id, first_cycle]
+        except (zlib.error, KeyError, TypeError, ValueError):
+            return None
+        if any(value is not None and type(value) is not int
+               for value in values):
+            return None
+        return state
+
+    def fork(self, state=None):
+        """Return a new simulator on a copy of the network.
+
+        The new simulator starts from the checkpoint, or from the current
+        state if none is given, and can then be run without changing this
+        one. Many forks can be made from one checkpoint, each sharing the
+        cycles already simulated instead of running them again. The fork
+        shares the names and the settings of each device, and copies only
+        the dictionaries and lists that change as it runs or is edited.
+        Listeners and output files are not copied. Return None if the
+        checkpoint is of a different network.
+        """
+        if state is None:
+            state = self.save_state()
+        devices = copy.copy(self.devices)
+        # device_copies stores {device: copy of the device}
+        device_copies = {}
+        for device in self.devices.devices_list:
+            device_copy = device_copies[device] = copy.copy(device)
+            device_copy.inputs = dict(device.inputs)
+            device_copy.outputs = dict(device.outputs)
+        devices.devices_list = list(device_copies.values())
+        devices.device_index = {
+            device_id: device_copies[device]
+            for device_id, device in self.devices.device_index.items()}
+        devices.kind_index = {device_kind: list(device_ids) for
+                              device_kind, device_ids in
+                              self.devices.kind_index.items()}
+        devices.gate_input_ids = list(self.devices.gate_input_ids)
+
+        # The engine is rebuilt and the traces are restored from the
+        # checkpoint, so neither is copied
+        network = copy.copy(self.network)
+        network.devices = devices
+        network.engine = None
+        network.active_outputs = []
+        monitors = copy.copy(self.monitors)
+        monitors.devices = devices
+        monitors.network = network
+        monitors.listeners = []
+        monitors.monitors_dictionary = collections.OrderedDict()
+
+        simulator = Simulator(self.names, devices, network, monitors)
+        if not simulator.restore_state(state):
+            return None
+        return simulator
@@ -0,0 +1,101 @@
+"""Test the batch module."""
+import io
+import json
+
+import pytest
+
+from batch import BatchRunner
+
+definition = """NETWORK{
+    DEVICES{
+        sw1 = SWITCH;
+        sw2 = SWITCH;
+        g1 = NAND inputs 2;
+    }
+    CONNECTIONS{
+        sw1 - g1.I1;
+        sw2 - g1.I2;
+    }
+    SIGNALS{
+        sw1 = 0;
+    }
+    MONITOR{
+        sw1;
+        g1;
+    }
+}
+"""
+
+
+@pytest.fixture
+def definition_path(tmp_path, monkeypatch):
+    """Return the path of a definition file, keeping the network cache in a
+    temporary directory."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    path = tmp_path / "nand.txt"
+    path.write_text(definition)
+    return str(path)
+
+
+def test_read_jobs():
+    """Test if read_jobs reads the jobs and rejects invalid lines."""
+    runner = BatchRunner(1)
+    jobs_file = io.StringIO("# comment\n\na.txt 10\nb.txt 5 sw=1@2 sw=0\n")
+    assert runner.read_jobs(jobs_file) == [("a.txt", 10, []),
+                                           ("b.txt", 5, ["sw=1@2", "sw=0"])]
+    assert runner.read_jobs(io.StringIO("a.txt\n")) is None
+    assert runner.read_jobs(io.StringIO("a.txt ten\n")) is None
+
+
+def test_run_job(definition_path, tmp_path):
+    """Test if run_job gives the signals and status of each job."""
+    runner = BatchRunner(1)
+    result = runner.run_job((definition_path, 5, ["sw1=1@1", "sw2=1@3"]))
+    assert result["status"] == runner.PASSED
+    assert result["cycles_completed"] == 5
+    assert result["signals"] == {"sw1": "01111", "g1": "11100"}
+
+    empty_path = tmp_path / "empty.txt"
+    empty_path.write_text("")
+    for job, status in [((str(tmp_path / "missing.txt"), 5, []),
+                         runner.FILE_ERROR),
+                        ((str(empty_path), 5, []), runner.DEFINITION_ERRORS),
+                        ((definition_path, 5, ["g1=1"]),
+                         runner.SCHEDULE_ERROR)]:
+        assert runner.run_job(job)["status"] == status
+
+
+def test_network_reuse(definition_path):
+    """Test if a loaded network is reused with its switches reset."""
+    runner = BatchRunner(1)
+    network_objects = runner.get_network(definition_path)
+    runner.run_job((definition_path, 2, ["sw1=1", "sw2=1"]))
+    assert runner.get_network(definition_path) is network_objects
+
+    # The switches are back to their defined states
+    result = runner.run_job((definition_path, 2, []))
+    assert result["signals"] == {"sw1": "00", "g1": "11"}
+
+
+def test_run_jobs(definition_path):
+    """Test if jobs run in worker processes give the same results."""
+    jobs = [(definition_path, cycle, ["sw1=1@" + str(cycle % 3),
+                                      "sw2=1@" + str(cycle % 4)])
+            for cycle in range(1, 9)]
+    results = BatchRunner(1).run_jobs(jobs)
+    assert BatchRunner(3).run_jobs(jobs) == results
+    assert [result["cycles_completed"] for result in results] == list(
+        range(1, 9))
+
+
+def test_write_results(definition_path):
+    """Test if write_results counts the results and writes them as JSON."""
+    runner = BatchRunner(1)
+    results = runner.run_jobs([(definition_path, 3, []),
+                               (definition_path, 3, ["sw3=1"])])
+    file = io.StringIO()
+    runner.write_results(results, file)
+    written = json.loads(file.getvalue())
+    assert written["counts"][runner.PASSED] == 1
+    assert written["counts"][runner.SCHEDULE_ERROR] == 1
+    assert written["results"] == results
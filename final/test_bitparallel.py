@@ -0,0 +1,146 @@
+"""Test the bitparallel module."""
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from bitparallel import BitParallelNetwork
+
+
+def make_network():
+    """Return a Network class instance with gates of every kind.
+
+    Two switches drive an AND, OR, NAND, NOR and XOR gate, and the XOR gate is
+    clocked into a D-type.
+    """
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [SW1, SW2, A1, O1, NA1, NO1, X1, D1, CL1, I1,
+     I2] = new_names.lookup(["Sw1", "Sw2", "A1", "O1", "Na1", "No1", "X1",
+                             "D1", "Cl1", "I1", "I2"])
+    new_devices.make_device(SW1, new_devices.SWITCH, 0)
+    new_devices.make_device(SW2, new_devices.SWITCH, 0)
+    new_devices.make_device(CL1, new_devices.CLOCK, 2)
+    new_devices.make_device(D1, new_devices.D_TYPE)
+    for device_id, device_kind in [(A1, new_devices.AND),
+                                   (O1, new_devices.OR),
+                                   (NA1, new_devices.NAND),
+                                   (NO1, new_devices.NOR)]:
+        new_devices.make_device(device_id, device_kind, 2)
+    new_devices.make_device(X1, new_devices.XOR)
+
+    for gate_id in [A1, O1, NA1, NO1, X1]:
+        new_network.make_connection(SW1, None, gate_id, I1)
+        new_network.make_connection(SW2, None, gate_id, I2)
+    for connection in [(X1, None, D1, new_devices.DATA_ID),
+                       (CL1, None, D1, new_devices.CLK_ID),
+                       (SW1, None, D1, new_devices.SET_ID),
+                       (NO1, None, D1, new_devices.CLEAR_ID)]:
+        new_network.make_connection(*connection)
+    return new_network
+
+
+@pytest.fixture
+def new_network():
+    """Return a Network class instance with gates of every kind."""
+    return make_network()
+
+
+def test_run_scenarios(new_network):
+    """Test if every lane gives the same traces as running on its own."""
+    names = new_network.names
+    devices = new_network.devices
+    [SW1, SW2] = names.lookup(["Sw1", "Sw2"])
+    outputs = [(device_id, None) for device_id in
+               names.lookup(["A1", "O1", "Na1", "No1", "X1", "Cl1"])]
+    outputs += [(names.query("D1"), devices.Q_ID)]
+    switch_assignments = [{SW1: 0, SW2: 0}, {SW1: 0, SW2: 1},
+                          {SW1: 1, SW2: 0}, {SW1: 1}]
+
+    random.seed(1)
+    devices.cold_startup()
+    engine = BitParallelNetwork(names, devices, new_network)
+    scenario_traces = engine.run_scenarios(switch_assignments, 12, outputs)
+    assert len(scenario_traces) == 4
+
+    # Run each scenario on its own, from the same start. The device IDs are
+    # the same in every copy of the network.
+    for switch_assignment, traces in zip(switch_assignments,
+                                         scenario_traces):
+        new_network = make_network()
+        devices = new_network.devices
+        new_network.engine_type = new_network.SWEEP
+        new_network.compile_network()
+        random.seed(1)
+        devices.cold_startup()
+        for switch_id in [SW1, SW2]:
+            devices.set_switch(switch_id,
+                               switch_assignment.get(switch_id, 0))
+        expected = {output: [] for output in outputs}
+        for _ in range(12):
+            assert new_network.execute_network()
+            for output in outputs:
+                expected[output].append(
+                    new_network.get_output_signal(*output))
+        assert traces == expected
+
+
+def test_run_scenarios_oscillating(new_network):
+    """Test if only the oscillating lanes have their traces cut short."""
+    names = new_network.names
+    devices = new_network.devices
+    [SW1, N1, I1] = names.lookup(["Sw1", "N1", "I1"])
+    devices.make_device(N1, devices.NAND, 2)
+    new_network.make_connection(SW1, None, N1, I1)
+    new_network.make_connection(N1, None, N1, names.query("I2"))
+
+    engine = BitParallelNetwork(names, devices, new_network)
+    traces = engine.run_scenarios([{SW1: 0}, {SW1: 1}], 5, [(N1, None)])
+    assert traces[0] == {(N1, None): [devices.HIGH] * 5}
+    assert traces[1] == {(N1, None): []}
+
+
+def test_run_scenarios_gives_errors(new_network):
+    """Test if run_scenarios returns None for invalid arguments."""
+    names = new_network.names
+    [SW1, A1, A2] = names.lookup(["Sw1", "A1", "A2"])
+    engine = BitParallelNetwork(names, new_network.devices, new_network)
+
+    # A1 is not a switch
+    assert engine.run_scenarios([{A1: 1}], 5, [(SW1, None)]) is None
+    # A2 does not exist
+    assert engine.run_scenarios([{SW1: 1}], 5, [(A2, None)]) is None
+
+
+def test_run_scenarios_settled_lanes(new_network):
+    """Test if an oscillating lane does not change the traces of a settled
+    lane."""
+    names = new_network.names
+    devices = new_network.devices
+    [SW1, SW2, CL1, N1, D2, SG1, I1, I2] = names.lookup(
+        ["Sw1", "Sw2", "Cl1", "N1", "D2", "Sg1", "I1", "I2"])
+    # N1 oscillates if Sw2 is HIGH
+    devices.make_device(N1, devices.NAND, 2)
+    new_network.make_connection(SW2, None, N1, I1)
+    new_network.make_connection(N1, None, N1, I2)
+    # A siggen on the SET of D2 is only seen in the pass after it changes
+    devices.make_device(SG1, devices.SIGGEN, "0001")
+    devices.make_device(D2, devices.D_TYPE)
+    for connection in [(CL1, None, D2, devices.CLK_ID),
+                       (SW1, None, D2, devices.DATA_ID),
+                       (SG1, None, D2, devices.SET_ID),
+                       (SW1, None, D2, devices.CLEAR_ID)]:
+        assert new_network.make_connection(*connection) == \
+            new_network.NO_ERROR
+
+    outputs = [(D2, devices.Q_ID)]
+    random.seed(2)
+    devices.cold_startup()
+    engine = BitParallelNetwork(names, devices, new_network)
+    [alone] = engine.run_scenarios([{SW2: 0}], 12, outputs)
+    paired = engine.run_scenarios([{SW2: 0}, {SW2: 1}], 12, outputs)
+    assert paired == [alone, {(D2, devices.Q_ID): []}]
@@ -0,0 +1,140 @@
+"""Test the cache module."""
+import io
+import os
+import pickle
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import BufferedScanner
+from parse import Parser
+from cache import NetworkCache
+
+
+@pytest.fixture
+def new_cache(tmp_path):
+    """Return a NetworkCache class instance using a temporary directory."""
+    return NetworkCache(str(tmp_path))
+
+
+def parse_file(path):
+    """Return the names, devices, network and monitors parsed from a file."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    with open(path) as file:
+        scanner = BufferedScanner(path, file, names)
+        parser = Parser(names, devices, network, monitors, scanner)
+        assert parser.parse_network()
+    return names, devices, network, monitors
+
+
+def run_network(names, devices, network, monitors):
+    """Run the network from a fixed start and return the monitored signals."""
+    network.compile_network()
+    random.seed(3)
+    devices.cold_startup()
+    for _ in range(20):
+        assert network.execute_network()
+        monitors.record_signals()
+    return {output: list(trace)
+            for output, trace in monitors.monitors_dictionary.items()}
+
+
+def test_get_key(new_cache):
+    """Test if the key depends only on the file contents."""
+    file = io.BytesIO(b"NETWORK{}")
+    file.seek(3)
+    key = new_cache.get_key(file)
+    assert file.tell() == 3
+    assert new_cache.get_key(io.BytesIO(b"WORK{}")) == key
+    assert new_cache.get_key(io.BytesIO(b"WORK{ }")) != key
+
+
+def test_code_version(new_cache):
+    """Test if the key depends on the code version, and nothing is cached
+    without one."""
+    file = io.BytesIO(b"NETWORK{}")
+    key = new_cache.get_key(file)
+    assert new_cache.code_version == new_cache.get_code_version()
+    new_cache.code_version = "other"
+    assert new_cache.get_key(file) != key
+
+    new_cache.code_version = None
+    assert new_cache.get_key(file) is None
+    assert new_cache.load(None) is None
+    assert not new_cache.save(None, *parse_file(
+        "final_test_files/flipflop.txt"))
+
+
+def test_save_and_load(new_cache):
+    """Test if a loaded network gives the same signals as a parsed one."""
+    path = "final_test_files/flipflop.txt"
+    parsed = parse_file(path)
+    with open(path, "rb") as file:
+        key = new_cache.get_key(file)
+    assert new_cache.load(key) is None
+    assert new_cache.save(key, *parsed)
+
+    loaded = new_cache.load(key)
+    [names, devices, network, monitors] = loaded
+    assert names.names == parsed[0].names
+    assert network.engine is not None
+    assert monitors.network is network
+    assert run_network(*loaded) == run_network(*parsed)
+
+
+def test_load_invalid_snapshot(new_cache):
+    """Test if load returns None for a damaged snapshot."""
+    key = new_cache.get_key(io.BytesIO(b"NETWORK{}"))
+    with open(new_cache.get_path(key), "wb") as file:
+        file.write(b"not a snapshot")
+    assert new_cache.load(key) is None
+
+
+def test_load_pickled_snapshot(new_cache, tmp_path):
+    """Test if load does not unpickle a snapshot, so it runs no code."""
+    path = tmp_path / "created.txt"
+    key = new_cache.get_key(io.BytesIO(b"NETWORK{}"))
+    with open(new_cache.get_path(key), "wb") as file:
+        pickle.dump(Payload(str(path)), file)
+    assert new_cache.load(key) is None
+    assert not path.exists()
+
+
+class Payload:
+    """Create a file when unpickled."""
+
+    def __init__(self, path):
+        """Keep the path of the file to create."""
+        self.path = path
+
+    def __reduce__(self):
+        """Return the call that unpickling makes."""
+        return (open, (self.path, "w"))
+
+
+def test_remove_old_entries(new_cache):
+    """Test if only the most recently used snapshots are kept."""
+    new_cache.max_entries = 2
+    parsed = parse_file("final_test_files/flipflop.txt")
+    keys = [new_cache.get_key(io.BytesIO(bytes([i]))) for i in range(3)]
+    for time, key in enumerate(keys[:2]):
+        assert new_cache.save(key, *parsed)
+        os.utime(new_cache.get_path(key), (time, time))
+    # Loading the first snapshot makes the second the least recently used
+    assert new_cache.load(keys[0]) is not None
+    old_path = os.path.join(new_cache.directory, "old.pickle")
+    with open(old_path, "wb") as file:
+        file.write(b"old")
+
+    assert new_cache.save(keys[2], *parsed)
+    assert os.path.exists(new_cache.get_path(keys[0]))
+    assert not os.path.exists(new_cache.get_path(keys[1]))
+    assert os.path.exists(new_cache.get_path(keys[2]))
+    assert not os.path.exists(old_path)
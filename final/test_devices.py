@@ -1,4 +1,6 @@
 """Test the devices module."""
+import random
+
 import pytest
 
 from names import Names
@@ -148,3 +150,97 @@ def test_set_switch(new_devices):
     # Set switch Sw1 to LOW
     new_devices.set_switch(SW1_ID, new_devices.LOW)
     assert switch_object.switch_state == new_devices.LOW
+
+
+def test_device_index(new_devices):
+    """Test if the device index and kind buckets track added devices."""
+    names = new_devices.names
+    switch_ids = names.lookup_many(["Sw" + str(i) for i in range(100)])
+    [AND1_ID] = names.lookup(["And1"])
+
+    for switch_id in switch_ids:
+        new_devices.make_device(switch_id, new_devices.SWITCH, 0)
+    new_devices.make_device(AND1_ID, new_devices.AND, 2)
+
+    assert new_devices.get_device(switch_ids[42]).device_id == switch_ids[42]
+    assert new_devices.find_devices(new_devices.SWITCH) == switch_ids
+    assert new_devices.find_devices() == switch_ids + [AND1_ID]
+
+    # The same cached list is returned on every call
+    assert (new_devices.find_devices(new_devices.SWITCH) is
+            new_devices.find_devices(new_devices.SWITCH))
+
+
+def test_make_devices(new_devices):
+    """Test if make_devices makes a batch with one cold start-up."""
+    names = new_devices.names
+    [CLOCK1_ID, D1_ID, AND1_ID, AND2_ID,
+     X_ID] = names.lookup(["Clock1", "D1", "And1", "And2", "X"])
+    version = new_devices.state_version
+
+    errors = new_devices.make_devices([
+        (CLOCK1_ID, new_devices.CLOCK, 5),
+        (D1_ID, new_devices.D_TYPE, None),
+        (AND1_ID, new_devices.AND, 3),
+        (AND2_ID, new_devices.AND, 2),
+        (CLOCK1_ID, new_devices.CLOCK, 5),
+        (X_ID, new_devices.AND, 17)])
+    assert errors == [new_devices.NO_ERROR] * 4 + [
+        new_devices.DEVICE_PRESENT, new_devices.INVALID_QUALIFIER]
+    assert new_devices.state_version == version + 1
+    assert new_devices.get_device(D1_ID).dtype_memory in [new_devices.LOW,
+                                                          new_devices.HIGH]
+    assert new_devices.get_device(CLOCK1_ID).clock_counter in range(5)
+    # Gates share the same input IDs
+    assert (list(new_devices.get_device(AND2_ID).inputs) ==
+            names.lookup(["I1", "I2"]))
+
+
+def test_batch_defers_cold_startup(new_devices):
+    """Test if cold start-up is deferred until the batch ends."""
+    names = new_devices.names
+    [D1_ID, D2_ID] = names.lookup(["D1", "D2"])
+
+    new_devices.start_batch()
+    new_devices.make_d_type(D1_ID)
+    assert new_devices.get_device(D1_ID).dtype_memory is None
+    new_devices.end_batch()
+    assert new_devices.get_device(D1_ID).dtype_memory is not None
+
+    # Outside a batch, the cold start-up is immediate
+    new_devices.make_d_type(D2_ID)
+    assert new_devices.get_device(D2_ID).dtype_memory is not None
+
+
+
+def test_batch_ends_on_error(new_devices):
+    """Test if make_devices closes the batch when making a device fails."""
+    names = new_devices.names
+    [D1_ID, D2_ID] = names.lookup(["D1", "D2"])
+
+    def device_specs():
+        yield (D1_ID, new_devices.D_TYPE, None)
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        new_devices.make_devices(device_specs())
+    assert not new_devices.batch_open
+    assert new_devices.get_device(D1_ID).dtype_memory is not None
+
+    new_devices.make_d_type(D2_ID)
+    assert new_devices.get_device(D2_ID).dtype_memory is not None
+
+def test_cold_startup_seeded(new_devices):
+    """Test if cold_startup repeats the same state for the same seed."""
+    names = new_devices.names
+    [CLOCK1_ID, D1_ID] = names.lookup(["Clock1", "D1"])
+    new_devices.make_devices([(CLOCK1_ID, new_devices.CLOCK, 50),
+                              (D1_ID, new_devices.D_TYPE, None)])
+    clock = new_devices.get_device(CLOCK1_ID)
+
+    states = []
+    for seed in [1, 2, 1]:
+        new_devices.cold_startup(random.Random(seed))
+        states.append((clock.clock_counter, clock.outputs[None],
+                       new_devices.get_device(D1_ID).dtype_memory))
+    assert states[0] == states[2]
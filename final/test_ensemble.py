@@ -0,0 +1,97 @@
+"""Test the ensemble module."""
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import BufferedScanner
+from parse import Parser
+from ensemble import Ensemble
+
+
+@pytest.fixture
+def flipflop_ensemble():
+    """Return an Ensemble class instance for the flip-flop test file."""
+    path = "final_test_files/flipflop.txt"
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    with open(path) as file:
+        scanner = BufferedScanner(path, file, names)
+        parser = Parser(names, devices, network, monitors, scanner)
+        assert parser.parse_network()
+    return Ensemble(names, devices, network, monitors)
+
+
+def test_runs_agree(flipflop_ensemble):
+    """Test if every way of running the cold starts gives the same traces."""
+    ensemble = flipflop_ensemble
+    seeds = list(range(40))
+    results = ensemble.run(seeds, 20)
+    assert len(results) == 40
+    assert ensemble.run(seeds, 20, bit_parallel=True) == results
+    assert ensemble.run(seeds, 20, processes=3) == results
+
+
+def test_runs_agree_with_siggen(flipflop_ensemble):
+    """Test if the runs agree when a siggen drives the SET of a D-type, which
+    sees the cold start output of the siggen."""
+    ensemble = flipflop_ensemble
+    names = ensemble.names
+    devices = ensemble.devices
+    network = ensemble.network
+    [D1, SIGGEN] = names.lookup(["dtype", "siggen"])
+    devices.make_device(SIGGEN, devices.SIGGEN, "0011")
+    assert network.remove_connection(D1, devices.SET_ID)
+    assert network.make_connection(SIGGEN, None, D1,
+                                   devices.SET_ID) == network.NO_ERROR
+    seeds = list(range(40))
+    results = ensemble.run(seeds, 20)
+    assert ensemble.run(seeds, 20, bit_parallel=True) == results
+
+
+def test_run_repeats_cold_start(flipflop_ensemble):
+    """Test if a run gives the same traces as the network after the same
+    cold start."""
+    ensemble = flipflop_ensemble
+    [results] = ensemble.run([7], 15)
+
+    network = ensemble.network
+    ensemble.devices.cold_startup(random.Random(7))
+    traces = {output: [] for output in ensemble.monitors.monitors_dictionary}
+    for _ in range(15):
+        assert network.execute_network()
+        for output, trace in traces.items():
+            trace.append(network.get_output_signal(*output))
+    assert results == traces
+
+
+def test_get_high_probabilities(flipflop_ensemble):
+    """Test if probabilities count HIGH and RISING over the runs so far."""
+    ensemble = flipflop_ensemble
+    devices = ensemble.devices
+    [LOW, HIGH, RISING] = [devices.LOW, devices.HIGH, devices.RISING]
+    outputs = list(ensemble.monitors.monitors_dictionary)
+    results = [{output: [HIGH, LOW, RISING] for output in outputs},
+               {output: [LOW, LOW] for output in outputs}]
+    probabilities = ensemble.get_high_probabilities(results)
+    assert probabilities[outputs[0]] == [0.5, 0.0, 1.0]
+
+
+def test_get_outcome_classes(flipflop_ensemble):
+    """Test if seeds are grouped by their traces, most common first."""
+    ensemble = flipflop_ensemble
+    seeds = list(range(30))
+    results = ensemble.run(seeds, 20)
+    classes = ensemble.get_outcome_classes(seeds, results)
+    assert sorted(seed for class_seeds, _ in classes
+                  for seed in class_seeds) == seeds
+    sizes = [len(class_seeds) for class_seeds, _ in classes]
+    assert sizes == sorted(sizes, reverse=True)
+    for class_seeds, traces in classes:
+        for seed in class_seeds:
+            assert results[seed] == traces
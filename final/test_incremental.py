@@ -0,0 +1,180 @@
+"""Test the incremental module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import BufferedScanner
+from parse import Parser
+from error import Error
+from incremental import IncrementalParser
+import io
+
+definition = """NETWORK{
+    DEVICES{
+        dtype = DTYPE;
+        a1 = AND inputs 2;
+        a2 = AND inputs 2;
+        o1 = OR inputs 2;
+        n1 = NAND inputs 1;
+        sw = SWITCH;
+        clock = CLOCK halfperiod 3;
+        set = SWITCH;
+        clear = SWITCH;
+    }
+    CONNECTIONS{
+        clock - dtype.CLK;
+        set - dtype.SET;
+        sw - n1.I1;
+        n1 - a1.I1;
+        dtype.Q - a1.I2;
+        sw - a2.I1;
+        dtype.QBAR - a2.I2; a1 - o1.I1;
+        a2 - o1.I2;
+        o1 - dtype.DATA; // data input
+        clear - dtype.CLEAR;
+    }
+    SIGNALS{
+        sw = 1;
+        set = 0;
+        clear = 0;
+    }
+    MONITOR{
+        dtype.Q;
+        clock;
+        sw;
+    }
+}
+"""
+
+
+def describe(names, devices, network, monitors):
+    """Return the network, described by name so that networks can be
+    compared."""
+    def name(name_id):
+        return None if name_id is None else names.get_name_string(name_id)
+
+    description = {}
+    for device_id in devices.find_devices():
+        device = devices.get_device(device_id)
+        inputs = {}
+        for input_id in device.inputs:
+            connection = network.get_connected_output(device_id, input_id)
+            if connection is not None:
+                connection = (name(connection[0]), name(connection[1]))
+            inputs[name(input_id)] = connection
+        description[name(device_id)] = (
+            device.device_kind, inputs, sorted(map(name, device.outputs),
+                                               key=str),
+            device.switch_state, device.clock_half_period)
+    description["monitors"] = sorted(
+        (name(device_id), str(name(output_id))) for device_id, output_id in
+        monitors.monitors_dictionary)
+    return description
+
+
+def parse_text(text):
+    """Return the description of a network parsed from scratch."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    scanner = BufferedScanner("", io.StringIO(text), names)
+    parser = Parser(names, devices, network, monitors, scanner)
+    assert parser.parse_network()
+    return describe(names, devices, network, monitors)
+
+
+@pytest.fixture
+def parser():
+    """Return an IncrementalParser class instance that has parsed the
+    definition."""
+    Error.reset()
+    new_parser = IncrementalParser()
+    assert new_parser.parse(definition)
+    assert new_parser.full_count == 1
+    return new_parser
+
+
+@pytest.mark.parametrize("old, new", [
+    # change a connection
+    ("sw - a2.I1;", "set - a2.I1;"),
+    # remove a connection on the same line as another
+    ("dtype.QBAR - a2.I2; a1 - o1.I1;", "a1 - o1.I1;"),
+    # add a device and connect it
+    ("clear = SWITCH;", "clear = SWITCH;\n        x1 = XOR inputs 2;"),
+    ("clear - dtype.CLEAR;", "clear - dtype.CLEAR; sw - x1.I1;\n"
+                             "        set - x1.I2;"),
+    # change the switches
+    ("sw = 1;", "sw = 0;\n        set = 1;"),
+    # change the monitors
+    ("clock;\n", "clock;\n        dtype.QBAR; a1;\n"),
+    ("sw;\n", ""),
+    # edit only comments and spaces
+    ("// data input", "/* the data; input */"),
+    ("    SIGNALS{", "\n\n    SIGNALS  {"),
+])
+def test_patch(parser, old, new):
+    """Test if patching gives the same network as parsing from scratch."""
+    text = definition
+    edits = [(old, new)]
+    if "x1.I1" in new:  # add the device first
+        edits.insert(0, ("clear = SWITCH;",
+                         "clear = SWITCH;\n        x1 = XOR inputs 2;"))
+    for edit_old, edit_new in edits:
+        assert edit_old in text
+        text = text.replace(edit_old, edit_new, 1)
+        assert parser.parse(text)
+    assert parser.full_count == 1
+    assert parser.patch_count == len(edits)
+    assert describe(parser.names, parser.devices, parser.network,
+                    parser.monitors) == parse_text(text)
+
+
+@pytest.mark.parametrize("old, new", [
+    # remove a device, and the connections to it
+    ("n1 = NAND inputs 1;", ""),
+    # redefine a device
+    ("n1 = NAND inputs 1;", "n1 = NOR inputs 1;"),
+])
+def test_full_parse(parser, old, new):
+    """Test if changes that cannot be patched are parsed from scratch."""
+    text = definition.replace(old, new, 1)
+    if not new:
+        text = text.replace("sw - n1.I1;", "").replace("n1 - a1.I1;",
+                                                       "sw - a1.I1;")
+    assert parser.parse(text)
+    assert parser.full_count == 2
+    assert describe(parser.names, parser.devices, parser.network,
+                    parser.monitors) == parse_text(text)
+
+
+@pytest.mark.parametrize("old, new, line_number", [
+    ("sw - a2.I1;", "sw - a9.I1;", 19),  # patched, then parsed in full
+    ("MONITOR{", "MONITOR", 31),  # parsed in full
+])
+def test_patch_errors(parser, old, new, line_number):
+    """Test if errors in the edited text are reported against its lines."""
+    assert not parser.parse(definition.replace(old, new, 1))
+    assert Error.num_errors > 0
+    assert Error.symbols[0].line_number == line_number
+    Error.reset()
+
+    # after an error, the next parse is a full parse
+    assert parser.parse(definition)
+    assert parser.full_count == 3
+    assert describe(parser.names, parser.devices, parser.network,
+                    parser.monitors) == parse_text(definition)
+
+
+def test_changed_network(parser):
+    """Test if a full parse is done after the network is changed directly."""
+    [device_id, output_id] = parser.devices.get_signal_ids("a1")
+    assert parser.monitors.make_monitor(device_id, output_id) == \
+        parser.monitors.NO_ERROR
+    text = definition.replace("sw = 1;", "sw = 0;")
+    assert parser.parse(text)
+    assert parser.full_count == 2
+    assert describe(parser.names, parser.devices, parser.network,
+                    parser.monitors) == parse_text(text)
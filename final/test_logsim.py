@@ -0,0 +1,108 @@
+"""Test the logsim module."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# The longest the command line interface may take to import, in seconds.
+# It takes about 0.05 s, so this only fails if a slow import is added.
+import_budget = 0.5
+
+gui_modules = ["gui", "wx", "OpenGL", "numpy"]
+directory = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_python(*arguments, cache_home=None):
+    """Run Python in a new process and return the completed process.
+
+    If cache_home is given, the network cache is kept there.
+    """
+    environment = dict(os.environ)
+    if cache_home is not None:
+        environment["XDG_CACHE_HOME"] = str(cache_home)
+    return subprocess.run([sys.executable, *arguments], cwd=directory,
+                          capture_output=True, text=True, timeout=60,
+                          env=environment)
+
+
+def test_no_gui_imports():
+    """Test if importing logsim does not import the GUI modules."""
+    process = run_python("-c", "import sys, logsim; "
+                         "print(' '.join(sorted(sys.modules)))")
+    assert process.returncode == 0, process.stderr
+    modules = process.stdout.split()
+    assert "logsim" in modules
+    for module in gui_modules:
+        assert module not in modules
+
+
+def test_import_budget():
+    """Test if logsim imports within the import time budget."""
+    process = run_python("-X", "importtime", "-c", "import logsim")
+    assert process.returncode == 0, process.stderr
+    for line in process.stderr.splitlines():
+        # Lines are of the form: import time: self | cumulative | package
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == "logsim":
+            cumulative = int(fields[1]) / 1e6  # microseconds to seconds
+            break
+    else:
+        pytest.fail("no import time reported for logsim")
+    assert cumulative < import_budget
+
+
+def test_usage_message():
+    """Test if the command line help is shown without the GUI modules."""
+    process = run_python("logsim.py", "-h")
+    assert process.returncode == 0, process.stderr
+    assert "Usage:" in process.stdout
+
+
+def test_batch_mode(tmp_path):
+    """Test if batch mode writes the monitored signals and nothing else."""
+    output_path = tmp_path / "traces.csv"
+    process = run_python("logsim.py", "-b", "final_test_files/flipflop.txt",
+                         "-n", "8", "-s", "set=1@2", "-s", "set=0@4",
+                         "-o", str(output_path), "-f", "csv",
+                         cache_home=tmp_path)
+    assert process.returncode == 0, process.stderr
+    assert process.stdout == ""
+    lines = output_path.read_text().splitlines()
+    assert lines[0] == "cycle,dtype.Q,clock,sw,set,clear"
+    assert len(lines) == 9
+    assert [line.split(",")[4] for line in lines[1:]] == [
+        "0", "0", "1", "1", "0", "0", "0", "0"]
+
+
+@pytest.mark.parametrize("arguments, status", [
+    (["-b", "final_test_files/missing.txt"], 1),
+    (["-b", "final_test_files/flipflop.txt", "-n", "x"], 1),
+    (["-b", "final_test_files/flipflop.txt", "-f", "pdf"], 1),
+    (["-b", "final_test_files/flipflop.txt", "-s", "dtype=1"], 1),
+    (["-b", "final_test_files/empty.txt"], 2),
+])
+def test_batch_mode_errors(tmp_path, arguments, status):
+    """Test if batch mode exits with the right status on errors."""
+    process = run_python("logsim.py", *arguments, cache_home=tmp_path)
+    assert process.returncode == status
+    assert process.stdout == ""
+    assert process.stderr.startswith("Error")
+
+
+def test_jobs_mode(tmp_path):
+    """Test if -j runs the listed jobs and writes all the results."""
+    jobs_path = tmp_path / "jobs.txt"
+    jobs_path.write_text("final_test_files/flipflop.txt 5\n"
+                         "final_test_files/flipflop.txt 3 set=1@1\n"
+                         "final_test_files/missing.txt 3\n")
+    output_path = tmp_path / "results.json"
+    process = run_python("logsim.py", "-j", str(jobs_path), "-p", "2",
+                         "-o", str(output_path), cache_home=tmp_path)
+    assert process.returncode == 4, process.stderr
+    assert process.stdout == ""
+    results = json.loads(output_path.read_text())["results"]
+    assert [result["status"] for result in results] == [
+        "passed", "passed", "file error"]
+    assert results[1]["signals"]["set"] == "011"
@@ -197,3 +197,75 @@ def test_display_signals(capsys, new_monitors):
             "Clock1: -__--__--__--__--__-" in traces)
 
     assert "" in traces  # additional empty line at the end
+
+
+def test_run_length_monitors(new_monitors):
+    """Test if run-length traces record the same signals as array traces."""
+    devices = new_monitors.devices
+    network = new_monitors.network
+    [SW1_ID] = new_monitors.names.lookup(["Sw1"])
+
+    new_monitors.trace_type = new_monitors.RUN_LENGTH
+    new_monitors.reset_monitors()
+    for cycle in range(6):
+        if cycle == 3:
+            devices.set_switch(SW1_ID, devices.HIGH)
+        network.execute_network()
+        new_monitors.record_signals()
+
+    trace = new_monitors.monitors_dictionary[(SW1_ID, None)]
+    assert trace.get_runs() == [(devices.LOW, 3), (devices.HIGH, 3)]
+    assert trace == [devices.LOW] * 3 + [devices.HIGH] * 3
+
+
+def test_monitor_window(new_monitors):
+    """Test if old cycles are spilled to disk and can be read back."""
+    devices = new_monitors.devices
+    network = new_monitors.network
+    [SW1_ID] = new_monitors.names.lookup(["Sw1"])
+
+    new_monitors.window = 10
+    new_monitors.spill = True
+    new_monitors.reset_monitors()
+    expected = []
+    for cycle in range(3000):
+        devices.set_switch(SW1_ID, cycle // 100 % 2)
+        network.execute_network()
+        new_monitors.record_signals()
+        expected.append(network.get_output_signal(SW1_ID, None))
+
+    trace = new_monitors.monitors_dictionary[(SW1_ID, None)]
+    assert len(trace) < 3000
+    assert new_monitors.get_signals(SW1_ID, None, 0, 3000) == expected
+    assert new_monitors.remove_monitor(SW1_ID, None)
+    assert new_monitors.get_signals(SW1_ID, None, 0, 3000) is None
+
+
+def test_record_period(new_monitors):
+    """Test if record_period records the signals of a period many times,
+    for the traces and the listeners."""
+    devices = new_monitors.devices
+    [SW1_ID, SW2_ID, OR1_ID] = new_monitors.names.lookup(["Sw1", "Sw2",
+                                                         "Or1"])
+    [LOW, HIGH] = [devices.LOW, devices.HIGH]
+
+    class Listener:
+        """Keep the signals passed to the listener."""
+
+        def __init__(self):
+            self.calls = []
+
+        def record_signals(self, signals, cycles):
+            self.calls.append((signals, cycles))
+
+    listener = Listener()
+    new_monitors.add_listener(listener)
+    first = {(SW1_ID, None): HIGH, (SW2_ID, None): LOW, (OR1_ID, None): HIGH}
+    second = {(SW1_ID, None): LOW, (SW2_ID, None): LOW, (OR1_ID, None): LOW}
+    new_monitors.record_period([(first, 2), (second, 1)], 3)
+
+    assert new_monitors.monitors_dictionary == {
+        (SW1_ID, None): [HIGH, HIGH, LOW] * 3,
+        (SW2_ID, None): [LOW] * 9,
+        (OR1_ID, None): [HIGH, HIGH, LOW] * 3}
+    assert listener.calls == [(first, 2), (second, 1)] * 3
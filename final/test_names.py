@@ -124,3 +124,26 @@ def test_get_name_string_output(
     # just running the same test on an instance of names
     # that hasn't seen any of the tested names - new_names
     assert new_names.get_name_string(name_id) is None
+
+
+"""TESTS FOR LOOKUP_MANY"""
+# LOOKUP_MANY
+# Same as lookup, but interns a whole batch of name strings in one call.
+
+
+# test that lookup_many gives the same IDs as lookup
+def test_lookup_many_matches_lookup(new_names, used_names, name_string_list):
+    assert used_names.lookup_many(name_string_list) == [0, 1, 2]
+    # repeated names in the batch are only added once
+    assert new_names.lookup_many(["a", "b", "a", "c", "b"]) == [0, 1, 0, 2, 1]
+    assert new_names.lookup(["c", "d"]) == [2, 3]
+    assert new_names.query("d") == 3
+    assert new_names.get_name_string(3) == "d"
+
+
+# test that IDs stay dense when mixing lookup and lookup_many
+def test_lookup_many_dense_ids(used_names):
+    batch = ["N" + str(i) for i in range(1000)]
+    name_ids = used_names.lookup_many(batch)
+    assert name_ids == list(range(3, 1003))
+    assert [used_names.query(name) for name in batch] == name_ids
@@ -178,6 +178,71 @@ def test_make_connection_gives_error(network_with_devices,
     assert left_expression == right_expression
 
 
+def test_make_connections(network_with_devices):
+    """Test if make_connections makes each connection and returns errors."""
+    network = network_with_devices
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, SW2_ID, OR1_ID, I1, I2] = names.lookup(["Sw1", "Sw2", "Or1", "I1",
+                                                     "I2"])
+
+    errors = network.make_connections([(SW1_ID, None, OR1_ID, I1),
+                                       (SW2_ID, None, OR1_ID, I1),
+                                       (OR1_ID, I2, SW2_ID, None)])
+    assert errors == [network.NO_ERROR, network.INPUT_CONNECTED,
+                      network.NO_ERROR]
+    assert devices.get_device(OR1_ID).inputs == {I1: (SW1_ID, None),
+                                                 I2: (SW2_ID, None)}
+
+
+def test_remove_connection(network_with_devices):
+    """Test if remove_connection disconnects only connected inputs."""
+    network = network_with_devices
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, OR1_ID, I1, I2] = names.lookup(["Sw1", "Or1", "I1", "I2"])
+    network.make_connection(SW1_ID, None, OR1_ID, I1)
+    version = devices.structure_version
+
+    assert network.remove_connection(OR1_ID, I1)
+    assert network.get_connected_output(OR1_ID, I1) is None
+    assert devices.structure_version > version
+
+    # Or1.I2 is not connected, and Sw1 has no input I1
+    assert not network.remove_connection(OR1_ID, I2)
+    assert not network.remove_connection(SW1_ID, I1)
+    assert not network.remove_connection(I1, I1)
+
+
+def test_find_cone(network_with_devices):
+    """Test if find_cone finds the devices that can reach the outputs."""
+    network = network_with_devices
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, SW2_ID, OR1_ID, AND1_ID, I1,
+     I2] = names.lookup(["Sw1", "Sw2", "Or1", "And1", "I1", "I2"])
+    devices.make_device(AND1_ID, devices.AND, 1)
+    network.make_connection(SW1_ID, None, OR1_ID, I1)
+    network.make_connection(OR1_ID, None, AND1_ID, I1)
+
+    assert network.find_cone([(AND1_ID, None)]) == {SW1_ID, OR1_ID, AND1_ID}
+    assert network.find_cone([(OR1_ID, None), (SW2_ID, None)]) == {
+        SW1_ID, SW2_ID, OR1_ID}
+    assert network.find_cone([]) == set()
+
+    # The active outputs only change the structure when pruning
+    version = devices.structure_version
+    network.set_active_outputs([(OR1_ID, None)])
+    assert network.active_outputs == [(OR1_ID, None)]
+    assert devices.structure_version == version
+    network.pruning = True
+    network.set_active_outputs([(AND1_ID, None)])
+    assert devices.structure_version > version
+
+
 def test_execute_xor(new_network):
     """Test if execute_network returns the correct output for XOR gates."""
     network = new_network
@@ -1,5 +1,8 @@
+import io
+import os
+
 from scanner import Symbol
-from scanner import Scanner
+from scanner import Scanner, BufferedScanner, MappedScanner
 from names import Names
 import pytest
 
@@ -175,3 +178,72 @@ def test_scanner_example_file_comments():
         i += 1
         if(symbol.type == scan.EOF):
             break
+
+
+def get_symbols(scanner):
+    """Return the properties of every symbol given by the scanner."""
+    symbols = []
+    while True:
+        symbol = scanner.get_symbol()
+        symbols.append((symbol.type, symbol.id, symbol.string, symbol.number,
+                        symbol.line_number, symbol.start_char_number,
+                        symbol.end_char_number, scanner.current_character))
+        if symbol.type == scanner.EOF:
+            return symbols
+
+
+scanner_texts = [
+    "",
+    "\n",
+    "\nDEVICES {\n  A1 = AND(2);\n}",
+    "NETWORK{\n\tsw = SWITCH;  // a switch\n\tcl = CLOCK halfperiod 3;}\n",
+    "/* a\nlong comment */ a1 - b1.I1;",
+    "/* comment */// second comment\nx",
+    "/* comment **/ x */ y",
+    "a/ /b # /* not a comment */ 12c 0900;",
+    "\n\n  \x0c\r\n  123abc = .-;{}",
+    "sw = SWITCH; // é\n \u00e9t\u00e9 = 1;",
+]
+
+
+@pytest.mark.parametrize("text", scanner_texts)
+def test_buffered_scanner(monkeypatch, text):
+    """Test if BufferedScanner gives the same symbols as Scanner."""
+    expected = get_symbols(Scanner("", io.StringIO(text), Names()))
+    # Read the text in several blocks
+    monkeypatch.setattr(BufferedScanner, "block_size", 4)
+    assert get_symbols(BufferedScanner("", io.StringIO(text),
+                                       Names())) == expected
+
+
+@pytest.mark.parametrize("file_name", ["flipflop.txt",
+                                       "test_working_spec.txt"])
+def test_buffered_scanner_files(file_name):
+    """Test if BufferedScanner gives the same symbols as Scanner on files."""
+    with open(os.path.join("final_test_files", file_name)) as file:
+        text = file.read()
+    for text in [text, text + "é"]:  # ASCII and not ASCII
+        expected = get_symbols(Scanner("", io.StringIO(text), Names()))
+        assert get_symbols(BufferedScanner("", io.StringIO(text),
+                                           Names())) == expected
+
+
+@pytest.mark.parametrize("text", ["a /* b c", "a // b c"])
+def test_buffered_scanner_open_comment(text):
+    """Test if a comment left open runs to the end of the file."""
+    scanner = BufferedScanner("", io.StringIO(text), Names())
+    assert scanner.get_symbol().string == "a"
+    assert scanner.get_symbol().type == scanner.EOF
+
+
+@pytest.mark.parametrize("text", scanner_texts)
+def test_mapped_scanner(tmp_path, text):
+    """Test if MappedScanner gives the same symbols as Scanner."""
+    expected = get_symbols(Scanner("", io.StringIO(text), Names()))
+    path = tmp_path / "definition.txt"
+    path.write_bytes(text.encode("utf-8"))
+    with open(path, "rb") as file:
+        mapped_scanner = MappedScanner(str(path), file, Names())
+        assert mapped_scanner.is_mapped == text.isascii()
+        assert get_symbols(mapped_scanner) == expected
+        mapped_scanner.close()
@@ -0,0 +1,276 @@
+"""Test the simulator module."""
+import io
+import os
+import pickle
+import random
+import zlib
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from simulator import Simulator
+from logsim import load_network
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def new_simulator():
+    """Return a Simulator class instance for a network with a switch, a
+    clock and a NAND gate, monitoring the switch and the gate."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    new_monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW1_ID, CLOCK_ID, NAND1_ID, I1, I2] = new_names.lookup(
+        ["Sw1", "Clock", "Nand1", "I1", "I2"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(CLOCK_ID, new_devices.CLOCK, 2)
+    new_devices.make_device(NAND1_ID, new_devices.NAND, 2)
+    new_network.make_connection(SW1_ID, None, NAND1_ID, I1)
+    new_network.make_connection(SW1_ID, None, NAND1_ID, I2)
+    new_monitors.make_monitor(SW1_ID, None)
+    new_monitors.make_monitor(NAND1_ID, None)
+
+    return Simulator(new_names, new_devices, new_network, new_monitors)
+
+
+@pytest.fixture
+def flipflop_simulator(tmp_path, monkeypatch):
+    """Return a Simulator class instance for the flip-flop test file, which
+    has a D-type, a clock and switches, keeping the network cache in a
+    temporary directory."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    path = os.path.join(directory, "final_test_files", "flipflop.txt")
+    with open(path, "rb") as file:
+        network_objects = load_network(path, file)
+    return Simulator(*network_objects)
+
+
+def get_traces(simulator):
+    """Return the monitored signals as lists."""
+    return [list(trace) for trace in
+            simulator.monitors.monitors_dictionary.values()]
+
+
+def test_run_with_schedule(new_simulator):
+    """Test if run follows the switch schedule from a cold start."""
+    simulator = new_simulator
+    devices = simulator.devices
+    schedule = simulator.read_schedule(["Sw1=1@2", "Sw1=0@4", "Sw1=1@9"])
+    assert simulator.run(6, schedule)
+    assert simulator.cycles_completed == 6
+
+    [LOW, HIGH] = [devices.LOW, devices.HIGH]
+    assert get_traces(simulator) == [[LOW, LOW, HIGH, HIGH, LOW, LOW],
+                                     [HIGH, HIGH, LOW, LOW, HIGH, HIGH]]
+
+    # Running again starts from scratch
+    assert simulator.run(1)
+    assert get_traces(simulator) == [[LOW], [HIGH]]
+
+
+def test_read_schedule(new_simulator):
+    """Test if read_schedule sorts the changes and rejects invalid ones."""
+    simulator = new_simulator
+    [SW1_ID] = simulator.names.lookup(["Sw1"])
+    assert simulator.read_schedule(["Sw1=1@5", "Sw1=0", "Sw1=1@0"]) == [
+        (0, SW1_ID, 0), (0, SW1_ID, 1), (5, SW1_ID, 1)]
+    assert simulator.read_schedule([]) == []
+    for entry in ["Sw1=2", "Sw1=1@x", "Sw1", "Clock=1", "Nope=1"]:
+        assert simulator.read_schedule([entry]) is None
+
+
+@pytest.mark.parametrize("output_format, expected", [
+    ("text", "Sw1  : __--\nNand1: --__\n"),
+    ("csv", "cycle,Sw1,Nand1\n0,0,1\n1,0,1\n2,1,0\n3,1,0\n"),
+    ("vcd", "$timescale 1 ns $end\n$scope module logsim $end\n"
+            "$var wire 1 ! Sw1 $end\n$var wire 1 \" Nand1 $end\n"
+            "$upscope $end\n$enddefinitions $end\n"
+            "$dumpvars\n0!\n1\"\n$end\n#2\n1!\n0\"\n#4\n"),
+])
+def test_output(new_simulator, output_format, expected):
+    """Test if the monitored signals are written in each format."""
+    simulator = new_simulator
+    file = io.StringIO()
+    assert simulator.start_output(file, output_format)
+    assert simulator.run(4, simulator.read_schedule(["Sw1=1@2"]))
+    simulator.finish_output()
+    assert file.getvalue() == expected
+
+
+def test_unknown_output_format(new_simulator):
+    """Test if start_output rejects unknown formats."""
+    assert not new_simulator.start_output(io.StringIO(), "pdf")
+
+
+@pytest.mark.parametrize("engine_type", ["SWEEP", "COMPILED", "EVENT_DRIVEN",
+                                         "LEVELIZED"])
+def test_save_and_restore_state(flipflop_simulator, engine_type):
+    """Test if restoring a checkpoint repeats the same simulation."""
+    simulator = flipflop_simulator
+    network = simulator.network
+    network.engine_type = getattr(network, engine_type)
+    assert network.compile_network()
+    [SW_ID] = simulator.names.lookup(["sw"])
+
+    assert simulator.run(20)
+    state = simulator.save_state()
+    traces = get_traces(simulator)
+    simulator.devices.set_switch(SW_ID, 1)
+    assert simulator.run_cycles(30)
+    continued_traces = get_traces(simulator)
+
+    assert simulator.restore_state(state)
+    assert simulator.cycles_completed == 20
+    assert get_traces(simulator) == traces
+    simulator.devices.set_switch(SW_ID, 1)
+    assert simulator.run_cycles(30)
+    assert get_traces(simulator) == continued_traces
+
+
+def test_state_file(flipflop_simulator):
+    """Test if a checkpoint written to a file is read back unchanged."""
+    simulator = flipflop_simulator
+    assert simulator.run(25)
+    state = simulator.save_state()
+    file = io.BytesIO()
+    simulator.write_state(state, file)
+    file.seek(0)
+    assert simulator.read_state(file) == state
+    assert simulator.read_state(io.BytesIO(b"not a checkpoint")) is None
+
+
+class Payload:
+    """Create a file when unpickled."""
+
+    def __init__(self, path):
+        """Keep the path of the file to create."""
+        self.path = path
+
+    def __reduce__(self):
+        """Return the call that unpickling makes."""
+        return (open, (self.path, "w"))
+
+
+def test_state_file_runs_no_code(flipflop_simulator, tmp_path):
+    """Test if reading a pickled file does not run the code in it."""
+    path = tmp_path / "created.txt"
+    file = io.BytesIO(zlib.compress(pickle.dumps(
+        {"version": flipflop_simulator.state_version,
+         "payload": Payload(str(path))})))
+    assert flipflop_simulator.read_state(file) is None
+    assert not path.exists()
+
+
+def test_restore_state_pruning(flipflop_simulator):
+    """Test if a pruned engine executes the cone of the restored
+    monitors."""
+    simulator = flipflop_simulator
+    network = simulator.network
+    monitors = simulator.monitors
+    network.pruning = True
+    assert network.compile_network()
+    [D_ID, CLOCK_ID] = simulator.names.lookup(["dtype", "clock"])
+    assert simulator.run(10)
+    state = simulator.save_state()
+    traces = get_traces(simulator)
+    for output in list(monitors.monitors_dictionary):
+        if output != (CLOCK_ID, None):
+            monitors.remove_monitor(*output)
+    assert network.execute_network()
+    assert D_ID not in network.engine.cone
+
+    assert simulator.restore_state(state)
+    assert simulator.run_cycles(10)
+    assert D_ID in network.engine.cone
+    assert [trace[:10] for trace in get_traces(simulator)] == traces
+
+
+def test_restore_other_network(new_simulator, flipflop_simulator):
+    """Test if a checkpoint of another network is not restored."""
+    assert new_simulator.run(2)
+    assert not flipflop_simulator.restore_state(new_simulator.save_state())
+
+
+def test_fork(flipflop_simulator):
+    """Test if forks continue independently from a shared checkpoint."""
+    simulator = flipflop_simulator
+    [SW_ID] = simulator.names.lookup(["sw"])
+    assert simulator.run(20)
+    state = simulator.save_state()
+    traces = get_traces(simulator)
+
+    forks = [simulator.fork(state) for _ in range(2)]
+    # The names are shared, and the devices copied
+    assert forks[0].names is simulator.names
+    assert forks[0].devices.get_device(SW_ID) is not \
+        simulator.devices.get_device(SW_ID)
+    forks[0].devices.set_switch(SW_ID, 1)
+    for fork in forks:
+        assert fork.run_cycles(10)
+        assert fork.cycles_completed == 30
+        assert [trace[:20] for trace in get_traces(fork)] == traces
+
+    # The forks and the original simulation do not affect each other
+    assert get_traces(simulator) == traces
+    assert simulator.run_cycles(10)
+    assert get_traces(simulator) == get_traces(forks[1])
+    assert get_traces(forks[0]) != get_traces(forks[1])
+
+
+@pytest.mark.parametrize("engine_type", ["COMPILED", "EVENT_DRIVEN",
+                                         "LEVELIZED"])
+@pytest.mark.parametrize("seed", range(4))
+def test_period_after_cold_startup(engine_type, seed):
+    """Test if a fast clock, which starts off its steady cycle, is not taken
+    as periodic from its cold start."""
+    traces = []
+    for engine in ["SWEEP", engine_type]:
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+        [CLOCK_ID] = names.lookup(["clk"])
+        devices.make_device(CLOCK_ID, devices.CLOCK, 1)
+        monitors.make_monitor(CLOCK_ID, None)
+        network.engine_type = getattr(network, engine)
+        assert network.compile_network()
+        devices.cold_startup(random.Random(seed))
+        simulator = Simulator(names, devices, network, monitors)
+        assert simulator.run_cycles(20)
+        traces.append(get_traces(simulator))
+    assert traces[0] == traces[1]
+    assert len(set(traces[0][0])) == 2
+
+
+@pytest.mark.parametrize("engine_type", ["COMPILED", "EVENT_DRIVEN",
+                                         "LEVELIZED"])
+def test_period_detection(flipflop_simulator, engine_type):
+    """Test if replaying a detected period gives the same traces as
+    executing every cycle."""
+    simulator = flipflop_simulator
+    network = simulator.network
+    network.engine_type = getattr(network, engine_type)
+    assert network.compile_network()
+    [SW_ID] = simulator.names.lookup(["sw"])
+    simulator.devices.set_switch(SW_ID, 1)
+
+    traces = []
+    for period_limit in [0, 1 << 16]:
+        simulator.period_limit = period_limit
+        state = simulator.save_state()
+        assert simulator.run_cycles(1000)
+        traces.append(get_traces(simulator))
+        if period_limit:
+            # The D-type toggles on every rising edge of the clock
+            assert simulator.period == 12
+            assert simulator.period_start < 100
+        else:
+            assert simulator.period is None
+        assert simulator.restore_state(state)
+    assert traces[0] == traces[1]
@@ -0,0 +1,110 @@
+"""Test the traces module."""
+import pytest
+
+from traces import SignalTrace, RunLengthTrace, SpillFile
+
+
+@pytest.fixture(params=[SignalTrace, RunLengthTrace])
+def trace_class(request):
+    """Return each of the trace classes in turn."""
+    return request.param
+
+
+def test_trace_behaves_like_list(trace_class):
+    """Test if a trace can be used in place of a list of signals."""
+    signals = [0, 0, 1, 1, 1, 2, 3, 0, 4, 4]
+    trace = trace_class(signals[:5])
+    for signal in signals[5:]:
+        trace.append(signal)
+
+    assert trace == signals
+    assert signals == trace
+    assert trace != signals[:-1]
+    assert trace != [0] * 10
+    assert len(trace) == 10
+    assert list(trace) == signals
+    assert [trace[i] for i in range(-10, 10)] == signals * 2
+    assert trace[2:7] == signals[2:7]
+    assert trace[::3] == signals[::3]
+    with pytest.raises(IndexError):
+        trace[10]
+
+    trace.clear()
+    assert trace == []
+    assert len(trace) == 0
+
+
+def test_traces_compare_equal():
+    """Test if the two kinds of trace compare equal to each other."""
+    signals = [1, 1, 0, 0, 0, 1]
+    assert SignalTrace(signals) == RunLengthTrace(signals)
+    assert {(1, None): SignalTrace(signals)} == {(1, None): signals}
+
+
+def test_run_length_trace_runs():
+    """Test if a run-length trace stores one entry per run."""
+    trace = RunLengthTrace()
+    for cycle in range(1000000):
+        trace.append(cycle // 250000 % 2)
+    assert trace.get_runs() == [(0, 250000), (1, 250000), (0, 250000),
+                                (1, 250000)]
+    assert len(trace.run_signals) == 4
+    assert trace[249999] == 0
+    assert trace[250000] == 1
+    assert trace[-1] == 1
+
+
+@pytest.mark.parametrize("spill", [False, True])
+def test_trace_window(trace_class, spill):
+    """Test if a windowed trace keeps only the most recent signals."""
+    signals = [cycle // 7 % 4 for cycle in range(10000)]
+    spill_file = SpillFile() if spill else None
+    trace = trace_class(signals[:50], window=100, spill_file=spill_file)
+    for signal in signals[50:]:
+        trace.append(signal)
+
+    assert 100 <= len(trace) < 100 + trace.minimum_trim
+    assert trace.first_cycle + len(trace) == 10000
+    assert trace == signals[trace.first_cycle:]
+    assert trace.get_signals(9950, 10000) == signals[9950:]
+    if spill:
+        assert trace.get_signals(0, 10000) == signals
+        assert trace.get_signals(1234, 5678) == signals[1234:5678]
+    else:
+        assert trace.get_signals(0, 10000) is None
+
+    trace.trim()
+    assert trace == signals[-100:]
+    trace.clear()
+    assert trace.first_cycle == 0
+    assert trace.get_signals(0, 10) == []
+    trace.close()
+
+
+@pytest.mark.parametrize("window, spill", [(None, False), (100, False),
+                                           (100, True)])
+def test_append_repeated(trace_class, window, spill):
+    """Test if append_repeated adds the same signals as repeated appends."""
+    runs = [(0, 3), (1, 2500), (1, 1), (3, 0), (0, 4000), (2, 7)]
+    signals = [signal for signal, count in runs for _ in range(count)]
+    spill_file = SpillFile() if spill else None
+    trace = trace_class(window=window, spill_file=spill_file)
+    for signal, count in runs:
+        trace.append_repeated(signal, count)
+
+    assert trace.first_cycle + len(trace) == len(signals)
+    assert trace == signals[trace.first_cycle:]
+    if window is None or spill:
+        assert trace.get_signals(0, len(signals)) == signals
+
+
+@pytest.mark.parametrize("window", [None, 100])
+def test_extend_repeated(trace_class, window):
+    """Test if extend_repeated adds the signals count times over."""
+    period = [0, 0, 1, 1, 1, 2, 0]
+    trace = trace_class([3], window=window)
+    trace.extend_repeated(period, 1000)
+    trace.extend_repeated([], 5)
+    signals = [3] + period * 1000
+    assert trace.first_cycle + len(trace) == len(signals)
+    assert trace == signals[trace.first_cycle:]
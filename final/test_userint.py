@@ -0,0 +1,42 @@
+"""Test the userint module."""
+import os
+
+import pytest
+
+from logsim import load_network
+from userint import UserInterface
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def flipflop_interface(tmp_path, monkeypatch):
+    """Return a UserInterface class instance for the flip-flop test file,
+    keeping the network cache in a temporary directory."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    path = os.path.join(directory, "final_test_files", "flipflop.txt")
+    with open(path, "rb") as file:
+        network_objects = load_network(path, file)
+    return UserInterface(*network_objects)
+
+
+def enter_commands(interface, monkeypatch, commands):
+    """Enter the commands, followed by q, into the command interface."""
+    lines = iter(commands + ["q"])
+    monkeypatch.setattr("builtins.input", lambda prompt: next(lines))
+    interface.command_interface()
+
+
+def test_run_twice(flipflop_interface, monkeypatch, capsys):
+    """Test if a second run reports the period from its own start."""
+    interface = flipflop_interface
+    [SW_ID] = interface.names.lookup(["sw"])
+    interface.devices.set_switch(SW_ID, 1)
+    enter_commands(interface, monkeypatch, ["r 200", "r 200"])
+    reports = [line for line in capsys.readouterr().out.splitlines()
+               if line.startswith("Periodic from cycle ")]
+    assert len(reports) == 2
+    for report in reports:
+        assert int(report.split()[3]) < 100
+    assert interface.cycles_completed == 200
+    assert interface.simulator.cycles_completed == 200
@@ -0,0 +1,90 @@
+"""Test the vcd module."""
+import io
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from vcd import VcdWriter
+
+
+@pytest.fixture
+def new_monitors():
+    """Return a Monitors class instance monitoring a switch and a D-type."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    new_monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW1_ID, D1_ID] = new_names.lookup(["Sw1", "D1"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(D1_ID, new_devices.D_TYPE)
+    for input_id in new_devices.dtype_input_ids:
+        new_network.make_connection(SW1_ID, None, D1_ID, input_id)
+
+    new_monitors.make_monitor(D1_ID, new_devices.Q_ID)
+    new_monitors.make_monitor(SW1_ID, None)
+    new_monitors.make_monitor(D1_ID, new_devices.QBAR_ID)
+    return new_monitors
+
+
+def test_get_identifier():
+    """Test if identifier codes are unique printable strings."""
+    writer = VcdWriter(Devices(Names()), io.StringIO())
+    identifiers = [writer.get_identifier(i) for i in range(10000)]
+    assert identifiers[:3] == ["!", "\"", "#"]
+    assert len(set(identifiers)) == 10000
+    assert all(33 <= ord(char) <= 126 for identifier in identifiers
+               for char in identifier)
+
+
+def test_vcd_writer(new_monitors):
+    """Test if only changed signals are written, under device scopes."""
+    devices = new_monitors.devices
+    network = new_monitors.network
+    [SW1_ID, D1_ID] = new_monitors.names.lookup(["Sw1", "D1"])
+    devices.get_device(D1_ID).dtype_memory = devices.HIGH
+
+    vcd_file = io.StringIO()
+    writer = VcdWriter(devices, vcd_file)
+    new_monitors.add_listener(writer)
+    new_monitors.window = 0
+    new_monitors.reset_monitors()
+
+    # The SET and CLEAR inputs of the D-type follow the switch, so Q is
+    # cleared when the switch goes HIGH
+    for cycle in range(5):
+        devices.set_switch(SW1_ID, cycle >= 2)
+        network.execute_network()
+        new_monitors.record_signals()
+    writer.close()
+
+    assert vcd_file.getvalue().split("\n") == [
+        "$timescale 1 ns $end",
+        "$scope module logsim $end",
+        "$scope module D1 $end",
+        "$var wire 1 ! Q $end",
+        "$var wire 1 \" QBAR $end",
+        "$upscope $end",
+        "$var wire 1 # Sw1 $end",
+        "$upscope $end",
+        "$enddefinitions $end",
+        "$dumpvars",
+        "1!",
+        "0#",
+        "0\"",
+        "$end",
+        "#2",
+        "0!",
+        "1#",
+        "1\"",
+        "#5",
+        ""]
+
+    # No traces are kept with a window of 0
+    assert all(len(trace) == 0 for trace in
+               new_monitors.monitors_dictionary.values())
+    assert new_monitors.remove_listener(writer)
+    assert not new_monitors.remove_listener(writer)
@@ -0,0 +1,129 @@
+"""Test the vectorized module."""
+import importlib.util
+import os
+import random
+import sys
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+
+# The vectorized engine is only tested where NumPy is installed, except in
+# continuous integration, where a missing NumPy fails the tests
+requires_numpy = pytest.mark.skipif(
+    importlib.util.find_spec("numpy") is None and not os.environ.get("CI"),
+    reason="NumPy is not installed")
+
+
+def make_network(seed):
+    """Return a Network class instance with a wide, flat layer of gates.
+
+    Eight switches drive gates of every kind with 1 to 16 inputs, which in
+    turn drive a second layer of gates, and a NAND latch.
+    """
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    rng = random.Random(seed)
+
+    input_ids = new_names.lookup(["I" + str(i) for i in range(1, 17)])
+    switch_ids = new_names.lookup(["SW" + str(i) for i in range(8)])
+    for switch_id in switch_ids:
+        new_devices.make_device(switch_id, new_devices.SWITCH,
+                                rng.randint(0, 1))
+    kinds = [new_devices.AND, new_devices.OR, new_devices.NAND,
+             new_devices.NOR, new_devices.XOR]
+    layer = switch_ids
+    for layer_number in range(2):
+        gate_ids = new_names.lookup(["G" + str(layer_number) + "_" + str(i)
+                                     for i in range(80)])
+        for i, gate_id in enumerate(gate_ids):
+            device_kind = kinds[i % len(kinds)]
+            if device_kind == new_devices.XOR:
+                new_devices.make_device(gate_id, device_kind)
+                input_count = 2
+            else:
+                input_count = i % 16 + 1
+                new_devices.make_device(gate_id, device_kind, input_count)
+            for input_id in input_ids[:input_count]:
+                new_network.make_connection(rng.choice(layer), None,
+                                            gate_id, input_id)
+        layer = gate_ids
+
+    [G1, G2] = new_names.lookup(["Latch1", "Latch2"])
+    [I1, I2] = input_ids[:2]
+    for gate_id in [G1, G2]:
+        new_devices.make_device(gate_id, new_devices.NAND, 2)
+    new_network.make_connection(switch_ids[0], None, G1, I1)
+    new_network.make_connection(switch_ids[1], None, G2, I2)
+    new_network.make_connection(G1, None, G2, I1)
+    new_network.make_connection(G2, None, G1, I2)
+    return new_network
+
+
+def run_network(new_network, engine_type, vector_threshold=None):
+    """Run the network while toggling the switches and return the outputs."""
+    devices = new_network.devices
+    new_network.engine_type = engine_type
+    assert new_network.compile_network()
+    if vector_threshold is not None:
+        new_network.engine.vector_threshold = vector_threshold
+        new_network.engine.compile()
+
+    switch_ids = devices.find_devices(devices.SWITCH)
+    results = []
+    for cycle in range(16):
+        devices.set_switch(switch_ids[cycle % 8], cycle % 3 == 0)
+        results.append(new_network.execute_network())
+        results.append([new_network.get_output_signal(device_id, None)
+                        for device_id in devices.find_devices()])
+    return results
+
+
+@requires_numpy
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("vector_threshold", [1, 4, 16])
+def test_vectorized_matches_levelized(seed, vector_threshold):
+    """Test if the vectorized engine gives the same signals as LEVELIZED."""
+    new_network = make_network(seed)
+    expected = run_network(new_network, new_network.LEVELIZED)
+    new_network = make_network(seed)
+    assert run_network(new_network, new_network.VECTORIZED,
+                       vector_threshold) == expected
+
+
+@requires_numpy
+def test_vectorized_matches_sweep():
+    """Test if the vectorized engine settles to the same signals as SWEEP."""
+    new_network = make_network(0)
+    expected = run_network(new_network, new_network.SWEEP)
+    new_network = make_network(0)
+    assert run_network(new_network, new_network.VECTORIZED, 1) == expected
+
+
+@requires_numpy
+def test_vectorized_sync_devices():
+    """Test if synced device outputs are plain integers."""
+    new_network = make_network(0)
+    devices = new_network.devices
+    new_network.engine_type = new_network.VECTORIZED
+    new_network.compile_network()
+    assert new_network.execute_network()
+    new_network.sync_devices()
+    for device_id in devices.find_devices(devices.NAND):
+        signal = devices.get_device(device_id).outputs[None]
+        assert type(signal) is int
+        assert signal == new_network.get_output_signal(device_id, None)
+
+
+def test_vectorized_needs_numpy(monkeypatch):
+    """Test if selecting the vectorized engine without NumPy raises an
+    error instead of falling back to the sweep."""
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    monkeypatch.delitem(sys.modules, "vectorized", raising=False)
+    new_network = make_network(0)
+    new_network.engine_type = new_network.VECTORIZED
+    with pytest.raises(ImportError):
+        new_network.compile_network()
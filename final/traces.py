@@ -0,0 +1,430 @@
+"""Store monitor signal traces compactly.
+
+Used in the Logic Simulator project to hold the signal levels recorded by the
+monitors. A trace behaves like a read-only list of signal levels, so it can be
+indexed, sliced, iterated over and compared with a list.
+
+A trace can keep only a window of the most recent cycles in memory. Older
+cycles are then dropped or, if the trace has a spill file, written to disk in
+compressed segments that can be read back later.
+
+Classes
+-------
+Trace - base class giving list-like behaviour to the traces.
+SignalTrace - stores one byte per signal level.
+RunLengthTrace - stores one entry per run of equal signal levels.
+SpillFile - stores the older signal levels of a trace on disk.
+"""
+import bisect
+import tempfile
+import zlib
+from array import array
+from collections.abc import Sequence
+
+
+class Trace(Sequence):
+    """Give list-like behaviour to the traces.
+
+    Subclasses implement __len__, __getitem__ for integer indices, append,
+    clear_signals, get_oldest and remove_oldest. Slices are returned as lists.
+
+    If a window is given, the trace holds at most the last 2 * window signal
+    levels (or window + 1024, if that is more). Once it is full, the oldest
+    levels are dropped, or moved to the spill file if there is one, leaving
+    the last window levels. Indices always refer to the levels held in
+    memory; first_cycle is the cycle number of trace[0].
+
+    Parameters
+    ----------
+    signals: optional iterable of signal levels to start the trace with.
+    window: optional number of recent signal levels to keep in memory.
+    spill_file: optional SpillFile to move the older signal levels to.
+
+    Public methods
+    --------------
+    append(self, signal): Adds a signal level to the end of the trace.
+
+    extend(self, signals): Adds each of the signal levels to the end of the
+                           trace.
+
+    append_repeated(self, signal, count): Adds count copies of a signal level
+                                          to the end of the trace.
+
+    extend_repeated(self, signals, count): Adds the signal levels to the end
+                                           of the trace count times over.
+
+    clear(self): Removes every signal level from the trace.
+
+    trim(self): Drops or spills the signal levels older than the window.
+
+    get_signals(self, start, stop): Returns a list of the signal levels from
+                                    cycle start up to cycle stop.
+
+    close(self): Closes the spill file, if there is one.
+    """
+
+    __hash__ = None  # traces are mutable, like lists
+
+    # Trim at least this many signal levels at a time
+    minimum_trim = 1024
+
+    def __init__(self, signals=(), window=None, spill_file=None):
+        """Initialise the trace with the given signal levels."""
+        self.window = window
+        self.spill_file = spill_file
+        if window is None:
+            self.trim_length = float("inf")
+        else:
+            self.trim_length = window + max(window, self.minimum_trim)
+        self.clear()
+        self.extend(signals)
+
+    def clear(self):
+        """Remove every signal level from the trace."""
+        self.first_cycle = 0
+        if self.spill_file is not None:
+            self.spill_file.clear()
+        self.clear_signals()
+
+    def trim(self):
+        """Drop or spill the signal levels older than the window."""
+        count = len(self) - self.window
+        if count <= 0:
+            return
+        if self.spill_file is not None:
+            self.spill_file.write(self.get_oldest(count))
+        self.remove_oldest(count)
+        self.first_cycle += count
+
+    def get_signals(self, start, stop):
+        """Return a list of the signal levels from cycle start up to stop.
+
+        Levels that have been spilled are read back from the spill file.
+        Return None if some of the levels have been dropped.
+        """
+        stop = min(stop, self.first_cycle + len(self))
+        signals = []
+        if start < self.first_cycle:
+            if self.spill_file is None:
+                return None
+            signals = self.spill_file.read(
+                start, min(stop, self.first_cycle)).tolist()
+        if stop > self.first_cycle:
+            signals += self[max(start - self.first_cycle, 0):
+                            stop - self.first_cycle]
+        return signals
+
+    def close(self):
+        """Close the spill file, if there is one."""
+        if self.spill_file is not None:
+            self.spill_file.close()
+
+    def extend(self, signals):
+        """Add each of the signal levels to the end of the trace."""
+        for signal in signals:
+            self.append(signal)
+
+    def append_repeated(self, signal, count):
+        """Add count copies of the signal level to the end of the trace."""
+        self.extend_repeated([signal], count)
+
+    def extend_repeated(self, signals, count):
+        """Add the signal levels to the end of the trace count times over."""
+        for _ in range(count):
+            self.extend(signals)
+
+    def __eq__(self, other):
+        """Return True if other holds the same signal levels."""
+        if not isinstance(other, (Sequence, array)) or isinstance(other,
+                                                                  str):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            signal == other_signal
+            for signal, other_signal in zip(self, other))
+
+    def __repr__(self):
+        """Return the trace as it would be shown for a list."""
+        return type(self).__name__ + "(" + repr(list(self)) + ")"
+
+
+class SignalTrace(Trace):
+    """Store one byte per signal level.
+
+    The signal levels are held in an array of signed chars, instead of a list
+    of references to integer objects.
+
+    Parameters
+    ----------
+    signals: optional iterable of signal levels to start the trace with.
+    window: optional number of recent signal levels to keep in memory.
+    spill_file: optional SpillFile to move the older signal levels to.
+
+    Public methods
+    --------------
+    append(self, signal): Adds a signal level to the end of the trace.
+
+    extend(self, signals): Adds each of the signal levels to the end of the
+                           trace.
+
+    extend_repeated(self, signals, count): Adds the signal levels to the end
+                                           of the trace count times over.
+
+    clear_signals(self): Removes every signal level held in memory.
+
+    get_oldest(self, count): Returns an array of the oldest signal levels.
+
+    remove_oldest(self, count): Removes the oldest signal levels.
+    """
+
+    def clear_signals(self):
+        """Remove every signal level held in memory."""
+        self.signals = array("b")
+
+    def append(self, signal):
+        """Add a signal level to the end of the trace."""
+        self.signals.append(signal)
+        if len(self.signals) >= self.trim_length:
+            self.trim()
+
+    def extend(self, signals):
+        """Add each of the signal levels to the end of the trace."""
+        self.signals.extend(signals)
+        if len(self.signals) >= self.trim_length:
+            self.trim()
+
+    def extend_repeated(self, signals, count):
+        """Add the signal levels to the end of the trace count times over."""
+        signals = array("b", signals)
+        if not signals:
+            return
+        # Add about trim_length levels at a time, so that a window keeps the
+        # memory used bounded
+        chunk_count = max(min(count, self.trim_length // len(signals)), 1)
+        chunk = signals * chunk_count
+        while count >= chunk_count:
+            self.extend(chunk)
+            count -= chunk_count
+        if count > 0:
+            self.extend(signals * count)
+
+    def get_oldest(self, count):
+        """Return an array of the oldest count signal levels."""
+        return self.signals[:count]
+
+    def remove_oldest(self, count):
+        """Remove the oldest count signal levels."""
+        del self.signals[:count]
+
+    def __len__(self):
+        """Return the number of signal levels in the trace."""
+        return len(self.signals)
+
+    def __getitem__(self, index):
+        """Return the signal level at index, or a list for a slice."""
+        if isinstance(index, slice):
+            return self.signals[index].tolist()
+        return self.signals[index]
+
+    def __iter__(self):
+        """Iterate over the signal levels."""
+        return iter(self.signals)
+
+
+class RunLengthTrace(Trace):
+    """Store one entry per run of equal signal levels.
+
+    Each run stores its signal level and the index just after its last
+    signal, so a switch that never changes takes a few bytes however long the
+    simulation runs. Finding a single signal level takes a binary search over
+    the runs.
+
+    Parameters
+    ----------
+    signals: optional iterable of signal levels to start the trace with.
+    window: optional number of recent signal levels to keep in memory.
+    spill_file: optional SpillFile to move the older signal levels to.
+
+    Public methods
+    --------------
+    append(self, signal): Adds a signal level to the end of the trace.
+
+    append_repeated(self, signal, count): Adds count copies of a signal level
+                                          to the end of the trace.
+
+    extend_repeated(self, signals, count): Adds the signal levels to the end
+                                           of the trace count times over.
+
+    clear_signals(self): Removes every signal level held in memory.
+
+    get_oldest(self, count): Returns an array of the oldest signal levels.
+
+    remove_oldest(self, count): Removes the oldest signal levels.
+
+    get_runs(self): Returns a list of (signal, length) for each run.
+
+    get_index(self, index): Returns index as a non-negative integer.
+    """
+
+    def clear_signals(self):
+        """Remove every signal level held in memory."""
+        self.run_signals = array("b")
+        self.run_ends = array("q")
+
+    def append(self, signal):
+        """Add a signal level to the end of the trace."""
+        if self.run_signals and self.run_signals[-1] == signal:
+            self.run_ends[-1] += 1
+        else:
+            self.run_signals.append(signal)
+            self.run_ends.append(len(self) + 1)
+        if self.run_ends[-1] >= self.trim_length:
+            self.trim()
+
+    def get_oldest(self, count):
+        """Return an array of the oldest count signal levels."""
+        signals = array("b")
+        start = 0
+        for signal, end in zip(self.run_signals, self.run_ends):
+            signals.extend(array("b", [signal]) * (min(end, count) - start))
+            if end >= count:
+                break
+            start = end
+        return signals
+
+    def remove_oldest(self, count):
+        """Remove the oldest count signal levels."""
+        # Runs ending at or before count are removed completely
+        runs = bisect.bisect_right(self.run_ends, count)
+        del self.run_signals[:runs]
+        del self.run_ends[:runs]
+        self.run_ends = array("q", [end - count for end in self.run_ends])
+
+    def append_repeated(self, signal, count):
+        """Add count copies of the signal level to the end of the trace."""
+        if count <= 0:
+            return
+        if self.run_signals and self.run_signals[-1] == signal:
+            self.run_ends[-1] += count
+        else:
+            self.run_signals.append(signal)
+            self.run_ends.append(len(self) + count)
+        if self.run_ends[-1] >= self.trim_length:
+            self.trim()
+
+    def extend_repeated(self, signals, count):
+        """Add the signal levels to the end of the trace count times over."""
+        runs = []
+        for signal in signals:
+            if runs and runs[-1][0] == signal:
+                runs[-1][1] += 1
+            else:
+                runs.append([signal, 1])
+        for _ in range(count):
+            for signal, length in runs:
+                self.append_repeated(signal, length)
+
+    def get_runs(self):
+        """Return a list of (signal, length) for each run."""
+        runs = []
+        start = 0
+        for signal, end in zip(self.run_signals, self.run_ends):
+            runs.append((signal, end - start))
+            start = end
+        return runs
+
+    def get_index(self, index):
+        """Return index as a non-negative integer, or raise IndexError."""
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("trace index out of range")
+        return index
+
+    def __len__(self):
+        """Return the number of signal levels in the trace."""
+        if self.run_ends:
+            return self.run_ends[-1]
+        return 0
+
+    def __getitem__(self, index):
+        """Return the signal level at index, or a list for a slice."""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        index = self.get_index(index)
+        return self.run_signals[bisect.bisect_right(self.run_ends, index)]
+
+    def __iter__(self):
+        """Iterate over the signal levels."""
+        for signal, length in self.get_runs():
+            for _ in range(length):
+                yield signal
+
+
+class SpillFile:
+    """Store the older signal levels of a trace on disk.
+
+    Signal levels are written in segments, each compressed with zlib, to an
+    anonymous temporary file that is deleted when it is closed. Runs of equal
+    levels compress very well, so a slowly changing signal takes little
+    space.
+
+    Parameters
+    ----------
+    directory: optional directory to create the file in.
+
+    Public methods
+    --------------
+    write(self, signals): Adds an array of signal levels to the end of the
+                          file.
+
+    read(self, start, stop): Returns an array of the signal levels from
+                             cycle start up to cycle stop.
+
+    clear(self): Removes every signal level from the file.
+
+    close(self): Closes and deletes the file.
+    """
+
+    def __init__(self, directory=None):
+        """Create the temporary file."""
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.clear()
+
+    def clear(self):
+        """Remove every signal level from the file."""
+        self.file.seek(0)
+        self.file.truncate()
+        # segment_starts stores the first cycle of each segment, and segments
+        # stores (cycle count, file offset, compressed size)
+        self.segment_starts = []
+        self.segments = []
+        self.cycle_count = 0
+
+    def write(self, signals):
+        """Add an array of signal levels to the end of the file."""
+        data = zlib.compress(signals.tobytes())
+        offset = self.file.seek(0, 2)
+        self.file.write(data)
+        self.segment_starts.append(self.cycle_count)
+        self.segments.append((len(signals), offset, len(data)))
+        self.cycle_count += len(signals)
+
+    def read(self, start, stop):
+        """Return an array of the signal levels from cycle start up to stop."""
+        signals = array("b")
+        first = max(bisect.bisect_right(self.segment_starts, start) - 1, 0)
+        for i in range(first, len(self.segments)):
+            segment_start = self.segment_starts[i]
+            if segment_start >= stop:
+                break
+            count, offset, size = self.segments[i]
+            self.file.seek(offset)
+            segment = array("b", zlib.decompress(self.file.read(size)))
+            signals.extend(segment[max(start - segment_start, 0):
+                                   stop - segment_start])
+        return signals
+
+    def close(self):
+        """Close and delete the file."""
+        self.file.close()
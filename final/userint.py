@@ -8,6 +8,8 @@ Classes:
 UserInterface - reads and parses user commands.
 """
 
+from simulator import Simulator
+
 
 class UserInterface:
 
@@ -72,6 +74,7 @@ class UserInterface:
         self.devices = devices
         self.monitors = monitors
         self.network = network
+        self.simulator = Simulator(names, devices, network, monitors)
 
         self.cycles_completed = 0  # number of simulation cycles completed
 
@@ -248,12 +251,14 @@ class UserInterface:
 
         Return True if successful.
         """
-        for _ in range(cycles):
-            if self.network.execute_network():
-                self.monitors.record_signals()
-            else:
-                print("Error! Network oscillating.")
-                return False
+        if not self.simulator.run_cycles(cycles):
+            print("Error! Network oscillating.")
+            return False
+        if self.simulator.period is not None:
+            print("".join(["Periodic from cycle ",
+                           str(self.simulator.period_start),
+                           " with a period of ", str(self.simulator.period),
+                           " cycles"]))
         self.monitors.display_signals()
         return True
 
@@ -266,6 +271,7 @@ class UserInterface:
             self.monitors.reset_monitors()
             print("".join(["Running for ", str(cycles), " cycles"]))
             self.devices.cold_startup()
+            self.simulator.cycles_completed = 0
             if self.run_network(cycles):
                 self.cycles_completed += cycles
 
@@ -0,0 +1,163 @@
+"""Write monitored signals to a Value Change Dump file as they are recorded.
+
+Used in the Logic Simulator project to inspect long simulations in standard
+waveform viewers, such as GTKWave, without holding the traces in memory.
+
+Classes
+-------
+VcdWriter - streams the monitored signals to a VCD file.
+"""
+
+
+class VcdWriter:
+    """Stream the monitored signals to a VCD file.
+
+    Add the writer to Monitors with add_listener. Every time the monitors
+    record the signals, the writer is given the new signal levels and writes
+    out only the signals that changed since the last cycle. Output is
+    collected in a buffer and written in blocks.
+
+    The header is written on the first cycle, and lists the signals monitored
+    at that time. Monitors made later are not written. Each cycle is one
+    time unit. RISING is written as 1, FALLING as 0 and BLANK as x, since VCD
+    has no transitional levels.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    file: file object opened for writing text.
+    timescale: optional length of one simulation cycle, such as "1 us".
+
+    Public methods
+    --------------
+    get_identifier(self, index): Returns the VCD identifier code for the
+                                 index-th signal.
+
+    write_header(self, outputs): Writes the VCD header for the given outputs.
+
+    record_signals(self, signals, cycles=1): Writes the signals that changed
+                                             in this cycle.
+
+    flush(self): Writes out the buffered output.
+
+    close(self): Writes out the buffered output and the final time.
+    """
+
+    def __init__(self, devices, file, timescale="1 ns"):
+        """Initialise the writer state."""
+        self.devices = devices
+        self.file = file
+        self.timescale = timescale
+
+        # Buffered lines are written out once there are this many
+        self.buffer_size = 4096
+        self.buffer = []
+
+        self.cycle = 0
+        # identifiers stores {(device_id, output_id): identifier code}
+        self.identifiers = None
+        # values stores the last value written for each output
+        self.values = {}
+
+        signal_values = {devices.LOW: "0", devices.HIGH: "1",
+                         devices.RISING: "1", devices.FALLING: "0",
+                         devices.BLANK: "x"}
+        self.signal_values = signal_values
+
+    def get_identifier(self, index):
+        """Return the VCD identifier code for the index-th signal.
+
+        Identifier codes are written in base 94, using the printable ASCII
+        characters from ! to ~.
+        """
+        identifier = ""
+        while True:
+            identifier += chr(33 + index % 94)
+            index //= 94
+            if index == 0:
+                return identifier
+
+    def write_header(self, outputs):
+        """Write the VCD header for the given list of outputs.
+
+        Outputs of devices with more than one output, such as the Q and QBAR
+        of a D-type, are placed in a scope named after the device.
+        """
+        names = self.devices.names
+        # Keep the outputs of each device together, in a single scope
+        device_order = {}
+        for device_id, output_id in outputs:
+            device_order.setdefault(device_id, len(device_order))
+        outputs = sorted(outputs, key=lambda output: device_order[output[0]])
+
+        self.identifiers = {}
+        lines = ["$timescale " + self.timescale + " $end",
+                 "$scope module logsim $end"]
+        scope = None
+        for index, (device_id, output_id) in enumerate(outputs):
+            identifier = self.get_identifier(index)
+            self.identifiers[(device_id, output_id)] = identifier
+            if output_id is None:
+                reference = names.get_name_string(device_id)
+                new_scope = None
+            else:
+                reference = names.get_name_string(output_id)
+                new_scope = device_id
+            if new_scope != scope:
+                if scope is not None:
+                    lines.append("$upscope $end")
+                if new_scope is not None:
+                    lines.append("$scope module " +
+                                 names.get_name_string(new_scope) + " $end")
+                scope = new_scope
+            lines.append("$var wire 1 " + identifier + " " + reference +
+                         " $end")
+        if scope is not None:
+            lines.append("$upscope $end")
+        lines += ["$upscope $end", "$enddefinitions $end"]
+        self.buffer += lines
+
+    def record_signals(self, signals, cycles=1):
+        """Write the signals that changed in this cycle.
+
+        signals is a dictionary of {(device_id, output_id): signal level},
+        which holds for the given number of cycles.
+        """
+        if self.identifiers is None:
+            self.write_header(list(signals))
+        changes = []
+        values = self.values
+        signal_values = self.signal_values
+        for output, signal in signals.items():
+            value = signal_values.get(signal, "x")
+            if values.get(output) != value:
+                identifier = self.identifiers.get(output)
+                if identifier is None:  # monitor made after the header
+                    continue
+                values[output] = value
+                changes.append(value + identifier)
+        if changes:
+            if self.cycle == 0:
+                self.buffer.append("$dumpvars")
+                self.buffer += changes
+                self.buffer.append("$end")
+            else:
+                self.buffer.append("#" + str(self.cycle))
+                self.buffer += changes
+        self.cycle += cycles
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write out the buffered output."""
+        if self.buffer:
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.buffer = []
+
+    def close(self):
+        """Write out the buffered output and the final time.
+
+        The file itself is left open for the caller to close.
+        """
+        self.buffer.append("#" + str(self.cycle))
+        self.flush()
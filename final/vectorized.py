@@ -0,0 +1,172 @@
+"""Execute the gates of a network with NumPy array operations.
+
+Used in the Logic Simulator project to simulate large, flat combinational
+networks. The gates are levelized as in compiled.LevelizedNetwork, and every
+gate of one kind at one level is then executed with a single NumPy operation
+over a padded fan-in matrix.
+
+Classes
+-------
+VectorizedNetwork - executes groups of gates with NumPy array operations.
+"""
+import numpy as np
+
+from compiled import LevelizedNetwork
+
+
+class VectorizedNetwork(LevelizedNetwork):
+    """Execute groups of gates with NumPy array operations.
+
+    The signals are held in a NumPy array, using the same LOW, HIGH, RISING
+    and FALLING codes as devices.Devices. Gates at the same level never read
+    each other's outputs, so all the gates of one kind at one level can be
+    executed together. Each group stores a fan-in matrix with one row per
+    gate, padded to the widest gate with a constant slot whose signal never
+    changes the result. Groups smaller than vector_threshold, and gates in
+    feedback loops, are executed one gate at a time as in LevelizedNetwork,
+    so both engines give identical results.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    compile(self): Flattens the network into arrays and groups the gates.
+
+    make_schedule(self): Builds the list of gate groups to execute in each
+                         pass.
+
+    get_output_signal(self, device_id, output_id): Returns the signal level at
+                                                   the given output.
+
+    sync_devices(self): Writes the compiled signals back to the devices.
+
+    execute_pass(self): Executes the sources, then the gate groups level by
+                        level.
+    """
+
+    def __init__(self, names, devices, network):
+        """Initialise the lookup arrays used by the gate kernel."""
+        super().__init__(names, devices, network)
+
+        # Smaller groups of gates are cheaper to execute one at a time
+        self.vector_threshold = 16
+
+        self.update_array = np.array(self.update_table, dtype=np.int8)
+        # is_high[signal] is True for HIGH and RISING
+        self.is_high = np.array([False, True, True, False])
+
+    def compile(self):
+        """Flatten the network into arrays and group the gates.
+
+        Return True if every input in the network is connected.
+        """
+        devices = self.devices
+        valid = super().compile()
+        # Two constant slots at the end of the array pad the fan-in matrices
+        self.signals = np.array(self.signals + [devices.LOW, devices.HIGH],
+                                dtype=np.int8)
+        return valid
+
+    def make_schedule(self):
+        """Build the list of gate groups to execute in each pass.
+
+        schedule stores (gates, is_loop) for gates executed one at a time, and
+        (group, None) for a group of gates executed together. A group stores
+        (output slots, fan-in matrix, x, y, inverse of y).
+        """
+        devices = self.devices
+        gates = self.levelized_gates
+        padding = {devices.LOW: len(self.signals),
+                   devices.HIGH: len(self.signals) + 1}
+
+        levels = {}  # {level: [components]}
+        for component in self.components:
+            levels.setdefault(component[2], []).append(component)
+
+        self.schedule = []
+        for level in sorted(levels):
+            # kinds stores {(x, y): [gates]}, with x set to None for XOR
+            kinds = {}
+            for component, is_loop, _ in levels[level]:
+                if is_loop:
+                    self.schedule.append(
+                        ([gates[i] for i in component], True))
+                else:
+                    gate = gates[component[0]]
+                    kinds.setdefault((gate[2], gate[3]), []).append(gate)
+            for (x, y), group in kinds.items():
+                if len(group) < self.vector_threshold:
+                    if self.schedule and self.schedule[-1][1] is False:
+                        self.schedule[-1][0].extend(group)
+                    else:
+                        self.schedule.append((group, False))
+                    continue
+                width = max(len(gate[1]) for gate in group)
+                # XOR gates always have two inputs, so need no padding
+                fanin = [list(gate[1]) + [padding.get(x)] *
+                         (width - len(gate[1])) for gate in group]
+                self.schedule.append(((
+                    np.array([gate[0] for gate in group], dtype=np.intp),
+                    np.array(fanin, dtype=np.intp), x, y, group[0][4]),
+                    None))
+
+    def get_output_signal(self, device_id, output_id):
+        """Return the signal level at the given output.
+
+        Return None if either of the specified IDs is invalid.
+        """
+        signal = super().get_output_signal(device_id, output_id)
+        if signal is None:
+            return None
+        return int(signal)
+
+    def sync_devices(self):
+        """Write the compiled signals and device state back to the devices."""
+        signals = self.signals
+        self.signals = signals.tolist()
+        super().sync_devices()
+        self.signals = signals
+
+    def execute_pass(self):
+        """Execute the sources, then the gate groups level by level.
+
+        Return True if no signal changed, and None if a feedback loop does not
+        settle within the iteration limit.
+        """
+        signals = self.signals
+        update_array = self.update_array
+        is_high = self.is_high
+        HIGH = self.devices.HIGH
+        LOW = self.devices.LOW
+        steady_state = self.execute_sources()
+
+        for gates, is_loop in self.schedule:
+            if is_loop is None:
+                out, fanin, x, y, not_y = gates
+                high = is_high[signals[fanin]]
+                if x is None:  # XOR gates
+                    targets = np.where(high[:, 0] != high[:, 1], HIGH, LOW)
+                else:
+                    if x == HIGH:
+                        matching = high.all(axis=1)
+                    else:
+                        matching = ~high.any(axis=1)
+                    targets = np.where(matching, y, not_y)
+                old_signals = signals[out]
+                new_signals = update_array[old_signals, targets]
+                if (new_signals != old_signals).any():
+                    signals[out] = new_signals
+                    steady_state = False
+            elif is_loop:
+                settled = self.execute_gates(gates, self.iteration_limit)
+                if settled is None:
+                    return None
+                if not settled:
+                    steady_state = False
+            elif not self.execute_gates(gates):
+                steady_state = False
+        return steady_state